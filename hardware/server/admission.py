@@ -0,0 +1,160 @@
+"""
+Admission control for the voice pipeline.
+
+Every utterance holds a Ticket from the AdmissionController for as long as
+it is in the STT → LLM → TTS pipeline.  New utterances are only admitted
+while fewer than max_pipelines are in flight and the estimated queueing
+delay of the inference pools is under max_queue_s; otherwise they may wait
+up to defer_s for room and are then shed with Overloaded, so a spike is
+turned away at the door instead of slowing every session down together.
+
+The last crisis_reserve pipeline slots are a priority lane: only sessions
+flagged as crisis conversations can use them, and those sessions are never
+shed for queue latency.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable
+
+logger = logging.getLogger("aasha")
+
+
+class Overloaded(RuntimeError):
+    """Raised when an utterance is shed; carries a suggested retry delay."""
+
+    def __init__(self, reason: str, retry_after_s: float):
+        super().__init__(reason)
+        self.reason        = reason
+        self.retry_after_s = retry_after_s
+
+
+class Ticket:
+    """One admitted pipeline; release() is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", priority: bool):
+        self.priority    = priority
+        self._controller = controller
+        self._started    = time.monotonic()
+        self._released   = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """
+    Count in-flight pipelines and shed new ones past the configured limits.
+
+    Args:
+        max_pipelines:  pipelines allowed in flight at once; 0 disables the
+                        capacity limit (pipelines are still counted).
+        crisis_reserve: slots out of max_pipelines kept for priority sessions.
+        max_queue_s:    estimated queueing delay beyond which normal
+                        utterances are shed; 0 disables the check.
+        defer_s:        how long an utterance may wait for room before it
+                        is shed; 0 sheds immediately.
+        latency_probe:  callable returning the current estimated queueing
+                        delay of the inference pools in seconds.
+    """
+
+    def __init__(
+        self,
+        max_pipelines: int,
+        crisis_reserve: int = 0,
+        max_queue_s: float = 0.0,
+        defer_s: float = 0.0,
+        latency_probe: Callable[[], float] | None = None,
+    ):
+        self.max_pipelines  = max(max_pipelines, 0)
+        self.crisis_reserve = min(max(crisis_reserve, 0), max(self.max_pipelines - 1, 0))
+        self.max_queue_s    = max_queue_s
+        self.defer_s        = defer_s
+        self._probe         = latency_probe or (lambda: 0.0)
+        self._changed: asyncio.Event | None = None    # set (and replaced) on every release
+        self._in_flight     = 0
+        self._priority      = 0
+        self._deferred      = 0
+        self._admitted      = 0
+        self._shed          = 0
+        self._avg_pipeline  = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        """Pipelines currently admitted."""
+        return self._in_flight
+
+    def _refusal(self, priority: bool) -> str | None:
+        """Why an utterance cannot be admitted right now, or None."""
+        if self.max_pipelines:
+            limit = self.max_pipelines if priority else self.max_pipelines - self.crisis_reserve
+            if self._in_flight >= limit:
+                return "CAPACITY"
+        if not priority and self.max_queue_s and self._probe() > self.max_queue_s:
+            return "QUEUE_LATENCY"
+        return None
+
+    def retry_after(self) -> float:
+        """Suggested delay before a shed device tries again, in seconds."""
+        return max(self._probe(), self._avg_pipeline, 1.0)
+
+    async def admit(self, priority: bool = False) -> Ticket:
+        """
+        Admit one utterance, waiting up to defer_s for room.
+
+        Raises:
+            Overloaded: if there is still no room once the deferral expires.
+        """
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        reason = self._refusal(priority)
+        if reason and self.defer_s > 0:
+            self._deferred += 1
+            deadline = time.monotonic() + self.defer_s
+            while reason:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    # Latency can fall without a release, so re-check
+                    # periodically as well as on every release.
+                    await asyncio.wait_for(self._changed.wait(), min(remaining, 0.25))
+                except asyncio.TimeoutError:
+                    pass
+                reason = self._refusal(priority)
+        if reason:
+            self._shed += 1
+            raise Overloaded(reason, self.retry_after())
+
+        self._in_flight += 1
+        self._admitted  += 1
+        if priority:
+            self._priority += 1
+        return Ticket(self, priority)
+
+    def _release(self, ticket: Ticket, duration_s: float) -> None:
+        self._in_flight -= 1
+        if ticket.priority:
+            self._priority -= 1
+        self._avg_pipeline += 0.1 * (duration_s - self._avg_pipeline)
+        if self._changed is not None:
+            # Wake every deferred admit() synchronously; later waits use a fresh event.
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    def stats(self) -> dict:
+        """Admission counters and the current load estimate."""
+        return {
+            "max_pipelines":      self.max_pipelines,
+            "crisis_reserve":     self.crisis_reserve,
+            "in_flight":          self._in_flight,
+            "priority_in_flight": self._priority,
+            "admitted":           self._admitted,
+            "deferred":           self._deferred,
+            "shed":               self._shed,
+            "queue_estimate_ms":  round(self._probe() * 1000, 1),
+            "avg_pipeline_ms":    round(self._avg_pipeline * 1000, 1),
+        }
@@ -0,0 +1,145 @@
+"""
+Cross-session micro-batching.
+
+A MicroBatcher sits in front of a batched inference call.  Requests from any
+session are queued; a batch is dispatched when a runner slot is free and
+either max_batch requests are waiting or the oldest one has waited
+max_wait_ms.  Requests that arrive while a batch is running naturally pile
+up for the next one, so throughput rises under load while a lone request on
+an idle server only pays the (short) wait window.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from workers import PoolBusy
+
+logger = logging.getLogger("aasha")
+
+
+class MicroBatcher:
+    """
+    Group concurrent submit() calls into batched calls of run_batch.
+
+    Args:
+        name:           label for logs and stats.
+        run_batch:      async callable mapping a list of items to a list of
+                        results in the same order.
+        max_batch:      largest batch handed to run_batch.
+        max_wait_ms:    longest a request waits for companions.
+        max_concurrent: batches allowed to run at once (usually the number
+                        of slots of the pool run_batch executes on).
+        max_pending:    queued requests beyond which submit() raises
+                        PoolBusy; 0 means unbounded.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[list[Any]], Awaitable[list[Any]]],
+        max_batch: int,
+        max_wait_ms: float,
+        max_concurrent: int = 1,
+        max_pending: int = 0,
+    ):
+        self.name           = name
+        self.max_batch      = max(max_batch, 1)
+        self.max_wait_s     = max(max_wait_ms, 0) / 1000.0
+        self.max_concurrent = max(max_concurrent, 1)
+        self.max_pending    = max_pending
+        self._run_batch     = run_batch
+        self._pending: list[tuple[Any, asyncio.Future, float]] = []
+        self._running       = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()    # batches in flight
+        self._batches       = 0
+        self._items         = 0
+        self._largest       = 0
+
+    @property
+    def pending(self) -> int:
+        """Requests waiting for a batch."""
+        return len(self._pending)
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and return its result once its batch has run."""
+        if self.max_pending and len(self._pending) >= self.max_pending:
+            raise PoolBusy(f"{self.name} batcher saturated ({len(self._pending)} pending)")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.monotonic()))
+        self._dispatch()
+        return await future
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Start as many batches as the free runner slots and wait rules allow."""
+        # Callers cancelled while queued (e.g. barge-in) never reach the model.
+        self._pending = [p for p in self._pending if not p[1].done()]
+        while self._pending and self._running < self.max_concurrent:
+            age = time.monotonic() - self._pending[0][2]
+            if len(self._pending) < self.max_batch and age < self.max_wait_s:
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(
+                        self.max_wait_s - age, self._on_timer,
+                    )
+                return
+            batch         = self._pending[: self.max_batch]
+            self._pending = self._pending[self.max_batch :]
+            self._running += 1
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Any, asyncio.Future, float]]) -> None:
+        self._batches += 1
+        self._items   += len(batch)
+        self._largest  = max(self._largest, len(batch))
+        if len(batch) > 1:
+            logger.info("  %s batch  size=%d", self.name, len(batch))
+        try:
+            results = await self._run_batch([item for item, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+        finally:
+            self._running -= 1
+            self._dispatch()
+
+    async def close(self) -> None:
+        """Fail queued requests and cancel the batches in flight (shutdown)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(PoolBusy(f"{self.name} batcher closed"))
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        """Batch counts and sizes since startup."""
+        return {
+            "max_batch":      self.max_batch,
+            "max_wait_ms":    round(self.max_wait_s * 1000, 1),
+            "pending":        len(self._pending),
+            "batches":        self._batches,
+            "items":          self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+            "largest_batch":  self._largest,
+        }
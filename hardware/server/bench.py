@@ -0,0 +1,333 @@
+"""
+Micro-benchmarks for the per-utterance stages, with regression baselines.
+
+Calls the stage functions of main.py directly — _sanitize_for_tts,
+encode_pcm_to_opus, _run_silero_tts and _run_whisper — on a fixed corpus,
+across a grid of settings:
+
+  sanitize  Gemini-style replies with typographic punctuation and emoji.
+  opus      1 / 5 / 15 s of speech-band PCM, fresh vs. reused encoder.
+  tts       short / medium / long replies × torch thread counts.
+  stt       clips × Whisper model size × compute type × beam size ×
+            CPU threads, with word error rate against the reference text.
+
+The STT corpus is a directory of audio clips with same-named .txt
+reference transcripts (--corpus); without one, the built-in utterances
+are synthesised with Silero first, so STT accuracy is measured on clean
+TTS speech — fine for comparing settings, optimistic in absolute terms.
+
+Results are written as JSON (--out).  --baseline compares the medians
+(and word error rates) with a previous run and exits non-zero if any
+configuration regressed by more than --tolerance; --save-baseline stores
+this run as the new reference:
+
+    python bench.py opus sanitize --save-baseline bench_baseline.json
+    python bench.py stt --whisper-models medium.en,small.en --beam-sizes 1,5 \\
+        --baseline bench_baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+import numpy as np
+import soundfile as sf
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")   # main builds a Gemini client at import
+os.environ.setdefault("RECORD_AUDIO", "0")
+os.environ.setdefault("RECORD_TTS_AUDIO", "0")
+
+import main  # noqa: E402
+
+SAMPLE_RATE = main.SERVER_SAMPLE_RATE
+
+# Utterances a student might say to the device (STT corpus fallback).
+UTTERANCES = [
+    "I can't sleep because I keep thinking about my exams.",
+    "My roommate and I had a big fight and I don't know what to do.",
+    "I feel like I'm falling behind in every class.",
+    "Can you help me calm down before my presentation?",
+    "Thank you, that actually helps a lot.",
+]
+
+# Replies by length, in the register the system prompt asks Gemini for.
+REPLIES = {
+    "short":  "That sounds really hard. I'm here with you.",
+    "medium": (
+        "It makes sense that you feel overwhelmed when everything lands at once. "
+        "Let's take it one step at a time: what is the very next thing due?"
+    ),
+    "long": (
+        "Thank you for telling me about this; it takes courage to say it out loud. "
+        "Feeling behind in every class can make it seem like nothing you do is enough, "
+        "but that feeling is not the same as the truth. Could we pick one course, "
+        "look at what is due this week, and break it into a few small pieces you can "
+        "finish tonight? Small wins tend to make the rest feel lighter."
+    ),
+}
+
+# Raw Gemini output before sanitising: smart quotes, dashes, accents, emoji.
+RAW_REPLIES = [
+    "That’s completely understandable — exams can feel like a lot…",
+    "“One step at a time” is a good motto; maybe grab a café break first? \U0001f60a",
+    REPLIES["long"].replace(", ", " – ") + " \U0001f499\U0001f499",
+]
+
+logger = logging.getLogger("aasha.bench")
+
+
+# ─── Measurement ──────────────────────────────────────────────────────────────
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> tuple[list[float], object]:
+    """Run fn warmup + repeat times; return the timed durations and the last result."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    times = []
+    for _ in range(repeat):
+        t0     = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return times, result
+
+
+def summarise(times: list[float]) -> dict:
+    ordered = sorted(times)
+    return {
+        "n":        len(times),
+        "median_s": statistics.median(ordered),
+        "p90_s":    ordered[min(int(len(ordered) * 0.9), len(ordered) - 1)],
+        "mean_s":   statistics.fmean(ordered),
+    }
+
+
+def record(results: list[dict], bench: str, params: dict, times: list[float], **extra) -> dict:
+    entry = {"bench": bench, "params": params, **summarise(times), **extra}
+    results.append(entry)
+    shown = "  ".join(f"{k}={v}" for k, v in params.items())
+    more  = "  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in extra.items())
+    print(f"{bench:<9} {shown:<60} median={entry['median_s'] * 1000:10.3f} ms  {more}")
+    return entry
+
+
+def _words(text: str) -> list[str]:
+    return "".join(c for c in text.lower() if c.isalnum() or c.isspace()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance over the reference length."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return float(bool(hyp))
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1] / len(ref)
+
+
+def _csv(value: str, cast=str) -> list:
+    return [cast(v) for v in value.split(",") if v]
+
+
+# ─── Benchmarks ───────────────────────────────────────────────────────────────
+
+def bench_sanitize(args, results: list[dict]) -> None:
+    for i, text in enumerate(RAW_REPLIES):
+        times, _ = measure(lambda: main._sanitize_for_tts(text), args.repeat * 100)
+        record(results, "sanitize", {"text": i, "chars": len(text)}, times)
+
+
+def _speech_band_pcm(seconds: float) -> bytes:
+    """Deterministic noise shaped roughly like speech, for the encoder."""
+    rng   = np.random.default_rng(0)
+    noise = rng.standard_normal(int(seconds * SAMPLE_RATE)).astype(np.float32)
+    shaped = np.convolve(noise, np.hanning(24) / 12, mode="same")
+    t      = np.arange(len(shaped)) / SAMPLE_RATE
+    shaped *= 0.3 * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    return (np.clip(shaped, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def bench_opus(args, results: list[dict]) -> None:
+    for seconds in (1.0, 5.0, 15.0):
+        pcm = _speech_band_pcm(seconds)
+        for reuse in (False, True):
+            encoder  = main.new_opus_encoder() if reuse else None
+            times, packets = measure(lambda: main.encode_pcm_to_opus(pcm, encoder), args.repeat)
+            record(
+                results, "opus", {"audio_s": seconds, "reused_encoder": reuse}, times,
+                x_realtime=seconds / statistics.median(times),
+                kbps=sum(len(p) for p in packets) * 8 / seconds / 1000,
+            )
+
+
+def _load_silero() -> None:
+    if main.silero_model is None:
+        main.silero_model, main.silero_sample_rate = main.load_silero()
+
+
+def bench_tts(args, results: list[dict]) -> None:
+    _load_silero()
+    for threads in args.torch_threads:
+        main.torch.set_num_threads(threads)
+        for length, text in REPLIES.items():
+            times, pcm = measure(lambda: main._run_silero_tts(text), args.repeat)
+            audio_s = len(pcm) / (SAMPLE_RATE * 2)
+            record(
+                results, "tts", {"reply": length, "torch_threads": threads}, times,
+                audio_s=audio_s, rtf=statistics.median(times) / max(audio_s, 1e-3),
+            )
+
+
+def load_corpus(path: str | None) -> list[tuple[str, bytes, str]]:
+    """[(name, 24 kHz PCM, reference text)] from a directory, or synthesised."""
+    if path is None:
+        _load_silero()
+        main.torch.set_num_threads(main.TTS_CPU_THREADS)
+        return [(f"tts-{i}", main._run_silero_tts(text), text) for i, text in enumerate(UTTERANCES)]
+
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        stem, ext = os.path.splitext(name)
+        ref = os.path.join(path, f"{stem}.txt")
+        if ext == ".txt" or not os.path.exists(ref):
+            continue
+        audio, rate = sf.read(os.path.join(path, name), dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+        if rate != SAMPLE_RATE:
+            t_out = np.arange(int(len(audio) * SAMPLE_RATE / rate)) / SAMPLE_RATE
+            audio = np.interp(t_out, np.arange(len(audio)) / rate, audio)
+        with open(ref) as f:
+            corpus.append((stem, (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes(), f.read().strip()))
+    if not corpus:
+        raise SystemExit(f"no clips with .txt references in {path}")
+    return corpus
+
+
+def bench_stt(args, results: list[dict]) -> None:
+    corpus = load_corpus(args.corpus)
+    for model_size in args.whisper_models:
+        for compute_type in args.compute_types:
+            for threads in args.stt_threads:
+                t0 = time.perf_counter()
+                main.whisper_model = main.load_whisper(model_size, compute_type, threads)
+                load_s = time.perf_counter() - t0
+                for beam in args.beam_sizes:
+                    main.WHISPER_BEAM_SIZE = beam
+                    times, errors, audio_s = [], [], 0.0
+                    for name, pcm, reference in corpus:
+                        clip_times, text = measure(lambda: main._run_whisper(pcm), args.repeat)
+                        times  += clip_times
+                        errors.append(word_error_rate(reference, text))
+                        audio_s += len(pcm) / (SAMPLE_RATE * 2)
+                        logger.info("  %s: %r", name, text)
+                    record(
+                        results, "stt",
+                        {"model": model_size, "compute_type": compute_type, "beam_size": beam, "cpu_threads": threads},
+                        times,
+                        rtf=sum(times) / (audio_s * args.repeat),
+                        wer=statistics.fmean(errors),
+                        load_s=load_s,
+                    )
+    main.whisper_model = None
+
+
+BENCHES = {
+    "sanitize": bench_sanitize,
+    "opus":     bench_opus,
+    "tts":      bench_tts,
+    "stt":      bench_stt,
+}
+
+
+# ─── Baselines ────────────────────────────────────────────────────────────────
+
+def _key(entry: dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(entry["params"].items()))
+    return f"{entry['bench']}[{params}]"
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float, wer_tolerance: float) -> list[str]:
+    """Describe every configuration that got slower (or less accurate) than the baseline."""
+    previous = {_key(e): e for e in baseline}
+    regressions = []
+    print(f"\n{'configuration':<80}{'baseline':>12}{'now':>12}{'change':>9}")
+    for entry in results:
+        old = previous.get(_key(entry))
+        if old is None:
+            continue
+        change = entry["median_s"] / old["median_s"] - 1 if old["median_s"] else 0.0
+        flag   = ""
+        if change > tolerance:
+            flag = "  SLOWER"
+            regressions.append(f"{_key(entry)}: median {change:+.0%}")
+        if "wer" in entry and "wer" in old and entry["wer"] > old["wer"] + wer_tolerance:
+            flag += "  LESS ACCURATE"
+            regressions.append(f"{_key(entry)}: WER {old['wer']:.3f} -> {entry['wer']:.3f}")
+        print(f"{_key(entry):<80}{old['median_s'] * 1000:>10.3f}ms{entry['median_s'] * 1000:>10.3f}ms{change:>+9.0%}{flag}")
+    return regressions
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("benches", nargs="*", default=list(BENCHES), choices=list(BENCHES), metavar="bench",
+                   help=f"which to run: {', '.join(BENCHES)} (default: all)")
+    p.add_argument("--repeat", type=int, default=5, help="timed runs per configuration (after one warm-up)")
+    p.add_argument("--corpus", help="directory of clips with .txt references for STT")
+    p.add_argument("--whisper-models", type=_csv, default=[main.WHISPER_MODEL], help="comma-separated, e.g. medium.en,small.en")
+    p.add_argument("--compute-types", type=_csv, default=[main.WHISPER_COMPUTE_TYPE], help="e.g. int8,int8_float32,float32")
+    p.add_argument("--beam-sizes", type=lambda v: _csv(v, int), default=[main.WHISPER_BEAM_SIZE], help="e.g. 1,5")
+    p.add_argument("--stt-threads", type=lambda v: _csv(v, int), default=[main.STT_CPU_THREADS], help="Whisper cpu_threads values")
+    p.add_argument("--torch-threads", type=lambda v: _csv(v, int), default=[main.TTS_CPU_THREADS], help="torch thread counts for TTS")
+    p.add_argument("--out", default="bench_results.json", help="where to write this run's results")
+    p.add_argument("--baseline", help="results file to compare against")
+    p.add_argument("--save-baseline", help="also write this run to this baseline file")
+    p.add_argument("--tolerance", type=float, default=0.10, help="allowed median slowdown (0.10 = 10%%)")
+    p.add_argument("--wer-tolerance", type=float, default=0.02, help="allowed absolute WER increase")
+    p.add_argument("-v", "--verbose", action="store_true")
+    return p.parse_args(argv)
+
+
+def main_cli(argv=None) -> int:
+    args = parse_args(argv)
+    logging.getLogger("aasha").setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    results: list[dict] = []
+    for name in dict.fromkeys(args.benches):
+        BENCHES[name](args, results)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "platform": platform.platform(),
+            "python":   platform.python_version(),
+            "cpus":     os.cpu_count(),
+        },
+        "results": results,
+    }
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.wer_tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
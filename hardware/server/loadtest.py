@@ -0,0 +1,406 @@
+"""
+Load generator for the ESP32 WebSocket protocol.
+
+Simulates a fleet of N devices against the "/" endpoint of main.py.  Each
+client streams an utterance as 24 kHz 16-bit PCM in firmware-sized chunks
+at real-time pace (followed by the trailing silence the firmware's own VAD
+sends before it gives up), sends end_of_speech and consumes the reply,
+decoding the Opus packets when opuslib and libopus are available.  Per turn
+it measures:
+
+  ttfa    end_of_speech → first audio packet
+  turn    end_of_speech → RESPONSE.COMPLETE
+  stalls  gaps in a simulated playback buffer that starts --prebuffer-ms
+          after the first packet: each packet that arrives after the device
+          would have had to play it adds to the stall time.
+
+With --serve the server is started in-process with Gemini replaced by a
+stub (fixed reply, configurable latency) and, optionally, Whisper and Silero
+replaced by sleeps at a configurable real-time factor, so the whole
+pipeline — pools, batching, admission, pacing — is exercised offline:
+
+    python loadtest.py --serve --stub-stt --stub-tts --clients 16 --turns 3
+    python loadtest.py --url ws://10.0.0.5:8000/ --clients 4 --audio hello.wav
+
+--json writes every turn and the summary to a file for regression tracking.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+
+import numpy as np
+import soundfile as sf
+import websockets
+
+SAMPLE_RATE = 24000
+FRAME_S     = 0.020
+
+logger = logging.getLogger("aasha.loadtest")
+
+
+# ─── Input audio ──────────────────────────────────────────────────────────────
+
+def load_pcm(path: str | None, seconds: float = 2.5) -> bytes:
+    """
+    16-bit mono 24 kHz PCM from a sound file, or a synthetic utterance.
+
+    The synthetic one is a voiced, syllable-modulated tone loud enough for
+    the server's energy VAD; real recordings are resampled if needed.
+    """
+    if path:
+        audio, rate = sf.read(path, dtype="float32", always_2d=True)
+        audio = audio.mean(axis=1)
+        if rate != SAMPLE_RATE:
+            t_in  = np.arange(len(audio)) / rate
+            t_out = np.arange(int(len(audio) * SAMPLE_RATE / rate)) / SAMPLE_RATE
+            audio = np.interp(t_out, t_in, audio).astype(np.float32)
+    else:
+        t     = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        voice = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6))
+        audio = 0.25 * voice * (0.55 + 0.45 * np.sin(2 * np.pi * 4 * t))
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+# ─── Client ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class TurnResult:
+    client: int
+    turn: int
+    outcome: str = "timeout"        # complete | overloaded | notice | error | timeout | closed
+    ttfa_s: float | None = None
+    turn_s: float | None = None
+    packets: int = 0
+    opus_bytes: int = 0
+    audio_s: float = 0.0
+    stall_s: float = 0.0
+    stalls: int = 0
+    max_gap_s: float = 0.0
+    transcript: str = ""
+    reply: str = ""
+    arrivals: list[float] = field(default_factory=list, repr=False)
+
+
+def playback_stalls(arrivals: list[float], prebuffer_s: float) -> tuple[float, int, float]:
+    """(stall seconds, stall count, largest inter-packet gap) for 20 ms packets."""
+    if not arrivals:
+        return 0.0, 0, 0.0
+    clock = arrivals[0] + prebuffer_s       # when the next packet is due to play
+    stall, count = 0.0, 0
+    for t in arrivals:
+        if t > clock:
+            stall += t - clock
+            count += 1
+            clock  = t
+        clock += FRAME_S
+    max_gap = max((b - a for a, b in zip(arrivals, arrivals[1:])), default=0.0)
+    return stall, count, max_gap
+
+
+def _new_decoder():
+    """An Opus decoder, or None if opuslib/libopus is not usable here."""
+    try:
+        import opuslib
+        return opuslib.Decoder(SAMPLE_RATE, 1)
+    except Exception:
+        return None
+
+
+async def run_turn(ws, client: int, turn: int, pcm: bytes, args) -> TurnResult:
+    result  = TurnResult(client, turn)
+    chunk   = int(args.chunk_ms * SAMPLE_RATE / 1000) * 2
+    silence = bytes(int(args.tail_silence_ms * SAMPLE_RATE / 1000) * 2)
+    audio   = pcm + silence
+
+    # Stream at real time, as the microphone produces it.
+    start = time.monotonic()
+    for i, offset in enumerate(range(0, len(audio), chunk)):
+        await ws.send(audio[offset : offset + chunk])
+        delay = start + (i + 1) * args.chunk_ms / 1000 - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    await ws.send(json.dumps({"type": "instruction", "msg": "end_of_speech"}))
+    end_of_speech = time.monotonic()
+
+    decoder  = _new_decoder() if args.decode else None
+    deadline = end_of_speech + args.timeout
+    try:
+        while True:
+            message = await asyncio.wait_for(ws.recv(), max(deadline - time.monotonic(), 0.001))
+            now = time.monotonic()
+            if isinstance(message, bytes):
+                if result.ttfa_s is None:
+                    result.ttfa_s = now - end_of_speech
+                result.arrivals.append(now)
+                result.packets    += 1
+                result.opus_bytes += len(message)
+                if decoder is not None:
+                    result.audio_s += len(decoder.decode(message, 480)) / (2 * SAMPLE_RATE)
+                continue
+            data = json.loads(message)
+            kind, msg = data.get("type"), data.get("msg", "")
+            if kind == "transcript":
+                result.transcript = msg
+            elif kind == "response":
+                result.reply = msg
+            elif kind in ("overloaded", "notice", "error"):
+                result.outcome = kind
+            elif kind == "server" and msg == "RESPONSE.COMPLETE":
+                result.turn_s = now - end_of_speech
+                if result.outcome == "timeout":
+                    result.outcome = "complete"
+                break
+    except asyncio.TimeoutError:
+        logger.warning("client %d turn %d: no RESPONSE.COMPLETE within %.0f s", client, turn, args.timeout)
+    except websockets.ConnectionClosed:
+        result.outcome = "closed"
+
+    if decoder is None:
+        result.audio_s = result.packets * FRAME_S
+    result.stall_s, result.stalls, result.max_gap_s = playback_stalls(
+        result.arrivals, args.prebuffer_ms / 1000,
+    )
+    return result
+
+
+async def run_client(client: int, url: str, pcm: bytes, args, results: list[TurnResult]) -> None:
+    # Spread connections out so the fleet does not speak in lockstep.
+    await asyncio.sleep(client * args.ramp_s / max(args.clients, 1))
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            for turn in range(args.turns):
+                if turn:
+                    await asyncio.sleep(args.think_s)
+                result = await run_turn(ws, client, turn, pcm, args)
+                results.append(result)
+                logger.info(
+                    "client %3d turn %d  %-10s  ttfa=%s  turn=%s  packets=%d  stall=%.0f ms",
+                    client, turn, result.outcome,
+                    f"{result.ttfa_s:.2f} s" if result.ttfa_s is not None else "-",
+                    f"{result.turn_s:.2f} s" if result.turn_s is not None else "-",
+                    result.packets, result.stall_s * 1000,
+                )
+                if result.outcome in ("closed", "timeout"):
+                    break
+    except (OSError, websockets.WebSocketException) as exc:
+        logger.error("client %d: connection failed: %s", client, exc)
+        results.append(TurnResult(client, 0, outcome="closed"))
+
+
+# ─── Summary ──────────────────────────────────────────────────────────────────
+
+def _pct(values: list[float], pct: float) -> float | None:
+    return float(np.percentile(values, pct)) if values else None
+
+
+def summarise(results: list[TurnResult], wall_s: float) -> dict:
+    outcomes: dict[str, int] = {}
+    for r in results:
+        outcomes[r.outcome] = outcomes.get(r.outcome, 0) + 1
+    done = [r for r in results if r.outcome == "complete"]
+    summary = {
+        "turns":         len(results),
+        "outcomes":      outcomes,
+        "wall_s":        round(wall_s, 2),
+        "turns_per_s":   round(len(done) / wall_s, 3) if wall_s else 0.0,
+        "stalled_turns": sum(1 for r in done if r.stalls),
+    }
+    series = {
+        "ttfa_s":    [r.ttfa_s for r in done if r.ttfa_s is not None],
+        "turn_s":    [r.turn_s for r in done if r.turn_s is not None],
+        "stall_s":   [r.stall_s for r in done],
+        "max_gap_s": [r.max_gap_s for r in done],
+        "audio_s":   [r.audio_s for r in done],
+    }
+    for name, values in series.items():
+        summary[name] = {
+            "p50": _pct(values, 50),
+            "p95": _pct(values, 95),
+            "p99": _pct(values, 99),
+            "max": max(values, default=None),
+        }
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    print()
+    print(f"turns={summary['turns']}  outcomes={summary['outcomes']}  "
+          f"wall={summary['wall_s']} s  throughput={summary['turns_per_s']} turns/s  "
+          f"stalled_turns={summary['stalled_turns']}")
+    print(f"{'metric':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name in ("ttfa_s", "turn_s", "stall_s", "max_gap_s", "audio_s"):
+        row = summary[name]
+        cells = "".join(f"{row[k]:>10.3f}" if row[k] is not None else f"{'-':>10}" for k in ("p50", "p95", "p99", "max"))
+        print(f"{name:<12}{cells}")
+
+
+# ─── Stubbed in-process server ────────────────────────────────────────────────
+
+class _StubModels:
+    """Stands in for genai.Client().aio.models with a fixed, delayed reply."""
+
+    def __init__(self, reply: str, first_s: float, chunk_s: float):
+        self.reply   = reply
+        self.first_s = first_s
+        self.chunk_s = chunk_s
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.first_s + self.chunk_s * len(self.reply.split()) / 8)
+        return SimpleNamespace(text=self.reply)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        words  = self.reply.split()
+        pieces = [" ".join(words[i : i + 8]) + " " for i in range(0, len(words), 8)]
+
+        async def stream():
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(self.first_s if i == 0 else self.chunk_s)
+                yield SimpleNamespace(text=piece)
+        return stream()
+
+
+def _stub_whisper(args):
+    def run(audio) -> str:
+        time.sleep(len(audio) / (2 * SAMPLE_RATE) * args.stt_rtf)
+        return args.transcript
+
+    def run_batch(batch) -> list[str]:
+        return [run(audio) for audio in batch]
+    return run, run_batch
+
+
+def _stub_silero(args):
+    def run(text: str) -> bytes:
+        seconds = max(len(text) / 15.0, 0.3)          # ~15 characters of speech per second
+        time.sleep(seconds * args.tts_rtf)
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        return (0.1 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16).tobytes()
+    return run
+
+
+async def start_stub_server(args):
+    """Import main with stubs patched in and serve it on 127.0.0.1:args.port."""
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ.setdefault("RECORD_AUDIO", "0")
+    os.environ.setdefault("RECORD_TTS_AUDIO", "0")
+    if args.stub_stt:
+        os.environ["STT_WORKER_PROCESSES"] = "0"
+    if args.stub_tts:
+        os.environ["TTS_WORKER_PROCESSES"] = "0"
+    import uvicorn
+
+    import main
+
+    if not args.verbose:
+        logging.getLogger("aasha").setLevel(logging.WARNING)
+    main._gemini_client = SimpleNamespace(
+        aio=SimpleNamespace(models=_StubModels(args.reply, args.llm_first_ms / 1000, args.llm_chunk_ms / 1000)),
+    )
+    if args.stub_stt:
+        main.load_whisper = lambda: None
+        main._run_whisper, main._run_whisper_batch = _stub_whisper(args)
+    if args.stub_tts:
+        main.load_silero = lambda: (None, main.SERVER_SAMPLE_RATE)
+        main._run_silero_tts = _stub_silero(args)
+
+    server = uvicorn.Server(uvicorn.Config(
+        main.app, host="127.0.0.1", port=args.port, log_level="warning", ws_max_size=16 * 1024 * 1024,
+    ))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+            raise RuntimeError("stub server exited during startup")
+        await asyncio.sleep(0.05)
+    # Let the canned clip bank finish so it does not compete with turn one.
+    await asyncio.wait_for(main.app.state.clip_task, 60)
+    return server, task, main
+
+
+# ─── Main ─────────────────────────────────────────────────────────────────────
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url", default="ws://127.0.0.1:8000/", help="server to load (ignored with --serve)")
+    p.add_argument("--clients", type=int, default=8, help="concurrent simulated devices")
+    p.add_argument("--turns", type=int, default=3, help="utterances per device")
+    p.add_argument("--think-s", type=float, default=1.0, help="pause between a reply and the next utterance")
+    p.add_argument("--ramp-s", type=float, default=2.0, help="spread client start times over this window")
+    p.add_argument("--audio", help="utterance to send (any soundfile format); default is synthetic")
+    p.add_argument("--chunk-ms", type=float, default=32.0, help="PCM per WebSocket frame (firmware: one WakeNet chunk)")
+    p.add_argument("--tail-silence-ms", type=float, default=1000.0, help="silence streamed before end_of_speech")
+    p.add_argument("--prebuffer-ms", type=float, default=200.0, help="client playback buffer before the first frame plays")
+    p.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for RESPONSE.COMPLETE")
+    p.add_argument("--no-decode", dest="decode", action="store_false", help="do not decode the received Opus")
+    p.add_argument("--json", help="write per-turn results and the summary here")
+    p.add_argument("-v", "--verbose", action="store_true")
+
+    s = p.add_argument_group("stubbed server (--serve)")
+    s.add_argument("--serve", action="store_true", help="run main.py in-process with a stub Gemini client")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--stub-stt", action="store_true", help="replace Whisper with a sleep")
+    s.add_argument("--stub-tts", action="store_true", help="replace Silero with a sleep and a tone")
+    s.add_argument("--stt-rtf", type=float, default=0.15, help="stub Whisper seconds per second of audio")
+    s.add_argument("--tts-rtf", type=float, default=0.3, help="stub Silero seconds per second of speech")
+    s.add_argument("--llm-first-ms", type=float, default=600.0, help="stub Gemini delay before the first text")
+    s.add_argument("--llm-chunk-ms", type=float, default=120.0, help="stub Gemini delay between streamed chunks")
+    s.add_argument("--transcript", default="I have been feeling really stressed about my exams this week.")
+    s.add_argument("--reply", default=(
+        "That sounds like a lot to carry, and it makes sense that you feel stressed. "
+        "Exams can feel overwhelming when everything lands at once. "
+        "Would it help to pick one small thing you can do tonight?"
+    ))
+    return p.parse_args(argv)
+
+
+async def amain(args) -> dict:
+    pcm = load_pcm(args.audio)
+    server = task = None
+    url = args.url
+    if args.serve:
+        server, task, _ = await start_stub_server(args)
+        url = f"ws://127.0.0.1:{args.port}/"
+
+    results: list[TurnResult] = []
+    t0 = time.monotonic()
+    try:
+        await asyncio.gather(*(run_client(i, url, pcm, args, results) for i in range(args.clients)))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await task
+    summary = summarise(results, time.monotonic() - t0)
+    print_summary(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "args":    {k: v for k, v in vars(args).items()},
+                "summary": summary,
+                "turns":   [{k: v for k, v in asdict(r).items() if k != "arrivals"} for r in results],
+            }, f, indent=2)
+    return summary
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s  %(levelname)-8s  %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    if args.verbose:
+        logger.setLevel(logging.INFO)
+    summary = asyncio.run(amain(args))
+    return 0 if summary["outcomes"].get("complete") == summary["turns"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,38 +4,59 @@ AashaAI hardware server — WebSocket voice pipeline.
 Protocol (ESP32 ↔ server):
   ESP32  → server : binary  — raw PCM chunks (16-bit, 24 kHz, mono)
   ESP32  → server : text    — {"type":"instruction","msg":"end_of_speech"}
+  ESP32  → server : text    — {"type":"instruction","msg":"cancel"}
+  ESP32  → server : text    — {"type":"instruction","msg":"buffer_level","ms":<n>}
   server → ESP32  : text    — {"type":"server",     "msg":"RESPONSE.CREATED"}
   server → ESP32  : text    — {"type":"transcript", "msg":"<text>"}
+  server → ESP32  : text    — {"type":"response_partial","msg":"<sentence>"}
   server → ESP32  : text    — {"type":"response",   "msg":"<text>"}
   server → ESP32  : binary  — Opus-encoded audio packets (one per frame)
   server → ESP32  : text    — {"type":"server",     "msg":"RESPONSE.COMPLETE"}
+  server → ESP32  : text    — {"type":"server",     "msg":"RESPONSE.CANCELLED"}  (barge-in)
+  server → ESP32  : text    — {"type":"notice",     "msg":"<reason>"}  (canned clip follows)
+  server → ESP32  : text    — {"type":"overloaded", "msg":"<reason>","retry_after_ms":<n>}
   server → ESP32  : text    — {"type":"error",      "msg":"<reason>"}
 """
 
 import asyncio
+import bisect
 import io
 import json
 import logging
 import os
+import re
 import time
-import wave
-from contextlib import asynccontextmanager
-from datetime import datetime
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from contextlib import aclosing, asynccontextmanager
 
 import httpx
 import numpy as np
-import opuslib
 import soundfile as sf
 import torch
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import StreamingResponse
-from faster_whisper import WhisperModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper.vad import VadOptions, get_speech_timestamps
 from google import genai
 from google.genai import types
 
+import model_workers
+from admission import AdmissionController, Overloaded
+from batching import MicroBatcher
+from memory import ConversationMemory, Turn
+from metrics import DRIFT_BUCKETS, RTF_BUCKETS, Registry, enable_tracing, record_span, span
+from opus_stream import OpusStreamEncoder
+from pacer import PacedSender, PacedStream
+from pcm_buffer import PCMBuffer, PCMData
+from recorder import AudioRecorder
+from response_cache import CachedReply, ResponseCache
+from streaming_stt import SpeechDetector, StreamingTranscriber
+from tts_cache import TTSCache, normalise_text
+from workers import InferencePool, PoolBusy
+
 load_dotenv()
 
 # ─── Logging ──────────────────────────────────────────────────────────────────
@@ -69,6 +90,149 @@ FRAME_DURATION_S    = OPUS_FRAME_MS / 1000.0
 FRAME_PACING_FACTOR = 0.90
 FRAME_PACING_S      = FRAME_DURATION_S * FRAME_PACING_FACTOR
 
+# Opus encoder settings; 0 / -1 keep the libopus defaults.  Each WebSocket
+# session keeps one encoder for all of its replies.
+OPUS_BITRATE    = int(os.getenv("OPUS_BITRATE", 0))
+OPUS_COMPLEXITY = int(os.getenv("OPUS_COMPLEXITY", -1))
+OPUS_DTX        = os.getenv("OPUS_DTX", "0") == "1"
+
+# Output pacing: one scheduler task paces every session's packets, sending
+# up to OPUS_SEND_BURST frames per stream per wakeup (tick = burst × pace).
+OPUS_SEND_BURST = int(os.getenv("OPUS_SEND_BURST", 1))
+
+# Full duplex: with BARGE_IN, new speech or a new instruction from the device
+# cancels the reply being generated / streamed.  Devices may report their
+# playback buffer; the pace then steers it towards CLIENT_BUFFER_TARGET_MS.
+BARGE_IN                = os.getenv("BARGE_IN", "1") == "1"
+CLIENT_BUFFER_TARGET_MS = float(os.getenv("CLIENT_BUFFER_TARGET_MS", 400))
+
+# Sentence-streamed TTS: replies are cut into chunks of at most
+# TTS_CHUNK_MAX_CHARS and synthesised in order, at most TTS_LOOKAHEAD_CHUNKS
+# ahead of the packet currently being paced out.
+TTS_CHUNK_MAX_CHARS  = int(os.getenv("TTS_CHUNK_MAX_CHARS", 160))
+TTS_CHUNK_MIN_CHARS  = int(os.getenv("TTS_CHUNK_MIN_CHARS", 20))
+TTS_LOOKAHEAD_CHUNKS = int(os.getenv("TTS_LOOKAHEAD_CHUNKS", 2))
+
+# Streaming LLM: when enabled, the WebSocket path consumes Gemini's streamed
+# reply and hands each completed sentence to TTS while later tokens arrive.
+LLM_MODEL     = "gemini-2.5-flash"
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+
+# Whisper model: size, CTranslate2 compute type and decoding beam width
+# (bench.py measures the latency/accuracy trade-off between settings).
+WHISPER_MODEL        = os.getenv("WHISPER_MODEL", "medium.en")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_BEAM_SIZE    = int(os.getenv("WHISPER_BEAM_SIZE", 5))
+
+# Silence handling shared by the single and batched STT paths: the Silero VAD
+# gate in front of Whisper, and the no-speech rule WhisperModel.transcribe
+# uses to drop segments Whisper itself judges silent (its default thresholds).
+WHISPER_VAD            = VadOptions(min_silence_duration_ms=300)
+WHISPER_NO_SPEECH_PROB = 0.6
+WHISPER_MIN_LOG_PROB   = -1.0
+
+# Streaming STT: finished speech segments are transcribed in the background
+# while the user is still talking.  VAD_ENDPOINT_MS > 0 also lets the server
+# end an utterance by itself after that much silence following speech.
+STREAMING_STT          = os.getenv("STREAMING_STT", "1") == "1"
+STT_SEGMENT_SILENCE_MS = int(os.getenv("STT_SEGMENT_SILENCE_MS", 600))
+VAD_ENDPOINT_MS        = int(os.getenv("VAD_ENDPOINT_MS", 0))
+
+# PCM ingest: each session records into one preallocated buffer (grown as
+# needed) and audio past STT_MAX_UTTERANCE_S is dropped.
+STT_MAX_UTTERANCE_S    = float(os.getenv("STT_MAX_UTTERANCE_S", 60))
+PCM_MAX_BYTES          = int(STT_MAX_UTTERANCE_S * SERVER_SAMPLE_RATE) * 2
+PCM_INITIAL_BYTES      = 5 * SERVER_SAMPLE_RATE * 2
+
+# Inference pools: STT, TTS and audio I/O each get a dedicated executor with
+# a max in-flight count and a bounded admission queue.  Model thread counts
+# default to an even split of the cores across the STT and TTS slots so the
+# pools never oversubscribe the CPU between them.
+#
+# STT_WORKER_PROCESSES / TTS_WORKER_PROCESSES > 0 move that stage into a pool
+# of model-serving processes (one loaded model each, see model_workers) and
+# take precedence over the in-process *_MAX_INFLIGHT thread counts.
+CPU_COUNT              = os.cpu_count() or 1
+STT_WORKER_PROCESSES   = int(os.getenv("STT_WORKER_PROCESSES", 0))
+TTS_WORKER_PROCESSES   = int(os.getenv("TTS_WORKER_PROCESSES", 0))
+STT_MAX_INFLIGHT       = STT_WORKER_PROCESSES or int(os.getenv("STT_MAX_INFLIGHT", 1))
+TTS_MAX_INFLIGHT       = TTS_WORKER_PROCESSES or int(os.getenv("TTS_MAX_INFLIGHT", 1))
+AUDIO_IO_MAX_INFLIGHT  = int(os.getenv("AUDIO_IO_MAX_INFLIGHT", 2))
+STT_MAX_QUEUE          = int(os.getenv("STT_MAX_QUEUE", 32))
+TTS_MAX_QUEUE          = int(os.getenv("TTS_MAX_QUEUE", 64))
+AUDIO_IO_MAX_QUEUE     = int(os.getenv("AUDIO_IO_MAX_QUEUE", 0))
+_THREADS_PER_SLOT      = max(CPU_COUNT // (STT_MAX_INFLIGHT + TTS_MAX_INFLIGHT), 1)
+STT_CPU_THREADS        = int(os.getenv("STT_CPU_THREADS", _THREADS_PER_SLOT))
+TTS_CPU_THREADS        = int(os.getenv("TTS_CPU_THREADS", _THREADS_PER_SLOT))
+
+# Cross-session Whisper batching: utterances arriving within STT_BATCH_WAIT_MS
+# of each other (or while a batch is running) are decoded together, up to
+# STT_BATCH_SIZE at a time.  STT_BATCH_SIZE=1 disables the batcher.
+STT_BATCH_SIZE         = int(os.getenv("STT_BATCH_SIZE", 4))
+STT_BATCH_WAIT_MS      = float(os.getenv("STT_BATCH_WAIT_MS", 25))
+
+# TTS scheduling: sentences pending from all sessions (and from one long
+# reply) are grouped into pool jobs of up to TTS_BATCH_SIZE; repeated
+# sentences within a group are synthesised once.  TTS_BATCH_SIZE=1 disables it.
+TTS_BATCH_SIZE         = int(os.getenv("TTS_BATCH_SIZE", 4))
+TTS_BATCH_WAIT_MS      = float(os.getenv("TTS_BATCH_WAIT_MS", 10))
+
+# Phrase-level TTS cache: synthesised PCM + Opus packets per phrase, in an LRU
+# of TTS_CACHE_MAX_MB (0 disables).  TTS_CACHE_DIR adds an on-disk tier for
+# pinned phrases and phrases reused TTS_CACHE_DISK_MIN_HITS times.
+# TTS_CACHE_PREWARM pins the canned clips (see CANNED_CLIPS) in the cache.
+TTS_SPEAKER             = "en_0"
+TTS_CACHE_MAX_MB        = float(os.getenv("TTS_CACHE_MAX_MB", 64))
+TTS_CACHE_DIR           = os.getenv("TTS_CACHE_DIR", "")
+TTS_CACHE_DISK_MIN_HITS = int(os.getenv("TTS_CACHE_DISK_MIN_HITS", 2))
+TTS_CACHE_PREWARM       = os.getenv("TTS_CACHE_PREWARM", "1") == "1"
+
+# Admission control: at most ADMISSION_MAX_PIPELINES utterances in the
+# STT → LLM → TTS pipeline at once (0 = unlimited), the last
+# ADMISSION_CRISIS_RESERVE of them kept for sessions flagged as crisis
+# conversations.  Normal utterances are also shed once the estimated pool
+# queueing delay exceeds ADMISSION_MAX_QUEUE_MS; a shed utterance first
+# waits up to ADMISSION_DEFER_MS for room.
+ADMISSION_MAX_PIPELINES  = int(os.getenv("ADMISSION_MAX_PIPELINES", 8))
+ADMISSION_CRISIS_RESERVE = int(os.getenv("ADMISSION_CRISIS_RESERVE", 1))
+ADMISSION_MAX_QUEUE_MS   = float(os.getenv("ADMISSION_MAX_QUEUE_MS", 5000))
+ADMISSION_DEFER_MS       = float(os.getenv("ADMISSION_DEFER_MS", 1500))
+
+# Debug audio: mic utterances (RECORD_AUDIO) and synthesised replies
+# (RECORD_TTS_AUDIO) are written to temp/ by a background thread, keeping
+# 1 in RECORD_SAMPLE_EVERY clips as wav, flac or opus.  Clips older than
+# RECORD_MAX_AGE_H hours or past RECORD_MAX_MB in total are deleted.
+RECORD_AUDIO        = os.getenv("RECORD_AUDIO", "1") == "1"
+RECORD_TTS_AUDIO    = os.getenv("RECORD_TTS_AUDIO", "1") == "1"
+RECORD_SAMPLE_EVERY = int(os.getenv("RECORD_SAMPLE_EVERY", 1))
+RECORD_FORMAT       = os.getenv("RECORD_FORMAT", "wav")
+RECORD_MAX_MB       = float(os.getenv("RECORD_MAX_MB", 512))
+RECORD_MAX_AGE_H    = float(os.getenv("RECORD_MAX_AGE_H", 24))
+
+# Conversation memory (WebSocket sessions): the last MEMORY_KEEP_TURNS
+# exchanges always go to Gemini verbatim; once the history passes
+# MEMORY_MAX_TOKENS, older exchanges are folded in the background into a
+# summary of at most MEMORY_SUMMARY_TOKENS.  MEMORY_MAX_TOKENS=0 disables it.
+MEMORY_MAX_TOKENS     = int(os.getenv("MEMORY_MAX_TOKENS", 1500))
+MEMORY_KEEP_TURNS     = int(os.getenv("MEMORY_KEEP_TURNS", 4))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", 200))
+MEMORY_SUMMARY_MODEL  = os.getenv("MEMORY_SUMMARY_MODEL", LLM_MODEL)
+
+# Semantic response cache (opt-in): replies to utterances of at most
+# RESPONSE_CACHE_MAX_WORDS words are reused for RESPONSE_CACHE_TTL_S when a
+# new transcript matches exactly or with embedding similarity of at least
+# RESPONSE_CACHE_SIMILARITY (1.0 = exact matches only).
+RESPONSE_CACHE            = os.getenv("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_ENTRIES    = int(os.getenv("RESPONSE_CACHE_ENTRIES", 256))
+RESPONSE_CACHE_TTL_S      = float(os.getenv("RESPONSE_CACHE_TTL_S", 3600))
+RESPONSE_CACHE_MAX_WORDS  = int(os.getenv("RESPONSE_CACHE_MAX_WORDS", 6))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.85))
+
+# Observability: stage histograms are always served on /metrics; with
+# OTEL_TRACING (and opentelemetry installed) each utterance is also traced
+# as a span with one child span per stage.
+OTEL_TRACING = os.getenv("OTEL_TRACING", "0") == "1"
+
 # ─── System prompt ────────────────────────────────────────────────────────────
 SYSTEM_PROMPT = """You are a warm, empathetic voice companion for college students going
 through stress, anxiety, burnout, or difficult emotional times.
@@ -92,8 +256,40 @@ Do not output any emojis, asterisks, or characters that are not standard English
 Speak naturally, as you would in a real caring conversation.
 Always respond in English."""
 
+SUMMARY_PROMPT = """You maintain the running summary of a spoken conversation between a
+student and a supportive voice companion.  Merge the new exchanges into the
+existing summary.  Keep what the companion needs to continue the conversation
+with care: the student's situation and feelings, people and events they
+mentioned, what has already been suggested, and anything about self-harm or
+safety.  Write plain prose in the third person, at most 120 words."""
+
+# Fixed replies: synthesised once at startup into the canned clip bank and
+# streamed straight from memory on degraded paths.
+LLM_ERROR_REPLY = "Sorry, something went wrong."
+LLM_EMPTY_REPLY = "Sorry, I couldn't understand that."
+NO_SPEECH_REPLY = "Sorry, I didn't catch that. Could you say it again?"
+BUSY_REPLY      = "I'm getting a lot of requests right now. Please give me a moment and try again."
+CRISIS_REPLY    = (
+    "You don't have to go through this alone. Please call or text 988 to reach "
+    "the Suicide and Crisis Lifeline, or contact your campus counseling center right now."
+)
+CANNED_CLIPS = {
+    "llm_error": LLM_ERROR_REPLY,
+    "llm_empty": LLM_EMPTY_REPLY,
+    "no_speech": NO_SPEECH_REPLY,
+    "busy":      BUSY_REPLY,
+    "crisis":    CRISIS_REPLY,
+}
+
+# Phrases that mark an utterance as a possible crisis, mirroring the web
+# backend's safety keywords.
+_CRISIS_RE = re.compile(
+    r"\b(kill(ing)? myself|suicid\w*|end (it all|my life)|self[- ]harm|hurt(ing)? myself"
+    r"|(do not|don't|dont) want to (live|be alive|be here))\b",
+    re.IGNORECASE,
+)
+
 TEMP_DIR = os.path.join(os.path.dirname(__file__), "temp")
-os.makedirs(TEMP_DIR, exist_ok=True)
 
 # ─── Model globals ────────────────────────────────────────────────────────────
 whisper_model: WhisperModel = None
@@ -103,10 +299,20 @@ silero_sample_rate: int    = SERVER_SAMPLE_RATE
 
 # ─── Model loading ────────────────────────────────────────────────────────────
 
-def load_whisper() -> WhisperModel:
-    """Load the Faster-Whisper base.en model on CPU with int8 quantisation."""
-    logger.info("Loading Faster-Whisper model…")
-    model = WhisperModel("medium.en", device="cpu", compute_type="int8")
+def load_whisper(
+    model_size: str = WHISPER_MODEL,
+    compute_type: str = WHISPER_COMPUTE_TYPE,
+    cpu_threads: int = STT_CPU_THREADS,
+) -> WhisperModel:
+    """Load a Faster-Whisper model on CPU (medium.en, int8 by default)."""
+    logger.info("Loading Faster-Whisper model %s (%s)…", model_size, compute_type)
+    model = WhisperModel(
+        model_size,
+        device="cpu",
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=1 if STT_WORKER_PROCESSES else STT_MAX_INFLIGHT,
+    )
     logger.info("Faster-Whisper loaded.")
     return model
 
@@ -114,6 +320,7 @@ def load_whisper() -> WhisperModel:
 def load_silero():
     """Load the Silero v3 English TTS model from torch.hub."""
     logger.info("Loading Silero TTS model…")
+    torch.set_num_threads(TTS_CPU_THREADS)
     model, _ = torch.hub.load(
         repo_or_dir="snakers4/silero-models",
         model="silero_tts",
@@ -125,25 +332,118 @@ def load_silero():
     return model, SERVER_SAMPLE_RATE
 
 
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+# Served on /metrics in the Prometheus text format.  Stage timings are taken
+# as the pipeline sees them, pool queueing included; the per-pool wait and
+# run histograms split the two.  Gauges are read at scrape time.
+
+metrics = Registry()
+
+STT_SECONDS          = metrics.histogram("aasha_stt_seconds", "Whisper transcription of one segment or utterance, queueing included.")
+STT_TAIL_SECONDS     = metrics.histogram("aasha_stt_tail_seconds", "End of speech to final transcript.")
+LLM_SECONDS          = metrics.histogram("aasha_llm_seconds", "Gemini reply generation.", ["mode"])
+LLM_FIRST_SECONDS    = metrics.histogram("aasha_llm_first_sentence_seconds", "Streamed Gemini call to its first complete sentence.")
+TTS_SECONDS          = metrics.histogram("aasha_tts_seconds", "Silero synthesis of one chunk, queueing included.")
+TTS_RTF              = metrics.histogram("aasha_tts_rtf", "TTS time divided by the duration of the audio produced.", buckets=RTF_BUCKETS)
+OPUS_ENCODE_SECONDS  = metrics.histogram("aasha_opus_encode_seconds", "Opus encoding of one synthesised chunk.")
+FIRST_PACKET_SECONDS = metrics.histogram("aasha_time_to_first_packet_seconds", "End of speech to the first Opus packet sent.")
+PACING_DRIFT_SECONDS = metrics.histogram("aasha_pacing_drift_seconds", "Actual minus nominal streaming time of a reply's audio.", buckets=DRIFT_BUCKETS)
+UTTERANCE_SECONDS    = metrics.histogram("aasha_utterance_seconds", "End of speech to RESPONSE.COMPLETE.")
+POOL_WAIT_SECONDS    = metrics.histogram("aasha_pool_queue_wait_seconds", "Time a job waited for a pool slot.", ["pool"])
+POOL_RUN_SECONDS     = metrics.histogram("aasha_pool_run_seconds", "Time a job held a pool slot.", ["pool"])
+UTTERANCES           = metrics.counter("aasha_utterances_total", "WebSocket utterances by outcome.", ["outcome"])
+SESSIONS             = metrics.gauge("aasha_sessions", "Open WebSocket sessions.")
+
+metrics.gauge(
+    "aasha_pool_in_flight", "Jobs running on each pool.", ["pool"],
+    collect=lambda: {(p.name,): p.in_flight for p in INFERENCE_POOLS},
+)
+metrics.gauge(
+    "aasha_pool_queued", "Jobs waiting for a slot on each pool.", ["pool"],
+    collect=lambda: {(p.name,): p.queued for p in INFERENCE_POOLS},
+)
+metrics.gauge(
+    "aasha_pool_saturation", "Running jobs as a fraction of each pool's slots.", ["pool"],
+    collect=lambda: {(p.name,): p.in_flight / p.max_in_flight for p in INFERENCE_POOLS},
+)
+metrics.counter(
+    "aasha_pool_rejected_total", "Jobs turned away by a full pool queue.", ["pool"],
+    collect=lambda: {(p.name,): p.rejected for p in INFERENCE_POOLS},
+)
+metrics.gauge(
+    "aasha_pipelines_in_flight", "Utterances admitted and not yet finished.",
+    collect=lambda: {(): admission.in_flight},
+)
+
+
+# ─── Inference pools ─────────────────────────────────────────────────────────
+
+def _pool_metrics(name: str) -> dict:
+    return {
+        "on_wait": POOL_WAIT_SECONDS.labels(name).observe,
+        "on_run":  POOL_RUN_SECONDS.labels(name).observe,
+    }
+
+
+stt_pool      = InferencePool(
+    "stt", STT_MAX_INFLIGHT, STT_MAX_QUEUE,
+    executor_factory=model_workers.executor_factory("stt") if STT_WORKER_PROCESSES else None,
+    **_pool_metrics("stt"),
+)
+tts_pool      = InferencePool(
+    "tts", TTS_MAX_INFLIGHT, TTS_MAX_QUEUE,
+    executor_factory=model_workers.executor_factory("tts") if TTS_WORKER_PROCESSES else None,
+    **_pool_metrics("tts"),
+)
+audio_io_pool = InferencePool(
+    "audio-io", AUDIO_IO_MAX_INFLIGHT, AUDIO_IO_MAX_QUEUE, **_pool_metrics("audio-io"),
+)
+INFERENCE_POOLS = (stt_pool, tts_pool, audio_io_pool)
+
+
 # ─── Lifespan ────────────────────────────────────────────────────────────────
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Load models and create shared HTTP client on startup; clean up on shutdown."""
+    """Load models (or spawn model workers) and the shared HTTP client; clean up on shutdown."""
     global whisper_model, silero_model, silero_sample_rate
 
     loop = asyncio.get_event_loop()
-    whisper_model                    = await loop.run_in_executor(None, load_whisper)
-    silero_model, silero_sample_rate = await loop.run_in_executor(None, load_silero)
+    if STT_WORKER_PROCESSES:
+        await model_workers.warm_up(stt_pool, STT_WORKER_PROCESSES)
+    else:
+        whisper_model = await loop.run_in_executor(None, load_whisper)
+    if TTS_WORKER_PROCESSES:
+        await model_workers.warm_up(tts_pool, TTS_WORKER_PROCESSES)
+    else:
+        silero_model, silero_sample_rate = await loop.run_in_executor(None, load_silero)
 
     app.state.http_client = httpx.AsyncClient(
         timeout=httpx.Timeout(60.0, connect=10.0),
         limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
     )
-    logger.info("Startup complete.")
+    app.state.clip_task = asyncio.create_task(build_clip_bank())
+    if OTEL_TRACING and not enable_tracing("aasha-hardware"):
+        logger.warning("OTEL_TRACING is set but opentelemetry is not installed — tracing disabled")
+
+    logger.info(
+        "Startup complete.  pools: stt=%d (threads=%d)  tts=%d (threads=%d)  audio-io=%d",
+        STT_MAX_INFLIGHT, STT_CPU_THREADS, TTS_MAX_INFLIGHT, TTS_CPU_THREADS,
+        AUDIO_IO_MAX_INFLIGHT,
+    )
+    logger.info(
+        "Admission: max_pipelines=%d  crisis_reserve=%d  max_queue=%.0f ms  defer=%.0f ms",
+        admission.max_pipelines, admission.crisis_reserve,
+        ADMISSION_MAX_QUEUE_MS, ADMISSION_DEFER_MS,
+    )
     yield
+    for batcher in (whisper_batcher, tts_batcher):
+        if batcher is not None:
+            await batcher.close()
     await app.state.http_client.aclose()
-    logger.info("Shutdown: HTTP client closed.")
+    for pool in INFERENCE_POOLS:
+        pool.shutdown()
+    logger.info("Shutdown: HTTP client closed, inference pools stopped.")
 
 
 # ─── App ──────────────────────────────────────────────────────────────────────
@@ -166,67 +466,68 @@ app.add_middleware(
 )
 
 
-# ─── Audio helpers ────────────────────────────────────────────────────────────
+# ─── Debug audio recorder ─────────────────────────────────────────────────────
 
-def save_audio_to_temp(
-    audio_bytes: bytes,
-    source: str = "ws",
-    sample_rate: int = SERVER_SAMPLE_RATE,
-    channels: int = 1,
-    sampwidth: int = 2,
-) -> str:
-    """Persist received PCM audio as a WAV file in temp/ for debugging."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filename  = f"{source}_{timestamp}.wav"
-    filepath  = os.path.join(TEMP_DIR, filename)
+recorder = AudioRecorder(
+    TEMP_DIR,
+    enabled=RECORD_AUDIO or RECORD_TTS_AUDIO,
+    sample_every=RECORD_SAMPLE_EVERY,
+    fmt=RECORD_FORMAT,
+    max_bytes=int(RECORD_MAX_MB * 1024 * 1024),
+    max_age_s=RECORD_MAX_AGE_H * 3600,
+)
+
+
+# ─── STT — Faster-Whisper ─────────────────────────────────────────────────────
+
+def _pcm_to_float32(audio_bytes: PCMData) -> np.ndarray:
+    """
+    Convert raw 24 kHz PCM (or a WAV blob) to mono float32 samples.
 
+    Raw PCM is read through an int16 view of the caller's buffer, so the
+    float32 array is the only allocation; only WAV uploads are decoded.
+    """
     is_wav = audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE"
-    if is_wav:
-        with open(filepath, "wb") as f:
-            f.write(audio_bytes)
-    else:
-        with wave.open(filepath, "wb") as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(sampwidth)
-            wf.setframerate(sample_rate)
-            wf.writeframes(audio_bytes)
+    if not is_wav:
+        usable   = len(audio_bytes) - len(audio_bytes) % 2
+        audio_np = np.frombuffer(audio_bytes, dtype=np.int16, count=usable // 2).astype(np.float32)
+        audio_np *= 1.0 / 32768.0
+        return audio_np
 
-    duration_s = len(audio_bytes) / (sample_rate * sampwidth * channels)
-    logger.info(
-        "  mic audio saved  path=%-40s  size=%d B  duration=%.2f s  wav=%s",
-        os.path.basename(filepath), len(audio_bytes), duration_s, is_wav,
-    )
-    return filepath
+    audio_np, _ = sf.read(io.BytesIO(audio_bytes), dtype="float32")
+    if audio_np.ndim > 1:
+        audio_np = audio_np.mean(axis=1)
+    return audio_np
 
 
-# ─── STT — Faster-Whisper ─────────────────────────────────────────────────────
+def _speech_only(audio_np: np.ndarray) -> np.ndarray:
+    """The voiced parts of an utterance, joined (empty if the VAD finds no speech)."""
+    chunks = get_speech_timestamps(audio_np, WHISPER_VAD)
+    if not chunks:
+        return audio_np[:0]
+    return np.concatenate([audio_np[c["start"] : c["end"]] for c in chunks])
 
-def _run_whisper(audio_bytes: bytes) -> str:
+
+def _is_silent(segment) -> bool:
+    """WhisperModel.transcribe's no-speech rule for a decoded segment."""
+    return segment.no_speech_prob > WHISPER_NO_SPEECH_PROB and segment.avg_logprob < WHISPER_MIN_LOG_PROB
+
+
+def _run_whisper(audio_bytes: PCMData) -> str:
     """Transcribe raw 24 kHz PCM bytes (or a WAV blob) using Faster-Whisper."""
     try:
-        is_wav = audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE"
-        if is_wav:
-            buf = io.BytesIO(audio_bytes)
-        else:
-            wav_buf = io.BytesIO()
-            with wave.open(wav_buf, "wb") as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(2)
-                wf.setframerate(SERVER_SAMPLE_RATE)
-                wf.writeframes(audio_bytes)
-            wav_buf.seek(0)
-            buf = wav_buf
-
-        audio_np, _ = sf.read(buf, dtype="float32")
-        if audio_np.ndim > 1:
-            audio_np = audio_np.mean(axis=1)
+        audio_np = _speech_only(_pcm_to_float32(audio_bytes))
+        if not len(audio_np):
+            logger.info("  STT done  no speech")
+            return ""
 
         segments, info = whisper_model.transcribe(
             audio_np,
-            beam_size=5,
+            beam_size=WHISPER_BEAM_SIZE,
             language="en",
-            vad_filter=True,
-            vad_parameters=dict(min_silence_duration_ms=300),
+            vad_filter=False,
+            no_speech_threshold=WHISPER_NO_SPEECH_PROB,
+            log_prob_threshold=WHISPER_MIN_LOG_PROB,
         )
         segments_list = list(segments)
         text = " ".join(seg.text for seg in segments_list).strip()
@@ -241,13 +542,94 @@ def _run_whisper(audio_bytes: bytes) -> str:
         return ""
 
 
-async def stt_faster_whisper(audio_bytes: bytes) -> str:
-    """Async wrapper that offloads Whisper inference to a thread executor."""
+def _run_whisper_batch(batch: list[PCMData]) -> list[str]:
+    """
+    Transcribe several utterances with one batched Whisper decode.
+
+    Every utterance passes the same VAD gate as in _run_whisper, so one with
+    no speech gets "" without reaching the model.  The voiced audio of the
+    rest is laid end to end and decoded through faster-whisper's
+    BatchedInferencePipeline with one clip per utterance, and segments that
+    Whisper judges silent are dropped by the same rule, so an utterance gets
+    the same result whether or not it shared a batch.  Utterances with more
+    than one 30 s window of speech go through _run_whisper instead.
+    """
+    texts = [""] * len(batch)
+    try:
+        t0      = time.monotonic()
+        extract = whisper_model.feature_extractor
+        voiced: dict[int, np.ndarray] = {}
+        for i, audio_bytes in enumerate(batch):
+            speech = _speech_only(_pcm_to_float32(audio_bytes))
+            if len(speech) > extract.n_samples:
+                texts[i] = _run_whisper(audio_bytes)
+            elif len(speech):
+                voiced[i] = speech
+        if not voiced:
+            return texts
+
+        rate          = extract.sampling_rate
+        clips, offset = [], 0
+        for speech in voiced.values():
+            clips.append({"start": offset / rate, "end": (offset + len(speech)) / rate})
+            offset += len(speech)
+        segments, _ = BatchedInferencePipeline(whisper_model).transcribe(
+            np.concatenate(list(voiced.values())),
+            language="en",
+            beam_size=WHISPER_BEAM_SIZE,
+            clip_timestamps=clips,
+            batch_size=len(clips),
+        )
+        # Segments come back in clip order, each starting at its clip's offset.
+        owners = list(voiced)
+        starts = [clip["start"] for clip in clips]
+        parts: dict[int, list[str]] = {i: [] for i in owners}
+        for seg in segments:
+            if not _is_silent(seg):
+                parts[owners[bisect.bisect_right(starts, seg.start + 0.01) - 1]].append(seg.text)
+        for i, pieces in parts.items():
+            texts[i] = " ".join(pieces).strip()
+        logger.info(
+            "  STT batch done  size=%d  voiced=%d  took=%.2f s  texts=%r",
+            len(batch), len(voiced), time.monotonic() - t0, [t[:40] for t in texts],
+        )
+        return texts
+    except Exception as exc:
+        logger.error("  STT batch error: %s", exc)
+        return texts
+
+
+async def _stt_single(audio_bytes: PCMData) -> str:
+    if STT_WORKER_PROCESSES:
+        return await model_workers.transcribe(stt_pool, audio_bytes)
+    return await stt_pool.run(_run_whisper, audio_bytes)
+
+
+async def _stt_batch(batch: list[PCMData]) -> list[str]:
+    """MicroBatcher runner; a batch of one keeps the VAD-filtered single path."""
+    if len(batch) == 1:
+        return [await _stt_single(batch[0])]
+    if STT_WORKER_PROCESSES:
+        return await model_workers.transcribe_batch(stt_pool, batch)
+    return await stt_pool.run(_run_whisper_batch, batch)
+
+
+whisper_batcher = MicroBatcher(
+    "stt", _stt_batch, STT_BATCH_SIZE, STT_BATCH_WAIT_MS,
+    max_concurrent=STT_MAX_INFLIGHT, max_pending=STT_MAX_QUEUE,
+) if STT_BATCH_SIZE > 1 else None
+
+
+async def stt_faster_whisper(audio_bytes: PCMData) -> str:
+    """Async wrapper that offloads Whisper inference to the STT pool."""
     logger.info("  STT start  input=%d B  (%.2f s audio)",
                 len(audio_bytes), len(audio_bytes) / (SERVER_SAMPLE_RATE * 2))
     t0 = time.monotonic()
-    loop = asyncio.get_event_loop()
-    result = await loop.run_in_executor(None, _run_whisper, audio_bytes)
+    if whisper_batcher is not None:
+        result = await whisper_batcher.submit(audio_bytes)
+    else:
+        result = await _stt_single(audio_bytes)
+    STT_SECONDS.observe(time.monotonic() - t0)
     logger.info("  STT took %.2f s", time.monotonic() - t0)
     return result
 
@@ -257,7 +639,7 @@ async def stt_faster_whisper(audio_bytes: bytes) -> str:
 _gemini_client = genai.Client()
 
 
-def _sanitize_for_tts(text: str) -> str:
+def _sanitize_for_tts(text: str, strip: bool = True) -> str:
     """
     Prepare a Gemini reply for Silero TTS.
 
@@ -270,6 +652,9 @@ def _sanitize_for_tts(text: str) -> str:
     their plain-ASCII equivalents so the full sentence survives intact,
     then strips any remaining non-ASCII characters that have no reasonable
     ASCII stand-in.
+
+    Pass strip=False for streamed pieces, whose leading and trailing
+    whitespace separates them from their neighbours.
     """
     replacements = {
         "\u2019": "'",    # right single quotation mark -> apostrophe
@@ -293,21 +678,58 @@ def _sanitize_for_tts(text: str) -> str:
         text = text.replace(src, dst)
     # Drop anything still outside printable ASCII
     text = text.encode("ascii", "ignore").decode("ascii")
-    return text.strip()
+    return text.strip() if strip else text
+
+
+def _gemini_config(summary: str = "") -> types.GenerateContentConfig:
+    """Generation settings shared by the blocking and streaming Gemini calls."""
+    system = SYSTEM_PROMPT
+    if summary:
+        system += f"\n\nSummary of the conversation so far:\n{summary}"
+    return types.GenerateContentConfig(
+        system_instruction=system,
+        max_output_tokens=200,   # raised: 120 was cutting replies mid-sentence
+        temperature=0.6,
+    )
 
 
-async def chat_gemini(prompt: str, _unused_client=None) -> str:
+def _is_transient_llm_error(exc: Exception) -> bool:
+    """Return True for Gemini errors worth retrying (overload / quota)."""
+    return ("503" in str(exc) or "UNAVAILABLE" in str(exc)
+            or "exhausted" in str(exc).lower())
+
+
+def is_crisis_utterance(text: str) -> bool:
+    """Return True if a transcript contains self-harm or suicide keywords."""
+    return bool(_CRISIS_RE.search(text))
+
+
+def _llm_request(prompt: str, memory: ConversationMemory | None) -> tuple:
+    """(contents, config) for a prompt, with the session's history if any."""
+    if memory is None:
+        return prompt, _gemini_config()
+    return memory.contents(prompt), _gemini_config(memory.summary)
+
+
+async def chat_gemini(
+    prompt: str,
+    _unused_client=None,
+    error_reply: str = LLM_ERROR_REPLY,
+    memory: ConversationMemory | None = None,
+) -> str:
     """Call Gemini 2.5 Flash with automatic retry on transient server errors."""
+    contents, config = _llm_request(prompt, memory)
+    with LLM_SECONDS.time("blocking"), span("llm", streaming=False):
+        return await _chat_gemini(contents, config, error_reply)
+
+
+async def _chat_gemini(contents, config: types.GenerateContentConfig, error_reply: str) -> str:
     for attempt in range(3):
         try:
             response = await _gemini_client.aio.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_PROMPT,
-                    max_output_tokens=200,   # raised: 120 was cutting replies mid-sentence
-                    temperature=0.6,
-                ),
+                model=LLM_MODEL,
+                contents=contents,
+                config=config,
             )
             reply = _sanitize_for_tts(response.text)
             word_count = len(reply.split())
@@ -318,17 +740,151 @@ async def chat_gemini(prompt: str, _unused_client=None) -> str:
             return reply
 
         except Exception as exc:
-            if attempt < 2 and ("503" in str(exc) or "UNAVAILABLE" in str(exc)
-                                 or "exhausted" in str(exc).lower()):
+            if attempt < 2 and _is_transient_llm_error(exc):
                 wait = 2 ** attempt
                 logger.warning("Gemini error (attempt %d), retrying in %ds: %s",
                                attempt + 1, wait, exc)
                 await asyncio.sleep(wait)
                 continue
             logger.error("  LLM error (attempt %d): %s", attempt + 1, exc)
-            return "Sorry, something went wrong."
+            return error_reply
 
-    return "Sorry, I couldn't understand that."
+    return LLM_EMPTY_REPLY
+
+
+async def chat_gemini_stream(
+    prompt: str,
+    gemini_client=None,
+    error_reply: str = LLM_ERROR_REPLY,
+    memory: ConversationMemory | None = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a Gemini reply as sanitised text pieces while it is generated.
+
+    Transient errors are retried like chat_gemini, but only until the first
+    piece has been yielded: after that a retry would repeat text the device
+    has already heard, so a mid-stream failure just ends the reply.  When
+    nothing was produced, the same fixed fallback strings are yielded
+    (error_reply for a failed call, e.g. the crisis line for a crisis turn).
+
+    gemini_client defaults to the module-level client; any object exposing
+    aio.models.generate_content_stream can be passed instead.  With a
+    memory, the session's summary and recent turns precede the prompt.
+    """
+    client = gemini_client or _gemini_client
+    contents, config = _llm_request(prompt, memory)
+    for attempt in range(3):
+        produced = False
+        try:
+            stream = await client.aio.models.generate_content_stream(
+                model=LLM_MODEL,
+                contents=contents,
+                config=config,
+            )
+            async for chunk in stream:
+                piece = _sanitize_for_tts(chunk.text or "", strip=False)
+                if piece:
+                    produced = True
+                    yield piece
+            if not produced:
+                yield LLM_EMPTY_REPLY
+            return
+
+        except Exception as exc:
+            if produced:
+                logger.error("  LLM stream interrupted (attempt %d): %s", attempt + 1, exc)
+                return
+            if attempt < 2 and _is_transient_llm_error(exc):
+                wait = 2 ** attempt
+                logger.warning("Gemini stream error (attempt %d), retrying in %ds: %s",
+                               attempt + 1, wait, exc)
+                await asyncio.sleep(wait)
+                continue
+            logger.error("  LLM stream error (attempt %d): %s", attempt + 1, exc)
+            yield error_reply
+            return
+
+    yield LLM_EMPTY_REPLY
+
+
+async def summarise_conversation(summary: str, turns: list[Turn]) -> str:
+    """Fold exchanges into a session's running summary (memory background task)."""
+    t0    = time.monotonic()
+    lines = [f"Current summary: {summary or '(none yet)'}", "", "New exchanges:"]
+    for turn in turns:
+        lines.append(f"Student: {turn.user}")
+        lines.append(f"Companion: {turn.model}")
+    response = await _gemini_client.aio.models.generate_content(
+        model=MEMORY_SUMMARY_MODEL,
+        contents="\n".join(lines),
+        config=types.GenerateContentConfig(
+            system_instruction=SUMMARY_PROMPT,
+            max_output_tokens=MEMORY_SUMMARY_TOKENS,
+            temperature=0.2,
+        ),
+    )
+    logger.info("  memory: summarised %d turns in %.2f s", len(turns), time.monotonic() - t0)
+    return (response.text or "").strip()
+
+
+def new_conversation_memory() -> ConversationMemory | None:
+    """A session's memory, or None when MEMORY_MAX_TOKENS is 0."""
+    if MEMORY_MAX_TOKENS <= 0:
+        return None
+    return ConversationMemory(
+        summarise_conversation,
+        max_tokens=MEMORY_MAX_TOKENS,
+        keep_recent=MEMORY_KEEP_TURNS,
+    )
+
+
+# ─── Response cache ───────────────────────────────────────────────────────────
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_ENTRIES,
+    ttl_s=RESPONSE_CACHE_TTL_S,
+    similarity=RESPONSE_CACHE_SIMILARITY,
+    max_words=RESPONSE_CACHE_MAX_WORDS,
+) if RESPONSE_CACHE else None
+
+
+def cacheable_turn(
+    transcript: str,
+    memory: ConversationMemory | None = None,
+    crisis: bool = False,
+) -> bool:
+    """
+    Whether a turn may be answered from, and stored in, the response cache.
+
+    Never for anything the safety path flags (a crisis utterance, or any
+    turn of a crisis session), and only for context-free turns: once a
+    session has history, a short "yes" or "why" means something else.
+    """
+    if response_cache is None or crisis or is_crisis_utterance(transcript):
+        return False
+    if memory is not None and (memory.turns or memory.summary):
+        return False
+    return response_cache.eligible(transcript)
+
+
+def lookup_cached_reply(transcript: str) -> CachedReply | None:
+    """Response cache lookup for a cacheable turn, logged either way."""
+    hit = response_cache.lookup(transcript)
+    if hit is None:
+        logger.info("  response cache miss")
+        return None
+    entry, similarity = hit
+    logger.info(
+        "  response cache hit  similarity=%.2f  cached_for=%r  audio=%s",
+        similarity, entry.key, "yes" if entry.packets else "no",
+    )
+    return entry
+
+
+def store_cached_reply(transcript: str, reply: str, cost_s: float, packets: list[bytes] | None = None) -> None:
+    """Cache a generated reply unless it is one of the fixed fallback replies."""
+    if reply and reply not in CANNED_CLIPS.values():
+        response_cache.store(transcript, reply, cost_s, packets)
 
 
 # ─── TTS — Silero ─────────────────────────────────────────────────────────────
@@ -340,7 +896,7 @@ def _run_silero_tts(text: str) -> bytes:
         with torch.no_grad():
             audio_tensor = silero_model.apply_tts(
                 text=text,
-                speaker="en_0",
+                speaker=TTS_SPEAKER,
                 sample_rate=silero_sample_rate,
             )
         audio_np  = audio_tensor.numpy()
@@ -348,19 +904,10 @@ def _run_silero_tts(text: str) -> bytes:
         pcm_bytes = audio_i16.tobytes()
         tts_duration_s = len(pcm_bytes) / (silero_sample_rate * 2)
         tts_elapsed    = time.monotonic() - t0
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        wav_path  = os.path.join(TEMP_DIR, f"tts_{timestamp}.wav")
-        with wave.open(wav_path, "wb") as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(silero_sample_rate)
-            wf.writeframes(pcm_bytes)
         logger.info(
-            "  TTS done  took=%.2f s  audio_duration=%.2f s  pcm=%d B  rtf=%.2fx  file=%s",
+            "  TTS done  took=%.2f s  audio_duration=%.2f s  pcm=%d B  rtf=%.2fx",
             tts_elapsed, tts_duration_s, len(pcm_bytes),
             tts_elapsed / max(tts_duration_s, 0.001),
-            os.path.basename(wav_path),
         )
         return pcm_bytes
     except Exception as exc:
@@ -368,39 +915,524 @@ def _run_silero_tts(text: str) -> bytes:
         return b""
 
 
+def _tts_key(text: str) -> str:
+    """Whitespace-normalised form of a sentence, used to spot repeats."""
+    return " ".join(text.split())
+
+
+def _run_silero_tts_batch(texts: list[str]) -> list[bytes]:
+    """
+    Synthesise a batch of pending sentences in one TTS pool job.
+
+    Silero v3's apply_tts has no public call that takes several texts and
+    returns separate waveforms, so the batch is synthesised back to back on
+    one worker (one pool slot, warm torch threads) and identical sentences —
+    typically fallback and crisis phrases several sessions need at once —
+    are synthesised only once and fanned out to every caller.
+    """
+    unique: dict[str, bytes] = {}
+    for text in texts:
+        key = _tts_key(text)
+        if key not in unique:
+            unique[key] = _run_silero_tts(text)
+    if len(unique) < len(texts):
+        logger.info("  TTS batch  size=%d  unique=%d", len(texts), len(unique))
+    return [unique[_tts_key(text)] for text in texts]
+
+
+async def _tts_single(text: str) -> bytes:
+    if TTS_WORKER_PROCESSES:
+        return await model_workers.synthesize(tts_pool, text)
+    return await tts_pool.run(_run_silero_tts, text)
+
+
+async def _tts_batch(texts: list[str]) -> list[bytes]:
+    """MicroBatcher runner for pending sentences from all sessions."""
+    if len(texts) == 1:
+        return [await _tts_single(texts[0])]
+    if TTS_WORKER_PROCESSES:
+        return await model_workers.synthesize_batch(tts_pool, texts)
+    return await tts_pool.run(_run_silero_tts_batch, texts)
+
+
+tts_batcher = MicroBatcher(
+    "tts", _tts_batch, TTS_BATCH_SIZE, TTS_BATCH_WAIT_MS,
+    max_concurrent=TTS_MAX_INFLIGHT, max_pending=TTS_MAX_QUEUE,
+) if TTS_BATCH_SIZE > 1 else None
+
+
+async def tts_silero(text: str) -> bytes:
+    """Async wrapper that offloads Silero synthesis to the TTS pool."""
+    t0 = time.monotonic()
+    with span("tts", chars=len(text)):
+        if tts_batcher is not None:
+            pcm = await tts_batcher.submit(text)
+        else:
+            pcm = await _tts_single(text)
+    elapsed = time.monotonic() - t0
+    TTS_SECONDS.observe(elapsed)
+    if pcm:
+        TTS_RTF.observe(elapsed / (len(pcm) / (SERVER_SAMPLE_RATE * 2)))
+    return pcm
+
+
 # ─── Opus encoder ─────────────────────────────────────────────────────────────
 
-def encode_pcm_to_opus(pcm_bytes: bytes) -> list[bytes]:
+def new_opus_encoder() -> OpusStreamEncoder:
+    """An encoder with the configured bitrate, complexity and DTX settings."""
+    return OpusStreamEncoder(
+        SERVER_SAMPLE_RATE, OPUS_FRAME_SAMPLES,
+        bitrate=OPUS_BITRATE, complexity=OPUS_COMPLEXITY, dtx=OPUS_DTX,
+    )
+
+
+def encode_pcm_to_opus(
+    pcm_bytes: bytes,
+    encoder: OpusStreamEncoder | None = None,
+    pad: bool = True,
+) -> list[bytes]:
     """
     Encode raw 16-bit mono 24 kHz PCM into a list of Opus packets.
 
-    Each packet covers OPUS_FRAME_MS milliseconds (480 samples at 24 kHz).
+    Each packet covers OPUS_FRAME_MS milliseconds (480 samples at 24 kHz);
+    the last frame is zero-padded.  Passing a stream's encoder carries the
+    codec state across that stream's sentences; with pad=False a partial
+    last frame stays in the encoder for the next call (or its flush()).
     """
-    encoder = opuslib.Encoder(SERVER_SAMPLE_RATE, 1, opuslib.APPLICATION_VOIP)
-    samples  = np.frombuffer(pcm_bytes, dtype=np.int16)
-    packets: list[bytes] = []
+    t0      = time.monotonic()
+    encoder = encoder or new_opus_encoder()
+    packets = encoder.encode_all(pcm_bytes) if pad else encoder.encode(pcm_bytes)
+    OPUS_ENCODE_SECONDS.observe(time.monotonic() - t0)
+    if packets:
+        logger.info(
+            "  Opus encode  pcm=%d B  packets=%d  audio=%.2f s  avg_pkt=%.0f B  took=%.1f ms",
+            len(pcm_bytes), len(packets), len(pcm_bytes) / (SERVER_SAMPLE_RATE * 2),
+            sum(len(p) for p in packets) / len(packets), (time.monotonic() - t0) * 1000,
+        )
+    return packets
+
+
+# ─── TTS cache ────────────────────────────────────────────────────────────────
+
+tts_cache = TTSCache(
+    TTS_SPEAKER, SERVER_SAMPLE_RATE,
+    max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024),
+    disk_dir=TTS_CACHE_DIR or None,
+    disk_min_hits=TTS_CACHE_DISK_MIN_HITS,
+) if TTS_CACHE_MAX_MB > 0 else None
 
-    for offset in range(0, len(samples) - OPUS_FRAME_SAMPLES + 1, OPUS_FRAME_SAMPLES):
-        frame  = samples[offset : offset + OPUS_FRAME_SAMPLES].tobytes()
-        packet = encoder.encode(frame, OPUS_FRAME_SAMPLES)
-        packets.append(packet)
+# Disk writes of hot cache entries, held until done so none is collected mid-write.
+_persist_tasks: set[asyncio.Task] = set()
 
-    audio_duration_s = len(pcm_bytes) / (SERVER_SAMPLE_RATE * 2)
+
+def _persist_done(task: asyncio.Task) -> None:
+    _persist_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("  TTS cache persist failed: %s", task.exception())
+
+
+async def synthesize_speech(
+    text: str,
+    pinned: bool = False,
+    encoder: OpusStreamEncoder | None = None,
+) -> tuple[bytes, list[bytes]]:
+    """
+    Return (pcm, opus_packets) for a phrase, from the cache when possible.
+
+    A hit skips Silero.  A miss synthesises, encodes (padded to whole
+    frames) and stores the result; pinned entries are never evicted and
+    always written to the disk tier.  Cached packets come from a fresh
+    encoder, since any session may replay them.  Given a stream's encoder,
+    the returned packets are instead that encoder's output for the PCM —
+    hit or miss — with the partial last frame carried into the next
+    sentence, so a stream is padded once, when it is flushed.  Chunks of
+    the canned clips are served from the clip bank before the cache is
+    consulted.
+    """
+    clip = _clip_chunks.get(normalise_text(text))
+    if clip is not None:
+        return await _stream_encoded(clip[0], clip[1], encoder)
+    if tts_cache is not None:
+        if tts_cache.disk_dir:
+            cached = await audio_io_pool.run(tts_cache.load, text)
+        else:
+            cached = tts_cache.load(text)
+        if cached is not None:
+            if tts_cache.should_persist(cached):
+                task = asyncio.create_task(audio_io_pool.run(tts_cache.persist, text, cached))
+                _persist_tasks.add(task)
+                task.add_done_callback(_persist_done)
+            return await _stream_encoded(cached.pcm, cached.packets, encoder)
+
+    pcm = await tts_silero(text)
+    if not pcm:
+        return b"", []
+    if RECORD_TTS_AUDIO:
+        recorder.record("tts", pcm, SERVER_SAMPLE_RATE)
+    if tts_cache is None:
+        if encoder is not None:
+            return await _stream_encoded(pcm, [], encoder)
+        return pcm, await audio_io_pool.run(encode_pcm_to_opus, pcm)
+    packets = await audio_io_pool.run(encode_pcm_to_opus, pcm)
+    if tts_cache.disk_dir and pinned:
+        await audio_io_pool.run(tts_cache.store, text, pcm, packets, pinned)
+    else:
+        tts_cache.store(text, pcm, packets, pinned=pinned)
+    return await _stream_encoded(pcm, packets, encoder)
+
+
+async def _stream_encoded(
+    pcm: bytes,
+    packets: list[bytes],
+    encoder: OpusStreamEncoder | None,
+) -> tuple[bytes, list[bytes]]:
+    """Swap stand-alone packets for the stream encoder's (unpadded) output, if there is one."""
+    if encoder is None:
+        return pcm, packets
+    return pcm, await audio_io_pool.run(encode_pcm_to_opus, pcm, encoder, False)
+
+
+# ─── Canned clips ─────────────────────────────────────────────────────────────
+# Pre-encoded Opus for the fixed replies, built once at startup.  Degraded
+# paths stream these straight from memory: no Silero, no encoder, no pool
+# slot — which matters most when the box is already overloaded.
+
+clip_packets: dict[str, list[bytes]] = {}   # clip name            -> packets
+_clip_chunks: dict[str, tuple[bytes, list[bytes]]] = {}   # normalised chunk -> (pcm, packets)
+
+
+async def build_clip_bank() -> None:
+    """Synthesise every canned clip chunk by chunk (pinning it in the TTS cache when pre-warming)."""
+    t0 = time.monotonic()
+    for name, text in CANNED_CLIPS.items():
+        packets: list[bytes] = []
+        try:
+            for chunk in split_for_tts(text):
+                pcm, chunk_packets = await synthesize_speech(chunk, pinned=TTS_CACHE_PREWARM)
+                _clip_chunks[normalise_text(chunk)] = (pcm, chunk_packets)
+                packets.extend(chunk_packets)
+        except Exception as exc:
+            logger.error("  canned clip %r failed: %s", name, exc)
+            continue
+        if packets:
+            clip_packets[name] = packets
     logger.info(
-        "  Opus encode  pcm=%d B  packets=%d  audio=%.2f s  avg_pkt=%.0f B",
-        len(pcm_bytes), len(packets), audio_duration_s,
-        len(pcm_bytes) / max(len(packets), 1) / (OPUS_FRAME_SAMPLES * 2) * sum(len(p) for p in packets) / max(len(packets), 1),
+        "Canned clips ready  clips=%s  packets=%d  took=%.1f s",
+        sorted(clip_packets), sum(len(p) for p in clip_packets.values()),
+        time.monotonic() - t0,
     )
-    return packets
+
+
+async def send_clip(ws: WebSocket, name: str) -> bool:
+    """Pace out a canned clip; returns False if it is not built (yet)."""
+    packets = clip_packets.get(name)
+    if not packets:
+        return False
+    logger.info("  [SVR→ESP32] canned clip %r  packets=%d", name, len(packets))
+    await send_paced_opus(ws, _aiter_items(packets))
+    return True
+
+
+# ─── Sentence-streamed TTS ────────────────────────────────────────────────────
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_CLAUSE_END_RE   = re.compile(r"(?<=[,;:])\s+")
+# Words whose trailing "." does not end a sentence ("Dr. Smith", "e.g. this").
+_ABBREVIATIONS   = frozenset({"mr", "mrs", "ms", "dr", "prof", "st", "jr", "sr", "vs", "approx", "e.g", "i.e"})
+
+
+def _sentence_ends(text: str) -> list[re.Match]:
+    """Matches of the whitespace after each sentence end, skipping abbreviations."""
+    ends = []
+    for m in _SENTENCE_END_RE.finditer(text):
+        words = text[: m.start()].rsplit(None, 1)
+        if words and words[-1].lower().rstrip(".") in _ABBREVIATIONS:
+            continue
+        ends.append(m)
+    return ends
+
+
+def _split_sentences(text: str) -> list[str]:
+    sentences, start = [], 0
+    for m in _sentence_ends(text):
+        sentences.append(text[start : m.start()])
+        start = m.end()
+    sentences.append(text[start:])
+    return sentences
+
+
+def split_for_tts(text: str) -> list[str]:
+    """
+    Split a reply into sentence-sized chunks for incremental synthesis.
+
+    Sentences longer than TTS_CHUNK_MAX_CHARS are split again at clause
+    punctuation.  Fragments shorter than TTS_CHUNK_MIN_CHARS are merged into
+    the following chunk so Silero is never asked to voice a lone "Okay."
+    with no surrounding prosody.
+    """
+    pieces: list[str] = []
+    for sentence in _split_sentences(text.strip()):
+        if len(sentence) <= TTS_CHUNK_MAX_CHARS:
+            pieces.append(sentence)
+            continue
+        current = ""
+        for clause in _CLAUSE_END_RE.split(sentence):
+            if current and len(current) + len(clause) + 1 > TTS_CHUNK_MAX_CHARS:
+                pieces.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}".strip()
+        if current:
+            pieces.append(current)
+
+    chunks: list[str] = []
+    carry = ""
+    for piece in pieces:
+        piece = f"{carry} {piece}".strip()
+        if not piece:
+            continue
+        if len(piece) < TTS_CHUNK_MIN_CHARS:
+            carry = piece
+            continue
+        chunks.append(piece)
+        carry = ""
+    if carry:
+        if chunks:
+            chunks[-1] = f"{chunks[-1]} {carry}"
+        else:
+            chunks.append(carry)
+    return chunks
+
+
+async def _aiter_items(items: Iterable) -> AsyncIterator:
+    """Adapt a plain iterable to the async-iterable interface of the streams."""
+    for item in items:
+        yield item
+
+
+async def _collect_items(items: AsyncIterable, sink: list) -> AsyncIterator:
+    """Pass an async stream through, appending every item to sink."""
+    async with aclosing(aiter(items)) as stream:
+        async for item in stream:
+            sink.append(item)
+            yield item
+
+
+def _stream_cut_point(buffer: str) -> int:
+    """
+    Return the offset up to which a streamed text buffer can be voiced.
+
+    Cuts after the last sentence end followed by whitespace (a trailing "."
+    may still be "3.5" or "..." in the making), not counting abbreviations.  A buffer longer than
+    TTS_CHUNK_MAX_CHARS without one is cut at the last clause break, or
+    failing that the last space, so a run-on sentence cannot stall TTS.
+    """
+    cut = max((m.start() for m in _sentence_ends(buffer)), default=0)
+    if cut or len(buffer) <= TTS_CHUNK_MAX_CHARS:
+        return cut
+    cut = max((m.start() for m in _CLAUSE_END_RE.finditer(buffer)), default=0)
+    return cut or max(buffer.rfind(" "), 0)
+
+
+async def iter_tts_sentences(pieces: AsyncIterable[str]) -> AsyncIterator[str]:
+    """
+    Re-chunk streamed reply text into TTS chunks as sentences complete.
+
+    Each chunk is yielded as soon as its sentence is closed, while later
+    tokens are still arriving; whatever is left is flushed at the end.
+    """
+    buffer = ""
+    async for piece in pieces:
+        buffer += piece
+        cut = _stream_cut_point(buffer)
+        if cut < TTS_CHUNK_MIN_CHARS:
+            continue
+        complete, buffer = buffer[:cut], buffer[cut:]
+        for chunk in split_for_tts(complete):
+            yield chunk
+    for chunk in split_for_tts(buffer):
+        yield chunk
+
+
+_STREAM_END = object()
+
+
+async def synthesize_opus_stream(
+    chunks: AsyncIterable[str],
+    lookahead: int = TTS_LOOKAHEAD_CHUNKS,
+    encoder: OpusStreamEncoder | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield Opus packets for each text chunk, in order, as soon as it is ready.
+
+    A producer task synthesises and encodes chunks one after another into a
+    bounded queue, so while the caller paces out the packets of chunk N,
+    Silero is already working on chunk N+1.  Only the first chunk's synthesis
+    time sits in front of the first packet.  Every chunk, cached or not, is
+    encoded with the given encoder (a session's, or a new one per stream),
+    frames running on across chunk boundaries; only the end of the stream
+    is padded.  A session encoder is reset first, dropping whatever an
+    interrupted previous stream left in it.
+    """
+    if encoder is None:
+        encoder = new_opus_encoder()
+    else:
+        await audio_io_pool.run(encoder.reset)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(lookahead, 1))
+
+    async def produce() -> None:
+        try:
+            idx = 0
+            # aclosing: on cancellation (barge-in) the upstream generator —
+            # and the Gemini stream behind it — is closed right away rather
+            # than whenever it is garbage-collected.
+            async with aclosing(aiter(chunks)) as texts:
+                async for text in texts:
+                    idx += 1
+                    t0  = time.monotonic()
+                    pcm, packets = await synthesize_speech(text, encoder=encoder)
+                    if not pcm:
+                        logger.warning("  TTS chunk #%d empty — skipped", idx)
+                        continue
+                    logger.info(
+                        "  TTS chunk #%d ready  chars=%d  packets=%d  took=%.2f s",
+                        idx, len(text), len(packets), time.monotonic() - t0,
+                    )
+                    await queue.put(packets)
+            await queue.put(await audio_io_pool.run(encoder.flush))
+        except Exception as exc:
+            logger.error("  TTS stream error: %s", exc)
+        await queue.put(_STREAM_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            packets = await queue.get()
+            if packets is _STREAM_END:
+                break
+            for packet in packets:
+                yield packet
+    finally:
+        producer.cancel()
+
+
+output_pacer = PacedSender(FRAME_DURATION_S, FRAME_PACING_FACTOR, burst=OPUS_SEND_BURST)
+
+
+async def send_paced_opus(
+    ws: WebSocket,
+    packets: AsyncIterable[bytes],
+    label: str = "",
+    stream: PacedStream | None = None,
+) -> tuple[int, int, float | None]:
+    """
+    Send Opus packets with deadline-based pacing as they become available.
+
+    Packets are handed to a stream of the shared output_pacer (opened here
+    unless the caller passes one), which sends every session's due packets
+    from one scheduler task.  If the producer falls
+    behind (the next chunk is still being synthesised), the pacing clock is
+    rebased on the late packet instead of bursting the backlog at the device
+    once it arrives.
+
+    Returns:
+        (packets_sent, bytes_sent, monotonic time of the first packet or None)
+    """
+    stream = stream or output_pacer.open(ws.send_bytes, label)
+    try:
+        async for packet in packets:
+            await stream.put(packet)
+        stream.close()
+        await stream.wait()
+    finally:
+        stream.cancel()
+
+    total = stream.sent
+    if total:
+        actual_stream_s = time.monotonic() - stream.first_at
+        expected_s      = total * FRAME_PACING_S
+        PACING_DRIFT_SECONDS.observe(actual_stream_s - expected_s)
+        logger.info(
+            "  [SVR→ESP32] all %d Opus packets sent  total_opus=%d B  "
+            "actual_stream_time=%.2f s  expected=%.2f s  drift=%.0f ms  underruns=%d",
+            total, stream.sent_bytes, actual_stream_s, expected_s,
+            (actual_stream_s - expected_s) * 1000, stream.underruns,
+        )
+    return total, stream.sent_bytes, stream.first_at
+
+
+# ─── Admission control ────────────────────────────────────────────────────────
+
+def estimate_queue_latency() -> float:
+    """
+    Estimated seconds a new utterance would queue for STT plus its first
+    TTS chunk, counting work parked in the batchers as well as in the pools.
+    """
+    stt_backlog = whisper_batcher.pending / whisper_batcher.max_batch if whisper_batcher else 0
+    tts_backlog = tts_batcher.pending / tts_batcher.max_batch if tts_batcher else 0
+    return stt_pool.estimated_wait(stt_backlog) + tts_pool.estimated_wait(tts_backlog)
+
+
+admission = AdmissionController(
+    ADMISSION_MAX_PIPELINES,
+    crisis_reserve=ADMISSION_CRISIS_RESERVE,
+    max_queue_s=ADMISSION_MAX_QUEUE_MS / 1000.0,
+    defer_s=ADMISSION_DEFER_MS / 1000.0,
+    latency_probe=estimate_queue_latency,
+)
 
 
 # ─── Shared pipeline ──────────────────────────────────────────────────────────
 
+async def transcribe_utterance(
+    audio_bytes: PCMData,
+    source: str = "ws",
+    transcriber: StreamingTranscriber | None = None,
+) -> tuple[str, str | None]:
+    """
+    Run the STT stage on a finished utterance.
+
+    With a StreamingTranscriber, segments decoded during recording are
+    reused and only the remaining tail is transcribed here.
+
+    Returns:
+        (transcript, saved_path) — saved_path is None when the utterance
+        was not sampled for recording.
+
+    Raises:
+        ValueError: if no speech is detected in the audio, or "BUSY" when
+            the STT pool's admission queue is full.
+    """
+    logger.info(_sep("STT"))
+    saved_path = recorder.record(source, audio_bytes, SERVER_SAMPLE_RATE) if RECORD_AUDIO else None
+    t0 = time.monotonic()
+    try:
+        with span("stt", streaming=transcriber is not None):
+            if transcriber is not None:
+                early      = transcriber.segments_submitted
+                transcript = await transcriber.finish()
+                logger.info(
+                    "  STT (streaming) took %.2f s after end_of_speech  "
+                    "segments_during_recording=%d  text=%r",
+                    time.monotonic() - t0, early, transcript[:120],
+                )
+            else:
+                transcript = await stt_faster_whisper(audio_bytes)
+        STT_TAIL_SECONDS.observe(time.monotonic() - t0)
+    except PoolBusy as exc:
+        logger.warning("  STT rejected: %s", exc)
+        raise ValueError("BUSY") from exc
+    if not transcript:
+        logger.warning("  STT returned empty — no speech detected")
+        raise ValueError("NO_SPEECH")
+    return transcript, saved_path
+
+
 async def run_pipeline(
     audio_bytes: bytes,
     client: httpx.AsyncClient,
     source: str = "ws",
-) -> tuple[str, str, str]:
+) -> tuple[str, str, str | None]:
     """
     Run the full STT → LLM pipeline.
 
@@ -411,26 +1443,62 @@ async def run_pipeline(
         ValueError: if no speech is detected in the audio.
     """
     pipeline_start = time.monotonic()
-    loop           = asyncio.get_event_loop()
 
-    logger.info(_sep("STT"))
-    saved_path = await loop.run_in_executor(
-        None, save_audio_to_temp, audio_bytes, source
-    )
-    transcript = await stt_faster_whisper(audio_bytes)
-    if not transcript:
-        logger.warning("  STT returned empty — no speech detected")
-        raise ValueError("NO_SPEECH")
+    transcript, saved_path = await transcribe_utterance(audio_bytes, source)
 
     logger.info(_sep("LLM"))
-    t_llm = time.monotonic()
-    reply = await chat_gemini(transcript, client)
-    logger.info("  LLM took %.2f s", time.monotonic() - t_llm)
+    t_llm  = time.monotonic()
+    cached = lookup_cached_reply(transcript) if cacheable_turn(transcript) else None
+    if cached is not None:
+        reply = cached.reply
+        response_cache.credit(cached, time.monotonic() - t_llm)
+    else:
+        reply = await chat_gemini(transcript, client)
+        logger.info("  LLM took %.2f s", time.monotonic() - t_llm)
+        if cacheable_turn(transcript):
+            store_cached_reply(transcript, reply, time.monotonic() - t_llm)
 
     logger.info("  pipeline total %.2f s", time.monotonic() - pipeline_start)
     return transcript, reply, saved_path
 
 
+async def stream_reply_sentences(
+    ws: WebSocket,
+    transcript: str,
+    reply_parts: list[str],
+    gemini_client=None,
+    error_reply: str = LLM_ERROR_REPLY,
+    memory: ConversationMemory | None = None,
+) -> AsyncIterator[str]:
+    """
+    Yield TTS chunks of a streamed Gemini reply, forwarding each to the device.
+
+    Every completed chunk is sent as a "response_partial" text frame before
+    it is handed to TTS, and appended to reply_parts so the caller can send
+    the assembled reply as the usual "response" message once streaming ends.
+    """
+    logger.info(_sep("LLM (streaming)"))
+    t_llm    = time.monotonic()
+    first_at = None
+    llm_stream = chat_gemini_stream(transcript, gemini_client, error_reply, memory)
+    async for chunk in iter_tts_sentences(llm_stream):
+        if first_at is None:
+            first_at = time.monotonic()
+            LLM_FIRST_SECONDS.observe(first_at - t_llm)
+            logger.info("  LLM first sentence after %.2f s", first_at - t_llm)
+        reply_parts.append(chunk)
+        await ws_send_json(ws, type="response_partial", msg=chunk)
+        yield chunk
+
+    reply = " ".join(reply_parts)
+    LLM_SECONDS.observe(time.monotonic() - t_llm, "stream")
+    record_span("llm", t_llm, streaming=True, chars=len(reply))
+    logger.info(
+        "  LLM done  took=%.2f s  words=%d  chars=%d  reply=%r",
+        time.monotonic() - t_llm, len(reply.split()), len(reply), reply[:120],
+    )
+
+
 # ─── WebSocket helpers ────────────────────────────────────────────────────────
 
 async def ws_send_json(ws: WebSocket, **kwargs) -> None:
@@ -442,8 +1510,27 @@ async def ws_send_json(ws: WebSocket, **kwargs) -> None:
 
 @app.get("/health")
 async def health_check():
-    """Return server health status."""
-    return {"status": "healthy", "version": "3.1.0"}
+    """Return server health status and inference pool saturation."""
+    return {
+        "status":  "healthy",
+        "version": "3.1.0",
+        "pools":   {pool.name: pool.stats() for pool in INFERENCE_POOLS},
+        "batching": {
+            "stt": whisper_batcher.stats() if whisper_batcher else None,
+            "tts": tts_batcher.stats() if tts_batcher else None,
+        },
+        "tts_cache": tts_cache.stats() if tts_cache else None,
+        "response_cache": response_cache.stats() if response_cache else None,
+        "admission": admission.stats(),
+        "recorder":  recorder.stats(),
+        "pacer":     output_pacer.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Stage latency histograms and pool gauges in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 # ─── WebSocket endpoint ───────────────────────────────────────────────────────
@@ -454,12 +1541,40 @@ async def websocket_chat(websocket: WebSocket):
     Primary ESP32 interface over WebSocket.
 
     Flow per utterance:
-      1. ESP32 streams binary PCM chunks while the user speaks.
-      2. ESP32 sends {"type":"instruction","msg":"end_of_speech"}.
-      3. Server sends RESPONSE.CREATED, runs STT → LLM → TTS, streams Opus
-         packets with deadline-based pacing, then sends RESPONSE.COMPLETE.
+      1. ESP32 streams binary PCM chunks while the user speaks.  With
+         STREAMING_STT, segments closed by a pause are already being
+         transcribed in the background.
+      2. ESP32 sends {"type":"instruction","msg":"end_of_speech"} (or, with
+         VAD_ENDPOINT_MS set, the server detects the end of speech itself).
+      3. Server sends RESPONSE.CREATED, runs STT, then streams the Gemini
+         reply: each completed sentence is sent as "response_partial",
+         synthesised, and its Opus packets paced out with deadline-based
+         pacing as soon as they are encoded.  The full text follows as
+         "response", then RESPONSE.COMPLETE.  With LLM_STREAMING=0 the
+         reply is generated in one call and "response" is sent first.
       4. Steps 1–3 repeat for subsequent utterances.
 
+    Full duplex:
+      The receive loop keeps reading while a response (step 3) runs as a
+      separate task.  With BARGE_IN, new speech from the device (frames the
+      energy VAD marks as speech), a new end_of_speech or a
+      {"type":"instruction","msg":"cancel"} cancels the running response
+      at once — LLM stream, queued TTS/STT jobs and pacing — and the server
+      sends RESPONSE.CANCELLED.  A {"type":"instruction","msg":"buffer_level",
+      "ms":<n>} report adapts the pace of the reply being streamed.
+
+    Response cache:
+      With RESPONSE_CACHE, a short first turn that matches a cached one is
+      answered at once: "response" is sent before any audio, and the audio
+      is the stored reply's packets (or synthesised, then stored).
+
+    Admission:
+      Each utterance must be admitted before STT starts.  When the server
+      is overloaded it is shed right after RESPONSE.CREATED with an
+      "overloaded" message (plus the spoken "busy" clip when available)
+      and RESPONSE.COMPLETE.  Once a session has produced a crisis
+      utterance it uses the priority lane for the rest of the connection.
+
     Disconnect handling:
       WebSocketDisconnect is caught and logged cleanly.  The low-level
       websockets library raises on any attempt to receive() after the close
@@ -471,10 +1586,237 @@ async def websocket_chat(websocket: WebSocket):
     logger.info(_sep("ESP32 CONNECTED"))
     logger.info("  host=%s", client_host)
 
-    audio_chunks: list[bytes] = []
+    opus_encoder  = new_opus_encoder()
+    memory        = new_conversation_memory()
     session_start = time.monotonic()
     utterance_n   = 0
 
+    answered_early = False
+    crisis_session = False
+    response_task: asyncio.Task | None = None
+    playback: PacedStream | None = None
+
+    # PCM buffers of answered utterances, reused for recording: a session
+    # alternates between two (one recording, one being answered).
+    spare_pcm: list[PCMBuffer] = []
+
+    def take_pcm() -> PCMBuffer:
+        return spare_pcm.pop() if spare_pcm else PCMBuffer(PCM_MAX_BYTES, PCM_INITIAL_BYTES)
+
+    def new_transcriber(buffer: PCMBuffer) -> StreamingTranscriber | None:
+        if not STREAMING_STT:
+            return None
+        return StreamingTranscriber(
+            stt_faster_whisper,
+            SERVER_SAMPLE_RATE,
+            buffer,
+            segment_silence_ms=STT_SEGMENT_SILENCE_MS,
+            endpoint_silence_ms=VAD_ENDPOINT_MS,
+        )
+
+    def new_detector(buffer: PCMBuffer) -> SpeechDetector | None:
+        # Without streaming STT nothing else watches the audio for speech,
+        # so barge-in gets its own VAD rather than firing on any frame.
+        return None if STREAMING_STT else SpeechDetector(SERVER_SAMPLE_RATE, buffer)
+
+    pcm         = take_pcm()
+    transcriber = new_transcriber(pcm)
+    detector    = new_detector(pcm)
+
+    def responding() -> bool:
+        return response_task is not None and not response_task.done()
+
+    async def cancel_response(reason: str) -> None:
+        """Cancel the running response, if any, and tell the device."""
+        if not responding():
+            return
+        logger.info("  [SVR] barge-in (%s) — cancelling response #%d", reason, utterance_n)
+        response_task.cancel()
+        await asyncio.wait([response_task])
+        await ws_send_json(websocket, type="server", msg="RESPONSE.CANCELLED")
+
+    async def respond(
+        n: int,
+        audio_bytes: PCMData,
+        utterance_transcriber: StreamingTranscriber | None,
+        utterance_pcm: PCMBuffer,
+        utterance_start: float,
+    ) -> None:
+        """Step 3 of the flow for one utterance; runs as a cancellable task."""
+        nonlocal crisis_session, playback
+        ticket      = None
+        transcript  = None
+        saved_path  = None
+        outcome     = "error"
+        reply_parts: list[str] = []
+        with span("utterance", utterance=n, host=client_host):
+            try:
+                logger.info("  [SVR→ESP32] sending RESPONSE.CREATED")
+                await ws_send_json(websocket, type="server", msg="RESPONSE.CREATED")
+
+                try:
+                    ticket = await admission.admit(priority=crisis_session)
+                except Overloaded as exc:
+                    logger.warning(
+                        "  admission: shed (%s)  in_flight=%d  queue_estimate=%.2f s",
+                        exc.reason, admission.in_flight, estimate_queue_latency(),
+                    )
+                    await ws_send_json(
+                        websocket, type="overloaded", msg=exc.reason,
+                        retry_after_ms=int(exc.retry_after_s * 1000),
+                    )
+                    await send_clip(websocket, "busy")
+                    await ws_send_json(websocket, type="server", msg="RESPONSE.COMPLETE")
+                    outcome = "shed"
+                    return
+
+                client = app.state.http_client
+                try:
+                    transcript, saved_path = await transcribe_utterance(
+                        audio_bytes, source="ws", transcriber=utterance_transcriber
+                    )
+                except ValueError as ve:
+                    # With a canned clip the device hears why instead of silence;
+                    # "notice" is informational, whereas "error" would make the
+                    # firmware discard the buffered audio.
+                    clip = outcome = "busy" if str(ve) == "BUSY" else "no_speech"
+                    if clip in clip_packets:
+                        logger.warning("  pipeline error: %s — playing %r clip + RESPONSE.COMPLETE", ve, clip)
+                        await ws_send_json(websocket, type="notice", msg=str(ve))
+                        await send_clip(websocket, clip)
+                    else:
+                        logger.warning("  pipeline error: %s — sending error + RESPONSE.COMPLETE", ve)
+                        await ws_send_json(websocket, type="error", msg=str(ve))
+                    await ws_send_json(websocket, type="server", msg="RESPONSE.COMPLETE")
+                    return
+
+                logger.info("  [SVR→ESP32] sending transcript: %r", transcript[:80])
+                await ws_send_json(websocket, type="transcript", msg=transcript)
+
+                # A crisis turn moves the session into the priority lane, and if
+                # Gemini fails the device hears the crisis line rather than a
+                # generic apology.
+                error_reply = LLM_ERROR_REPLY
+                if is_crisis_utterance(transcript):
+                    error_reply = CRISIS_REPLY
+                    if not crisis_session:
+                        logger.warning("  crisis utterance — session moved to the priority lane")
+                    crisis_session = True
+
+                # Short context-free turns may be answered from the response
+                # cache, with the reply's audio when a previous hit stored it.
+                use_cache = cacheable_turn(transcript, memory, crisis_session)
+                cached    = lookup_cached_reply(transcript) if use_cache else None
+                fresh_packets: list[bytes] = []
+                t_reply   = time.monotonic()
+                if cached is not None:
+                    reply = cached.reply
+                    reply_parts.append(reply)
+                    logger.info("  [SVR→ESP32] sending response:   %r", reply[:80])
+                    await ws_send_json(websocket, type="response", msg=reply)
+                    tts_source = _aiter_items(split_for_tts(reply))
+                elif LLM_STREAMING:
+                    tts_source = stream_reply_sentences(
+                        websocket, transcript, reply_parts,
+                        error_reply=error_reply, memory=memory,
+                    )
+                else:
+                    logger.info(_sep("LLM"))
+                    t_llm = time.monotonic()
+                    reply = await chat_gemini(transcript, client, error_reply=error_reply, memory=memory)
+                    reply_parts.append(reply)
+                    logger.info("  LLM took %.2f s", time.monotonic() - t_llm)
+                    logger.info("  [SVR→ESP32] sending response:   %r", reply[:80])
+                    await ws_send_json(websocket, type="response", msg=reply)
+                    tts_source = _aiter_items(split_for_tts(reply))
+
+                logger.info(_sep("TTS + OPUS"))
+                logger.info(
+                    "  [SVR→ESP32] streaming TTS chunks  pacing=%.0f ms/pkt (%.0f%% RT)",
+                    FRAME_PACING_S * 1000, FRAME_PACING_FACTOR * 100,
+                )
+                playback = output_pacer.open(websocket.send_bytes, f"{client_host}#{n}")
+                if cached is not None and cached.packets:
+                    audio_source = _aiter_items(cached.packets)
+                else:
+                    audio_source = synthesize_opus_stream(tts_source, encoder=opus_encoder)
+                    if use_cache:
+                        audio_source = _collect_items(audio_source, fresh_packets)
+                async with aclosing(audio_source) as packets:
+                    total, _, first_at = await send_paced_opus(websocket, packets, stream=playback)
+
+                if use_cache and total:
+                    if cached is not None:
+                        response_cache.credit(cached, first_at - t_reply)
+                        if not cached.packets:
+                            cached.packets = fresh_packets
+                    else:
+                        store_cached_reply(transcript, " ".join(reply_parts), first_at - t_reply, fresh_packets)
+
+                if LLM_STREAMING and cached is None:
+                    reply = " ".join(reply_parts)
+                    logger.info("  [SVR→ESP32] sending response:   %r", reply[:80])
+                    await ws_send_json(websocket, type="response", msg=reply)
+                if memory is not None and reply not in (LLM_ERROR_REPLY, LLM_EMPTY_REPLY):
+                    memory.add(transcript, reply)
+
+                if total:
+                    FIRST_PACKET_SECONDS.observe(first_at - utterance_start)
+                    logger.info(
+                        "  time-to-first-audio %.2f s after end_of_speech",
+                        first_at - utterance_start,
+                    )
+                else:
+                    logger.error("  TTS returned empty audio — nothing to stream")
+
+                logger.info("  [SVR→ESP32] sending RESPONSE.COMPLETE")
+                await ws_send_json(websocket, type="server", msg="RESPONSE.COMPLETE")
+
+                utterance_elapsed = time.monotonic() - utterance_start
+                UTTERANCE_SECONDS.observe(utterance_elapsed)
+                outcome = "complete"
+                logger.info(
+                    _sep(f"UTTERANCE #{n} DONE"),
+                )
+                logger.info(
+                    "  total wall time for this utterance: %.2f s  "
+                    "(session uptime: %.0f s)",
+                    utterance_elapsed, time.monotonic() - session_start,
+                )
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                logger.info("  response #%d cancelled after %.2f s", n, time.monotonic() - utterance_start)
+                # Remember what was said before the interruption, so the next
+                # reply can pick up from it.
+                if memory is not None and transcript and reply_parts:
+                    memory.add(transcript, " ".join(reply_parts))
+                raise
+            except Exception as exc:
+                # The receive loop notices the closed socket and ends the session.
+                logger.error(_sep("SESSION ERROR"))
+                logger.error("  host=%s  error=%s", client_host, exc)
+                try:
+                    await ws_send_json(websocket, type="error", msg=str(exc))
+                    await websocket.close()
+                except Exception:
+                    pass
+            finally:
+                UTTERANCES.labels(outcome).inc()
+                if ticket is not None:
+                    ticket.release()
+                if utterance_transcriber is not None:
+                    await utterance_transcriber.close()
+                if playback is not None:
+                    playback.cancel()
+                    playback = None
+                # Only a completed response has finished every read of its
+                # audio (a cancelled one may leave STT running in a worker
+                # thread), and a recorded clip is written later from it.
+                if outcome == "complete" and saved_path is None:
+                    utterance_pcm.recycle()
+                    spare_pcm.append(utterance_pcm)
+
+    SESSIONS.inc()
     try:
         while True:
             # ── Receive next frame ────────────────────────────────────────────
@@ -502,122 +1844,102 @@ async def websocket_chat(websocket: WebSocket):
 
             # ── Binary: accumulate PCM audio ──────────────────────────────────
             if "bytes" in message and message["bytes"]:
-                audio_chunks.append(message["bytes"])
-                n = len(audio_chunks)
+                was_truncated = pcm.truncated
+                if transcriber is not None:
+                    endpointed = transcriber.feed(message["bytes"])
+                else:
+                    endpointed = False
+                    detector.feed(message["bytes"])
+                n = pcm.chunks
                 if n == 1:
                     logger.info("  [ESP32→SVR] first PCM chunk received — recording in progress")
                 elif n % 20 == 0:
-                    accumulated = sum(len(c) for c in audio_chunks)
                     logger.info(
                         "  [ESP32→SVR] buffering...  chunks=%d  accumulated=%d B  (%.2f s)",
-                        n, accumulated, accumulated / (SERVER_SAMPLE_RATE * 2),
+                        n, len(pcm), len(pcm) / (SERVER_SAMPLE_RATE * 2),
                     )
-                continue
+                if pcm.truncated and not was_truncated:
+                    logger.warning(
+                        "  [ESP32→SVR] utterance hit the %.0f s cap — dropping further audio",
+                        STT_MAX_UTTERANCE_S,
+                    )
+                if BARGE_IN and responding() and (transcriber or detector).has_speech:
+                    await cancel_response("new speech")
+                if not endpointed:
+                    continue
+                logger.info(
+                    "  [SVR] server-side endpoint after %d ms of silence", VAD_ENDPOINT_MS,
+                )
+                answered_early = True
 
             # ── Text: handle control messages ─────────────────────────────────
-            if "text" not in message or not message["text"]:
-                continue
-
-            try:
-                data = json.loads(message["text"])
-            except json.JSONDecodeError:
-                logger.warning("Non-JSON text frame: %s", message["text"][:80])
-                continue
-
-            instruction_type = data.get("type", "")
-            instruction_body = data.get("msg", "")
-
-            if instruction_type != "instruction" or instruction_body != "end_of_speech":
-                logger.debug("Ignoring unhandled message: %s", data)
-                continue
-
-            # ── end_of_speech: run the pipeline ───────────────────────────────
-            if not audio_chunks:
+            else:
+                if "text" not in message or not message["text"]:
+                    continue
+
+                try:
+                    data = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    logger.warning("Non-JSON text frame: %s", message["text"][:80])
+                    continue
+
+                instruction_type = data.get("type", "")
+                instruction_body = data.get("msg", "")
+
+                if instruction_type != "instruction":
+                    logger.debug("Ignoring unhandled message: %s", data)
+                    continue
+                if instruction_body == "buffer_level":
+                    if playback is not None and isinstance(data.get("ms"), (int, float)):
+                        playback.feedback(data["ms"], CLIENT_BUFFER_TARGET_MS)
+                    continue
+                if instruction_body == "cancel":
+                    await cancel_response("cancel instruction")
+                    continue
+                if instruction_body != "end_of_speech":
+                    logger.debug("Ignoring unhandled message: %s", data)
+                    continue
+
+                # The device's own end_of_speech for an utterance the server
+                # already endpointed: drop the trailing silence quietly.
+                if answered_early and not transcriber.has_speech:
+                    logger.info("  [ESP32→SVR] end_of_speech after server endpoint — ignoring")
+                    answered_early = False
+                    transcriber.reset()
+                    continue
+                answered_early = False
+
+            # ── end_of_speech: hand the utterance to a response task ──────────
+            if not len(pcm):
                 logger.warning("  [ESP32→SVR] end_of_speech but no audio buffered — ignoring")
                 await ws_send_json(websocket, type="error", msg="no audio received")
                 continue
 
+            if BARGE_IN:
+                await cancel_response("new utterance")
+            elif responding():
+                await asyncio.wait([response_task])
+
             utterance_n  += 1
-            audio_bytes   = b"".join(audio_chunks)
-            audio_chunks  = []
+            audio_bytes   = pcm.view()
             audio_dur_s   = len(audio_bytes) / (SERVER_SAMPLE_RATE * 2)
             utterance_start = time.monotonic()
 
             logger.info(_sep(f"UTTERANCE #{utterance_n}"))
             logger.info(
                 "  [ESP32→SVR] end_of_speech  chunks=%d  pcm=%d B  duration=%.2f s",
-                len(audio_chunks) + 1 if audio_chunks else 1,
-                len(audio_bytes), audio_dur_s,
+                pcm.chunks, len(audio_bytes), audio_dur_s,
             )
 
-            logger.info("  [SVR→ESP32] sending RESPONSE.CREATED")
-            await ws_send_json(websocket, type="server", msg="RESPONSE.CREATED")
-
-            client = app.state.http_client
-            try:
-                transcript, reply, saved_path = await run_pipeline(
-                    audio_bytes, client, source="ws"
-                )
-            except ValueError as ve:
-                logger.warning("  pipeline error: %s — sending error + RESPONSE.COMPLETE", ve)
-                await ws_send_json(websocket, type="error", msg=str(ve))
-                await ws_send_json(websocket, type="server", msg="RESPONSE.COMPLETE")
-                continue
-
-            logger.info(_sep("TTS + OPUS"))
-            logger.info("  [SVR→ESP32] sending transcript: %r", transcript[:80])
-            await ws_send_json(websocket, type="transcript", msg=transcript)
-            logger.info("  [SVR→ESP32] sending response:   %r", reply[:80])
-            await ws_send_json(websocket, type="response",   msg=reply)
-
-            loop      = asyncio.get_event_loop()
-            pcm_bytes = await loop.run_in_executor(None, _run_silero_tts, reply)
-
-            if pcm_bytes:
-                t_enc = time.monotonic()
-                opus_packets = await loop.run_in_executor(
-                    None, encode_pcm_to_opus, pcm_bytes
-                )
-                total        = len(opus_packets)
-                total_bytes  = sum(len(p) for p in opus_packets)
-                stream_dur_s = total * FRAME_PACING_S
-                logger.info(
-                    "  [SVR→ESP32] streaming %d Opus packets  "
-                    "pacing=%.0f ms/pkt (%.0f%% RT)  "
-                    "total_opus=%d B  expected_stream_time=%.2f s",
-                    total, FRAME_PACING_S * 1000, FRAME_PACING_FACTOR * 100,
-                    total_bytes, stream_dur_s,
-                )
-                stream_start = time.monotonic()
-                for idx, packet in enumerate(opus_packets):
-                    await websocket.send_bytes(packet)
-                    if idx == 0:
-                        logger.info("  [SVR→ESP32] first Opus packet sent")
-                    deadline  = stream_start + (idx + 1) * FRAME_PACING_S
-                    remaining = deadline - time.monotonic()
-                    if remaining > 0:
-                        await asyncio.sleep(remaining)
-                actual_stream_s = time.monotonic() - stream_start
-                logger.info(
-                    "  [SVR→ESP32] all %d Opus packets sent  "
-                    "actual_stream_time=%.2f s  expected=%.2f s  drift=%.0f ms",
-                    total, actual_stream_s, stream_dur_s,
-                    (actual_stream_s - stream_dur_s) * 1000,
-                )
-            else:
-                logger.error("  TTS returned empty audio — nothing to stream")
-
-            logger.info("  [SVR→ESP32] sending RESPONSE.COMPLETE")
-            await ws_send_json(websocket, type="server", msg="RESPONSE.COMPLETE")
-
-            utterance_elapsed = time.monotonic() - utterance_start
-            logger.info(
-                _sep(f"UTTERANCE #{utterance_n} DONE"),
-            )
-            logger.info(
-                "  total wall time for this utterance: %.2f s  "
-                "(session uptime: %.0f s)",
-                utterance_elapsed, time.monotonic() - session_start,
+            # The response owns this utterance's audio (and transcriber);
+            # recording continues into a spare buffer.
+            utterance_transcriber = transcriber
+            utterance_pcm         = pcm
+            pcm                   = take_pcm()
+            transcriber           = new_transcriber(pcm)
+            detector              = new_detector(pcm)
+            response_task = asyncio.create_task(
+                respond(utterance_n, audio_bytes, utterance_transcriber, utterance_pcm, utterance_start)
             )
 
     except WebSocketDisconnect:
@@ -636,6 +1958,15 @@ async def websocket_chat(websocket: WebSocket):
             await websocket.close()
         except Exception:
             pass
+    finally:
+        if responding():
+            response_task.cancel()
+            await asyncio.wait([response_task])
+        if transcriber is not None:
+            await transcriber.close()
+        if memory is not None:
+            memory.close()
+        SESSIONS.inc(-1)
 
 
 # ─── HTTP fallback endpoint ───────────────────────────────────────────────────
@@ -663,10 +1994,9 @@ async def http_chat(request: Request):
         except ValueError as ve:
             return Response(content=f"ERROR:{ve}".encode(), status_code=400)
 
-        logger.info("HTTP audio saved: %s", saved_path)
+        logger.info("HTTP audio recording: %s", saved_path)
 
-        loop      = asyncio.get_event_loop()
-        pcm_bytes = await loop.run_in_executor(None, _run_silero_tts, reply)
+        pcm_bytes, _ = await synthesize_speech(reply)
 
         async def response_generator():
             yield f"TRANSCRIPT:{transcript}\nREPLY:{reply}\n---AUDIO---\n".encode()
@@ -684,7 +2014,7 @@ async def http_chat(request: Request):
                 "X-Audio-SampleRate": str(silero_sample_rate),
                 "X-Audio-Channels":   "1",
                 "X-Audio-BitDepth":   "16",
-                "X-Saved-File":       os.path.basename(saved_path),
+                "X-Saved-File":       os.path.basename(saved_path or ""),
                 "Cache-Control":      "no-cache",
             },
         )
@@ -0,0 +1,121 @@
+"""
+Per-session conversation memory for the voice pipeline.
+
+Recent turns are kept verbatim; once the history outgrows its token budget,
+the oldest turns are folded into a rolling summary by a background task, so
+the prompt sent with every utterance stays roughly constant in size however
+long the session runs.  Until a fold completes the turns it covers stay in
+the prompt, so a slow or failed summary never loses context — and a hard
+cap drops the oldest turns if summarising keeps failing.
+
+Memory lives only as long as the WebSocket session; nothing is persisted.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+logger = logging.getLogger("aasha")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Turn:
+    """One exchange: what the user said and what was spoken back."""
+    user: str
+    model: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.user) + estimate_tokens(self.model)
+
+
+# summarise(previous_summary, turns_to_fold) -> new summary
+Summariser = Callable[[str, list[Turn]], Awaitable[str]]
+
+
+class ConversationMemory:
+    """
+    Token-budgeted history of one conversation.
+
+    Args:
+        summarise:   async callable folding turns into the running summary.
+        max_tokens:  budget for summary plus verbatim turns; exceeding it
+                     schedules a fold.
+        keep_recent: turns always kept verbatim.
+        hard_limit:  multiple of max_tokens past which the oldest turns are
+                     dropped outright (summaries failing or too slow).
+    """
+
+    def __init__(
+        self,
+        summarise: Summariser,
+        max_tokens: int = 1500,
+        keep_recent: int = 4,
+        hard_limit: float = 2.0,
+    ):
+        self._summarise  = summarise
+        self.max_tokens  = max_tokens
+        self.keep_recent = max(keep_recent, 1)
+        self.hard_limit  = hard_limit
+        self.summary     = ""
+        self.turns: list[Turn] = []
+        self._folding: asyncio.Task | None = None
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(t.tokens for t in self.turns)
+
+    def contents(self, prompt: str) -> list[dict]:
+        """Gemini contents for a new user prompt, preceded by the verbatim turns."""
+        contents = []
+        for turn in self.turns:
+            contents.append({"role": "user",  "parts": [{"text": turn.user}]})
+            contents.append({"role": "model", "parts": [{"text": turn.model}]})
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        return contents
+
+    def add(self, user: str, model: str) -> None:
+        """Record a finished exchange and fold old turns if over budget."""
+        if not user or not model:
+            return
+        self.turns.append(Turn(user, model))
+        if self.tokens <= self.max_tokens or len(self.turns) <= self.keep_recent:
+            return
+        if self._folding is None or self._folding.done():
+            self._folding = asyncio.create_task(self._fold())
+        while self.tokens > self.max_tokens * self.hard_limit and len(self.turns) > self.keep_recent:
+            dropped = self.turns.pop(0)
+            logger.warning("  memory: over hard limit — dropped a turn unsummarised (%d tokens)", dropped.tokens)
+
+    async def _fold(self) -> None:
+        """Summarise everything but the most recent turns into self.summary."""
+        old = self.turns[: len(self.turns) - self.keep_recent]
+        if not old:
+            return
+        try:
+            summary = await self._summarise(self.summary, old)
+        except Exception as exc:
+            logger.warning("  memory: summary failed, keeping turns verbatim: %s", exc)
+            return
+        if not summary:
+            return
+        # Turns may have been appended (or dropped from the front) while the
+        # summary ran; remove whichever of the summarised ones are still here.
+        folded     = {id(turn) for turn in old}
+        self.turns = [turn for turn in self.turns if id(turn) not in folded]
+        self.summary = summary
+        logger.info(
+            "  memory: folded turns into summary  summary_tokens=%d  verbatim_turns=%d  total_tokens=%d",
+            estimate_tokens(summary), len(self.turns), self.tokens,
+        )
+
+    def close(self) -> None:
+        """Cancel a pending fold (the session is over)."""
+        if self._folding is not None:
+            self._folding.cancel()
@@ -0,0 +1,248 @@
+"""
+Stage-level latency metrics and optional tracing.
+
+A small, dependency-free metrics registry rendered in the Prometheus text
+exposition format (served on /metrics).  Histograms use fixed cumulative
+buckets, so p95/p99 per stage are computed by the scraper
+(histogram_quantile) over any window rather than by the server over the
+last few hundred samples.  Gauges can be computed at scrape time from a
+callback, which is how pool saturation is exported without touching the
+hot path.
+
+Tracing is optional: with OpenTelemetry installed and enabled, span()
+opens a span under the current one (each utterance is a root span, the
+stages its children); otherwise it is a no-op context manager.
+"""
+
+import bisect
+import contextlib
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:     # tracing is optional
+    _otel_trace = None
+
+# Seconds, from a cached TTS hit to a slow Gemini call.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0)
+# Real-time factors (processing time / audio duration).
+RTF_BUCKETS     = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0)
+# Signed seconds: negative means ahead of schedule.
+DRIFT_BUCKETS   = (-1.0, -0.5, -0.25, -0.1, -0.05, -0.02, 0.0, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name        = name
+        self.help        = help
+        self.label_names = tuple(labels)
+        self._lock       = threading.Lock()
+
+    def _key(self, values: Sequence) -> tuple:
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(values)}")
+        return tuple(str(v) for v in values)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _Bound:
+    """A metric with its label values fixed, e.g. POOL_WAIT.labels("stt")."""
+
+    def __init__(self, metric: "_Metric", values: tuple):
+        self._metric = metric
+        self._values = values
+
+    def observe(self, value: float) -> None:
+        self._metric.observe(value, *self._values)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._metric.inc(amount, *self._values)
+
+    def set(self, value: float) -> None:
+        self._metric.set(value, *self._values)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observations (seconds, ratios, …)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}    # labels -> [per-bucket counts..., sum, count]
+
+    def labels(self, *values) -> _Bound:
+        return _Bound(self, self._key(values))
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        """Observe the wall time of a with-block."""
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - t0, *labels)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _labels(self.label_names, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {values[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {values[-1]}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic counter, optionally read from a callback at scrape time."""
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        collect: Callable[[], dict[tuple, float]] | None = None,
+    ):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def labels(self, *values) -> _Bound:
+        return _Bound(self, self._key(values))
+
+    def inc(self, amount: float = 1.0, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _snapshot(self) -> dict[tuple, float]:
+        if self._collect is not None:
+            return {self._key(k): v for k, v in self._collect().items()}
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, value in sorted(self._snapshot().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down, optionally read from a callback."""
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Registry:
+    """Named metrics in registration order; render() produces the /metrics body."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} registered twice")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = (), collect=None) -> Counter:
+        return self._add(Counter(name, help, labels, collect))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = (), collect=None) -> Gauge:
+        return self._add(Gauge(name, help, labels, collect))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ─── Tracing ──────────────────────────────────────────────────────────────────
+
+_tracer = None
+
+
+def enable_tracing(service: str) -> bool:
+    """Turn span() on if OpenTelemetry is installed; returns whether it is."""
+    global _tracer
+    if _otel_trace is None:
+        return False
+    _tracer = _otel_trace.get_tracer(service)
+    return True
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """A child span of the current one while tracing is on; otherwise nothing."""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes):
+        yield
+
+
+def record_span(name: str, started: float, **attributes) -> None:
+    """
+    Record a finished span that began at monotonic time `started`.
+
+    For stages that run inside async generators, where a span cannot be
+    held open as the current one across yields.
+    """
+    if _tracer is None:
+        return
+    end_ns   = time.time_ns()
+    start_ns = end_ns - int((time.monotonic() - started) * 1e9)
+    _tracer.start_span(name, start_time=start_ns, attributes=attributes).end(end_time=end_ns)
@@ -0,0 +1,149 @@
+"""
+Multi-process model serving for the voice pipeline.
+
+With STT_WORKER_PROCESSES / TTS_WORKER_PROCESSES set, Whisper and Silero no
+longer run inside the asyncio process.  Each role gets a pool of spawned
+worker processes, and every worker loads its own copy of the model once in
+its initializer, so inference escapes the front end's GIL and throughput
+scales with the number of cores.
+
+IPC: utterance PCM is written once into a shared-memory block owned by the
+front end and only its name and length are pickled to the worker, which
+reads the samples in place.  Text
+goes over the executor's pipe, as does the synthesised PCM coming back.
+"""
+
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from pcm_buffer import PCMData
+
+logger = logging.getLogger("aasha")
+
+# Server module as imported inside a worker process; its model globals are
+# filled in by _init_worker.
+_server = None
+
+
+# ─── Worker side ─────────────────────────────────────────────────────────────
+
+def _init_worker(role: str) -> None:
+    """Load the model for this worker's role into the worker's own process."""
+    global _server
+    import main as server
+
+    if role == "stt":
+        server.whisper_model = server.load_whisper()
+    else:
+        server.silero_model, server.silero_sample_rate = server.load_silero()
+    _server = server
+    logger.info("Model worker ready  role=%s  pid=%d", role, os.getpid())
+
+
+def _warmup(delay: float) -> int:
+    """Hold a worker briefly so every process in the pool gets spawned."""
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _transcribe_shared(shm_name: str, nbytes: int) -> str:
+    """Transcribe PCM handed over in a shared-memory block, read in place."""
+    shm = SharedMemory(name=shm_name)
+    try:
+        with shm.buf[:nbytes] as audio:
+            return _server._run_whisper(audio)
+    finally:
+        shm.close()
+
+
+def _transcribe_batch_shared(blocks: list[tuple[str, int]]) -> list[str]:
+    """Batch-transcribe several shared-memory PCM blocks in one decode."""
+    batch = []
+    for shm_name, nbytes in blocks:
+        shm = SharedMemory(name=shm_name)
+        try:
+            batch.append(bytes(shm.buf[:nbytes]))
+        finally:
+            shm.close()
+    return _server._run_whisper_batch(batch)
+
+
+def _synthesize(text: str) -> bytes:
+    """Synthesise text with this worker's Silero model."""
+    return _server._run_silero_tts(text)
+
+
+def _synthesize_batch(texts: list[str]) -> list[bytes]:
+    """Synthesise a batch of sentences with this worker's Silero model."""
+    return _server._run_silero_tts_batch(texts)
+
+
+# ─── Front-end side ──────────────────────────────────────────────────────────
+
+def executor_factory(role: str):
+    """
+    Return an InferencePool executor factory that spawns model workers.
+
+    The spawn start method is used because forking a process that already
+    holds torch / CTranslate2 thread pools is not safe.
+    """
+    def _make(max_workers: int) -> Executor:
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(role,),
+        )
+    return _make
+
+
+async def warm_up(pool, processes: int) -> None:
+    """Spawn and initialise every worker of a pool before the first request."""
+    t0   = time.monotonic()
+    pids = await asyncio.gather(*(pool.run(_warmup, 0.5) for _ in range(processes)))
+    logger.info(
+        "Model workers up  pool=%s  processes=%d  took=%.1f s",
+        pool.name, len(set(pids)), time.monotonic() - t0,
+    )
+
+
+async def transcribe(pool, audio_bytes: PCMData) -> str:
+    """Run Whisper on a worker process, passing the PCM through shared memory."""
+    shm = SharedMemory(create=True, size=max(len(audio_bytes), 1))
+    try:
+        shm.buf[: len(audio_bytes)] = audio_bytes
+        return await pool.run(_transcribe_shared, shm.name, len(audio_bytes))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+async def transcribe_batch(pool, batch: list[PCMData]) -> list[str]:
+    """Run one batched Whisper decode on a worker process."""
+    blocks = [SharedMemory(create=True, size=max(len(b), 1)) for b in batch]
+    try:
+        for shm, audio_bytes in zip(blocks, batch):
+            shm.buf[: len(audio_bytes)] = audio_bytes
+        return await pool.run(
+            _transcribe_batch_shared,
+            [(shm.name, len(b)) for shm, b in zip(blocks, batch)],
+        )
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+async def synthesize(pool, text: str) -> bytes:
+    """Run Silero on a worker process and return its 16-bit PCM."""
+    return await pool.run(_synthesize, text)
+
+
+async def synthesize_batch(pool, texts: list[str]) -> list[bytes]:
+    """Run one TTS batch on a worker process."""
+    return await pool.run(_synthesize_batch, texts)
@@ -0,0 +1,144 @@
+"""
+Reusable Opus encoder for the streamed TTS path.
+
+One OpusStreamEncoder keeps a libopus encoder (and its prediction state)
+alive for a whole session or stream instead of creating one per sentence.
+PCM is accepted incrementally: whole frames are encoded straight out of a
+contiguous int16 array by pointer, a partial trailing frame is carried over
+to the next call, and flush() zero-pads it so no audio is ever dropped.
+"""
+
+import ctypes
+import threading
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import opuslib
+import opuslib.api.ctl
+import opuslib.api.encoder
+
+# Largest packet libopus can produce for one frame (RFC 6716 §3.2.1).
+MAX_PACKET_BYTES = 1275 * 3 + 7
+
+
+class OpusStreamEncoder:
+    """
+    Stateful mono 16-bit Opus encoder fed with arbitrary-sized PCM pieces.
+
+    Calls are serialised by a lock, so a job left running by a cancelled
+    stream cannot interleave its frames with the next stream's.
+
+    Args:
+        sample_rate:   PCM sample rate in Hz.
+        frame_samples: samples per Opus frame (e.g. 480 for 20 ms at 24 kHz).
+        bitrate:       target bitrate in bit/s; 0 keeps the libopus default.
+        complexity:    0–10; -1 keeps the libopus default.
+        dtx:           discontinuous transmission (tiny packets in silence).
+        application:   opuslib application constant.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_samples: int,
+        bitrate: int = 0,
+        complexity: int = -1,
+        dtx: bool = False,
+        application: str = opuslib.APPLICATION_VOIP,
+    ):
+        self.sample_rate   = sample_rate
+        self.frame_samples = frame_samples
+        self._encoder      = opuslib.Encoder(sample_rate, 1, application)
+        self._state        = self._encoder.encoder_state
+        if bitrate:
+            self._encoder.bitrate = bitrate
+        if complexity >= 0:
+            self._encoder.complexity = complexity
+        if dtx:
+            # opuslib's dtx property setter sends the GET request, so set it directly.
+            opuslib.api.encoder.encoder_ctl(self._state, opuslib.api.ctl.set_dtx, 1)
+        self._out          = ctypes.create_string_buffer(MAX_PACKET_BYTES)
+        self._carry        = np.zeros(frame_samples, dtype=np.int16)
+        self._carry_len    = 0
+        self._odd_byte     = b""
+        self._lock         = threading.Lock()
+
+    def reset(self) -> None:
+        """Drop any carried samples and reset the codec state."""
+        with self._lock:
+            self._encoder.reset_state()
+            self._carry_len = 0
+            self._odd_byte  = b""
+
+    def _encode_frames(self, samples: np.ndarray) -> list[bytes]:
+        """Encode whole frames of a C-contiguous int16 array in place."""
+        fs      = self.frame_samples
+        base    = samples.ctypes.data
+        step    = fs * samples.itemsize
+        packets = []
+        for i in range(len(samples) // fs):
+            frame  = ctypes.cast(base + i * step, opuslib.api.c_int16_pointer)
+            result = opuslib.api.encoder.libopus_encode(
+                self._state, frame, fs, self._out, MAX_PACKET_BYTES,
+            )
+            if result < 0:
+                raise opuslib.OpusError(f"Opus encoder returned {result}")
+            packets.append(ctypes.string_at(self._out, result))
+        return packets
+
+    def encode(self, pcm) -> list[bytes]:
+        """Encode every complete frame available; keep the remainder for later."""
+        with self._lock:
+            return self._encode(pcm)
+
+    def _encode(self, pcm) -> list[bytes]:
+        if self._odd_byte or len(pcm) % 2:
+            # A piece split mid-sample: the only case that copies the input.
+            pcm = self._odd_byte + bytes(pcm)
+            self._odd_byte = pcm[len(pcm) - len(pcm) % 2 :]
+        usable  = len(pcm) - len(pcm) % 2
+        samples = np.frombuffer(pcm, dtype=np.int16, count=usable // 2)
+        packets: list[bytes] = []
+
+        if self._carry_len:
+            take = min(self.frame_samples - self._carry_len, len(samples))
+            self._carry[self._carry_len : self._carry_len + take] = samples[:take]
+            self._carry_len += take
+            samples = samples[take:]
+            if self._carry_len < self.frame_samples:
+                return packets
+            packets += self._encode_frames(self._carry)
+            self._carry_len = 0
+
+        whole = len(samples) - len(samples) % self.frame_samples
+        if whole:
+            packets += self._encode_frames(np.ascontiguousarray(samples[:whole]))
+        tail = len(samples) - whole
+        if tail:
+            self._carry[:tail] = samples[whole:]
+            self._carry_len    = tail
+        return packets
+
+    def flush(self) -> list[bytes]:
+        """Zero-pad and encode the carried partial frame, if any."""
+        with self._lock:
+            return self._flush()
+
+    def _flush(self) -> list[bytes]:
+        self._odd_byte = b""
+        if not self._carry_len:
+            return []
+        self._carry[self._carry_len :] = 0
+        self._carry_len = 0
+        return self._encode_frames(self._carry)
+
+    def encode_all(self, pcm) -> list[bytes]:
+        """Encode a complete clip, padding its last frame."""
+        with self._lock:
+            return self._encode(pcm) + self._flush()
+
+    def iter_packets(self, pieces: Iterable) -> Iterator[bytes]:
+        """Generator form: PCM pieces in, Opus packets out, tail padded at the end."""
+        for pcm in pieces:
+            yield from self.encode(pcm)
+        yield from self.flush()
@@ -0,0 +1,256 @@
+"""
+Shared paced-send scheduler for Opus output.
+
+Instead of every session sleeping once per 20 ms packet, one scheduler
+task wakes once per tick and flushes every packet that has come due across
+all open streams.  Each stream keeps absolute deadlines (start + k × pace),
+so a late tick — e.g. while inference threads hold the GIL — is caught up
+on the next one instead of accumulating as drift.
+
+A stream whose producer falls behind has its clock rebased on the late
+packet rather than bursting the backlog at the device.  Streams may send a
+few frames per wakeup (burst) and can be sped up or slowed down from client
+buffer feedback.  Each tick starts the due sends of every stream and waits
+for them together, at most one tick long; a send still in flight after that
+keeps running on its own and its stream is skipped until it completes, so
+one slow client cannot hold up the others.  Neither new packets nor
+finished sends wake a ticking scheduler: new packets only wake it when it
+is idle, and everything else waits for the next tick.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+from workers import _percentile
+
+logger = logging.getLogger("aasha")
+
+
+class PacedStream:
+    """One session's outgoing packet queue; created by PacedSender.open()."""
+
+    def __init__(
+        self,
+        scheduler: "PacedSender",
+        send: Callable[[bytes], Awaitable[None]],
+        label: str,
+        max_buffered: int,
+    ):
+        self.label        = label
+        self.sent         = 0
+        self.sent_bytes   = 0
+        self.underruns    = 0
+        self.first_at: float | None = None
+        self.rate         = 1.0      # multiplier on the pace; < 1 sends faster
+        self._scheduler   = scheduler
+        self._send        = send
+        self._queue: deque[bytes] = deque()
+        self._max_buffered = max(max_buffered, 1)
+        self._space       = asyncio.Event()
+        self._space.set()
+        self._done        = asyncio.get_running_loop().create_future()
+        self._start       = 0.0      # clock origin: deadline(k) = start + k·pace·rate
+        self._closed      = False
+        self._busy        = False
+        self._flushing: asyncio.Task | None = None    # send in flight, held until done
+
+    def _deadline(self, k: int) -> float:
+        return self._start + k * self._scheduler.pace_s * self.rate
+
+    async def put(self, packet: bytes) -> None:
+        """Queue a packet, waiting while the stream holds max_buffered of them."""
+        while len(self._queue) >= self._max_buffered and not self._done.done():
+            self._space.clear()
+            await self._space.wait()
+        if self._done.done():
+            self._done.result()     # re-raise a send failure
+            return
+        now = time.monotonic()
+        if not self._start:
+            self._start = now
+        elif not self._queue and not self._busy and now > self._deadline(self.sent) + self._scheduler.frame_s:
+            self.underruns += 1
+            self._start = now - self.sent * self._scheduler.pace_s * self.rate
+        self._queue.append(packet)
+        self._scheduler._wake_if_idle()
+
+    def close(self) -> None:
+        """No more packets: the stream finishes once its queue drains."""
+        self._closed = True
+        self._scheduler._wake_if_idle()
+
+    def feedback(self, buffered_ms: float, target_ms: float) -> None:
+        """
+        Adapt the pace to the client's reported playback buffer: send faster
+        when it runs below target_ms, slower (down to real time) above it.
+        """
+        error = (buffered_ms - target_ms) / max(target_ms, 1.0)
+        rate  = min(max(1.0 + 0.25 * error, self._scheduler.min_rate), 1.0 / self._scheduler.pacing_factor)
+        # Rebase so the next packet keeps its deadline under the new rate.
+        self._start += self.sent * self._scheduler.pace_s * (self.rate - rate)
+        self.rate    = rate
+
+    async def wait(self) -> None:
+        """Wait until every queued packet has been sent (or a send failed)."""
+        await self._done
+
+    def cancel(self) -> None:
+        """Drop unsent packets and detach from the scheduler."""
+        self._queue.clear()
+        self._finish(None)
+
+    def _finish(self, exc: BaseException | None) -> None:
+        if not self._done.done():
+            if exc is None:
+                self._done.set_result(None)
+            else:
+                self._done.set_exception(exc)
+        self._space.set()
+        self._scheduler._streams.discard(self)
+
+    @property
+    def drift_s(self) -> float:
+        """How far the stream is behind its own schedule right now."""
+        if not self.sent:
+            return 0.0
+        return max(time.monotonic() - self._deadline(self.sent), 0.0) if self._queue else 0.0
+
+    def _due(self, now: float) -> int:
+        """Packets that may go out this tick (up to the burst size)."""
+        # Deadlines are not aligned to ticks: allow up to half a frame early
+        # so the average packet goes out on time rather than half a tick late.
+        horizon = now + (self._scheduler.burst - 0.5) * self._scheduler.pace_s * self.rate
+        n = 0
+        while n < len(self._queue) and n < self._scheduler.burst and self._deadline(self.sent + n) <= horizon:
+            n += 1
+        return n
+
+    def _start_flush(self, packets: list[bytes]) -> asyncio.Task:
+        self._busy     = True
+        self._flushing = asyncio.create_task(self._flush(packets))
+        self._flushing.add_done_callback(self._flush_done)
+        return self._flushing
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        """Tear the stream down if a send ended other than through _flush's own handling."""
+        self._flushing = None
+        if task.cancelled():
+            exc = ConnectionError(f"paced send to {self.label or 'stream'} was cancelled")
+        else:
+            exc = task.exception()
+        if exc is not None:
+            self._busy = False
+            self._queue.clear()
+            self._finish(exc)
+
+    async def _flush(self, packets: list[bytes]) -> None:
+        try:
+            for packet in packets:
+                if self.first_at is None:
+                    self.first_at = time.monotonic()
+                await self._send(packet)
+                self.sent       += 1
+                self.sent_bytes += len(packet)
+        except Exception as exc:
+            self._queue.clear()
+            self._finish(exc)
+        finally:
+            self._busy = False
+        self._space.set()
+        if self._closed and not self._queue:
+            self._finish(None)
+
+
+class PacedSender:
+    """
+    Process-wide scheduler that paces every PacedStream from one task.
+
+    Args:
+        frame_s:       audio duration of one packet.
+        pacing_factor: fraction of real time to pace at (< 1 keeps the
+                       client's buffer growing slightly).
+        burst:         frames a stream may send per wakeup; the tick is
+                       burst × pace.
+        min_rate:      fastest pace allowed by client feedback, as a
+                       multiple of the nominal pace.
+    """
+
+    def __init__(self, frame_s: float, pacing_factor: float, burst: int = 1, min_rate: float = 0.8):
+        self.frame_s       = frame_s
+        self.pacing_factor = pacing_factor
+        self.pace_s        = frame_s * pacing_factor
+        self.burst         = max(burst, 1)
+        self.min_rate      = min_rate
+        self._streams: set[PacedStream] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._idle         = False
+        self._task: asyncio.Task | None = None
+        self._ticks        = 0
+        self._lateness     = deque(maxlen=512)
+
+    def open(self, send: Callable[[bytes], Awaitable[None]], label: str = "", max_buffered: int = 100) -> PacedStream:
+        """Register a new stream; the scheduler task starts on first use."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task   = asyncio.create_task(self._run())
+        stream = PacedStream(self, send, label, max_buffered)
+        self._streams.add(stream)
+        return stream
+
+    def _wake_if_idle(self) -> None:
+        """Start an idle scheduler; a ticking one picks new work up on its next tick."""
+        if self._idle:
+            self._idle = False
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        tick_s    = self.pace_s * self.burst
+        next_tick = time.monotonic()
+        while True:
+            if not any(s._queue or s._closed for s in self._streams):
+                self._wakeup.clear()
+                self._idle = True
+                await self._wakeup.wait()
+                next_tick = time.monotonic()
+            else:
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            now = time.monotonic()
+            self._lateness.append(max(now - next_tick, 0.0))
+            self._ticks += 1
+            next_tick = max(next_tick + tick_s, now - tick_s)
+            await self._tick(now, tick_s)
+
+    async def _tick(self, now: float, tick_s: float) -> None:
+        """Send every due packet across all streams and wait (up to a tick) for the sends."""
+        flushes = []
+        for stream in list(self._streams):
+            if stream._busy:
+                continue
+            n = stream._due(now)
+            if n:
+                flushes.append(stream._start_flush([stream._queue.popleft() for _ in range(n)]))
+            elif stream._closed and not stream._queue:
+                stream._finish(None)
+        if flushes:
+            await asyncio.wait(flushes, timeout=tick_s)
+
+    def stats(self) -> dict:
+        """Active streams and how late the scheduler's ticks have been."""
+        lateness = list(self._lateness)
+        return {
+            "streams":         len(self._streams),
+            "burst":           self.burst,
+            "ticks":           self._ticks,
+            "tick_late_ms_p50": round(_percentile(lateness, 50) * 1000, 2),
+            "tick_late_ms_p95": round(_percentile(lateness, 95) * 1000, 2),
+            "tick_late_ms_max": round(max(lateness, default=0.0) * 1000, 2),
+            "drift_ms": {
+                s.label: round(s.drift_s * 1000, 1) for s in self._streams if s.label
+            },
+        }
@@ -0,0 +1,97 @@
+"""
+Per-session PCM ingest buffer.
+
+Incoming WebSocket chunks are copied once into a preallocated, growable
+byte array; everything downstream (VAD, Whisper, the debug WAV writer, the
+shared-memory hand-off to model workers) reads zero-copy views of it.
+
+Views handed out stay valid after the buffer grows or is cleared: growth
+moves the data to a new array and leaves the old one to the views that
+reference it, and clear() after views were exported starts the next
+utterance in fresh storage rather than overwriting audio that a background
+transcription may still be reading.  Reads that do not outlive the call
+(samples(), used by the VAD on every frame) do not count as exports, and
+recycle() lets the owner declare the exported views finished so a session
+can keep reusing the same storage.
+"""
+
+import numpy as np
+
+# Bytes-like PCM accepted by the STT and audio helpers.
+PCMData = bytes | bytearray | memoryview
+
+
+class PCMBuffer:
+    """
+    Growable 16-bit PCM buffer with a hard cap on utterance length.
+
+    Args:
+        max_bytes:     hard cap; audio beyond it is dropped.
+        initial_bytes: capacity allocated up front for each utterance.
+    """
+
+    def __init__(self, max_bytes: int, initial_bytes: int = 0):
+        self.max_bytes     = max_bytes
+        self.initial_bytes = min(max(initial_bytes, 2), max_bytes)
+        self._data: np.ndarray | None = None
+        self._exported     = False
+        self.clear()
+
+    def clear(self) -> None:
+        """Start a new utterance, reusing storage when no views are outstanding."""
+        if self._exported or self._data is None:
+            self._data = np.empty(self.initial_bytes, dtype=np.uint8)
+            self._exported = False
+        self._len      = 0
+        self.chunks    = 0
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, chunk: bytes) -> bool:
+        """
+        Copy a chunk in, growing geometrically up to the cap.
+
+        Returns False if (part of) the chunk was dropped because the
+        utterance reached max_bytes.
+        """
+        self.chunks += 1
+        room = self.max_bytes - self._len
+        if len(chunk) > room:
+            self.truncated = True
+            chunk = chunk[: room - room % 2]
+        if not chunk:
+            return False
+        end = self._len + len(chunk)
+        if end > len(self._data):
+            grown = np.empty(min(max(end, len(self._data) * 2), self.max_bytes), dtype=np.uint8)
+            grown[: self._len] = self._data[: self._len]
+            self._data = grown
+        self._data[self._len : end] = np.frombuffer(chunk, dtype=np.uint8)
+        self._len = end
+        return not self.truncated
+
+    def recycle(self) -> None:
+        """Clear for reuse, declaring that no view handed out is read any more."""
+        self._exported = False
+        self.clear()
+
+    def _slice(self, start: int, end: int | None) -> np.ndarray:
+        end = self._len if end is None else min(end, self._len)
+        return self._data[start:end]
+
+    def view(self, start: int = 0, end: int | None = None) -> memoryview:
+        """Zero-copy view of pcm[start:end] (the whole utterance by default)."""
+        self._exported = True
+        return memoryview(self._slice(start, end))
+
+    def samples(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        Zero-copy int16 view of whole samples in pcm[start:end].
+
+        For reads finished before the next append or clear(): unlike view(),
+        it does not stop clear() from reusing the storage.
+        """
+        data = self._slice(start, end)
+        return data[: len(data) - len(data) % 2].view(np.int16)
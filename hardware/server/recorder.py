@@ -0,0 +1,192 @@
+"""
+Background debug-audio recorder.
+
+Microphone utterances and synthesised replies can be kept on disk for
+debugging.  record() only decides whether a clip is sampled, picks its file
+name and puts it on a bounded queue; a single writer thread drains the queue
+in batches, encodes (WAV, FLAC or Ogg/Opus) and writes the files, and
+periodically applies the retention policy.  A full queue drops the clip
+rather than slowing the pipeline down, and a disabled recorder never starts
+its thread.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import wave
+from datetime import datetime
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger("aasha")
+
+# Output format -> (file extension, soundfile format, soundfile subtype).
+FORMATS = {
+    "wav":  ("wav",  None,   None),
+    "flac": ("flac", "FLAC", "PCM_16"),
+    "opus": ("ogg",  "OGG",  "OPUS"),
+}
+
+_WRITE_BATCH = 16
+
+
+def _is_wav(data) -> bool:
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+class AudioRecorder:
+    """
+    Sampled, bounded, asynchronous writer for 16-bit mono PCM clips.
+
+    Args:
+        directory:    where clips are written.
+        enabled:      when False, record() is a no-op.
+        sample_every: keep 1 in N clips of each kind.
+        fmt:          "wav", "flac" or "opus" (Ogg/Opus).
+        max_queue:    clips waiting to be written before new ones are dropped.
+        max_bytes:    retention: total size of the directory's clips; the
+                      oldest are deleted past it (0 = no size limit).
+        max_age_s:    retention: clips older than this are deleted (0 = keep).
+        sweep_every_s: how often the retention policy runs.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        enabled: bool = True,
+        sample_every: int = 1,
+        fmt: str = "wav",
+        max_queue: int = 64,
+        max_bytes: int = 0,
+        max_age_s: float = 0,
+        sweep_every_s: float = 60.0,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown recording format {fmt!r} (expected one of {sorted(FORMATS)})")
+        self.directory     = directory
+        self.enabled       = enabled
+        self.sample_every  = max(sample_every, 1)
+        self.fmt           = fmt
+        self.max_bytes     = max_bytes
+        self.max_age_s     = max_age_s
+        self.sweep_every_s = sweep_every_s
+        self._queue: queue.Queue = queue.Queue(maxsize=max(max_queue, 1))
+        self._seen: dict[str, int] = {}
+        self._lock         = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._last_sweep   = 0.0
+        self._written      = 0
+        self._dropped      = 0
+        self._deleted      = 0
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, kind: str, pcm, sample_rate: int) -> str | None:
+        """
+        Queue a clip for writing and return the path it will be written to,
+        or None if it was not sampled, the recorder is off or the queue is full.
+
+        pcm may be raw 16-bit PCM or a complete WAV blob (kept as-is) and
+        must not be modified afterwards; buffers from PCMBuffer.view() qualify.
+        """
+        if not self.enabled or not len(pcm):
+            return None
+        with self._lock:
+            n = self._seen.get(kind, 0)
+            self._seen[kind] = n + 1
+            if n % self.sample_every:
+                return None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="aasha-recorder", daemon=True)
+                self._thread.start()
+
+        ext = "wav" if _is_wav(pcm) else FORMATS[self.fmt][0]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = os.path.join(self.directory, f"{kind}_{timestamp}.{ext}")
+        try:
+            self._queue.put_nowait((path, pcm, sample_rate))
+        except queue.Full:
+            self._dropped += 1
+            return None
+        return path
+
+    # ── Writer thread ─────────────────────────────────────────────────────────
+
+    def _writer(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for path, pcm, sample_rate in batch:
+                try:
+                    self._write(path, pcm, sample_rate)
+                    self._written += 1
+                except Exception as exc:
+                    logger.warning("  recorder: failed to write %s: %s", os.path.basename(path), exc)
+            if time.monotonic() - self._last_sweep >= self.sweep_every_s:
+                self._last_sweep = time.monotonic()
+                self.sweep()
+
+    def _write(self, path: str, pcm, sample_rate: int) -> None:
+        if _is_wav(pcm):
+            with open(path, "wb") as f:
+                f.write(pcm)
+        elif self.fmt == "wav":
+            with wave.open(path, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(sample_rate)
+                wf.writeframes(pcm)
+        else:
+            _, fmt, subtype = FORMATS[self.fmt]
+            usable  = len(pcm) - len(pcm) % 2
+            samples = np.frombuffer(pcm, dtype=np.int16, count=usable // 2)
+            sf.write(path, samples, sample_rate, format=fmt, subtype=subtype)
+        logger.debug(
+            "  recorder: wrote %s  pcm=%d B  duration=%.2f s",
+            os.path.basename(path), len(pcm), len(pcm) / (sample_rate * 2),
+        )
+
+    def sweep(self) -> None:
+        """Delete clips past the age limit, then the oldest past the size limit."""
+        if not (self.max_bytes or self.max_age_s):
+            return
+        exts  = {ext for ext, _, _ in FORMATS.values()}
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.rsplit(".", 1)[-1] in exts:
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        files.sort()
+
+        now   = time.time()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            expired = self.max_age_s and now - mtime > self.max_age_s
+            if not expired and not (self.max_bytes and total > self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self._deleted += 1
+
+    def stats(self) -> dict:
+        """Counters since startup."""
+        return {
+            "enabled":      self.enabled,
+            "format":       self.fmt,
+            "sample_every": self.sample_every,
+            "queued":       self._queue.qsize(),
+            "written":      self._written,
+            "dropped":      self._dropped,
+            "deleted":      self._deleted,
+        }
@@ -0,0 +1,188 @@
+"""
+Semantic response cache for short, frequent utterances.
+
+Device traffic is dominated by a handful of near-identical short turns
+("hello", "can you hear me", "thank you", "I'm so stressed").  Replies to
+them are cached under the normalised transcript and reused for a while:
+an exact match on the normalised text is tried first, then the nearest
+cached utterance by cosine similarity of a small embedding computed locally
+on the CPU — a hashed bag of character trigrams and words, which tolerates
+the spelling and punctuation noise of Whisper output without loading a
+model.  A fuzzy match is never allowed to cross a negation ("I'm stressed"
+vs "I'm not stressed").
+
+Each entry can carry the Opus packets of its reply, so a hit on the
+WebSocket path skips Gemini, Silero and the encoder altogether.  Deciding
+which turns may use the cache (safety-flagged ones must not) is up to the
+caller; see cacheable_turn() in main.
+"""
+
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+logger = logging.getLogger("aasha")
+
+EMBED_DIM = 512
+
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+_NEGATIONS   = frozenset({
+    "not", "no", "never", "nothing", "nobody", "cannot", "dont", "doesnt",
+    "didnt", "cant", "wont", "isnt", "arent", "wasnt", "havent",
+})
+
+
+def normalise_utterance(text: str) -> str:
+    """Lower-case, drop punctuation (apostrophes included) and collapse whitespace."""
+    return " ".join(_NON_WORD_RE.sub("", text.lower().replace("'", "")).split())
+
+
+def embed(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    """Unit-length hashed bag of character trigrams and words of a normalised text."""
+    padded   = f" {text} "
+    features = [padded[i : i + 3] for i in range(len(padded) - 2)]
+    features += [f"w:{word}" for word in text.split()]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        vector[zlib.crc32(feature.encode("utf-8")) % dim] += 1.0
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def _negated(text: str) -> bool:
+    return not _NEGATIONS.isdisjoint(text.split())
+
+
+@dataclass
+class CachedReply:
+    """A cached reply, the cost of producing it and (once known) its audio."""
+    key: str
+    reply: str
+    vector: np.ndarray = field(repr=False)
+    cost_s: float
+    created: float
+    packets: list[bytes] = field(default_factory=list, repr=False)
+    hits: int = 0
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL cache of replies keyed on normalised utterances.
+
+    Args:
+        max_entries: least recently used entries are evicted past this.
+        ttl_s:       entries expire this long after they were stored.
+        similarity:  minimum cosine similarity for a fuzzy hit (1.0 = exact only).
+        max_words:   longer utterances are never cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_s: float = 3600.0,
+        similarity: float = 0.85,
+        max_words: int = 6,
+    ):
+        self.max_entries = max(max_entries, 1)
+        self.ttl_s       = ttl_s
+        self.similarity  = similarity
+        self.max_words   = max_words
+        self._entries: OrderedDict[str, CachedReply] = OrderedDict()
+        self._matrix: np.ndarray | None = None    # stacked vectors, rebuilt lazily
+        self._matrix_entries: list[CachedReply] = []   # entry of each matrix row
+        self._lock        = threading.Lock()
+        self._exact_hits  = 0
+        self._fuzzy_hits  = 0
+        self._misses      = 0
+        self._expired     = 0
+        self._saved_s     = 0.0
+
+    def eligible(self, text: str) -> bool:
+        """True if an utterance is short enough to be answered from the cache."""
+        return 0 < len(normalise_utterance(text).split()) <= self.max_words
+
+    def _purge(self, now: float) -> None:
+        expired = [k for k, e in self._entries.items() if now - e.created > self.ttl_s]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._expired += len(expired)
+            self._matrix   = None
+
+    def lookup(self, text: str) -> tuple[CachedReply, float] | None:
+        """Return (entry, similarity) for the best live match, or None."""
+        key = normalise_utterance(text)
+        with self._lock:
+            self._purge(time.monotonic())
+            entry = self._entries.get(key)
+            score = 1.0
+            if entry is None and self.similarity < 1.0 and self._entries:
+                entry, score = self._nearest(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(entry.key)
+            entry.hits += 1
+            if score >= 1.0 and entry.key == key:
+                self._exact_hits += 1
+            else:
+                self._fuzzy_hits += 1
+        return entry, score
+
+    def _nearest(self, key: str) -> tuple[CachedReply | None, float]:
+        # LRU reordering (move_to_end) keeps the matrix valid but not
+        # _entries' order, so rows map to the entries captured with them.
+        if self._matrix is None:
+            self._matrix_entries = list(self._entries.values())
+            self._matrix = np.stack([e.vector for e in self._matrix_entries])
+        entries = self._matrix_entries
+        scores  = self._matrix @ embed(key)
+        best   = int(np.argmax(scores))
+        score  = float(scores[best])
+        if score < self.similarity or _negated(entries[best].key) != _negated(key):
+            return None, score
+        return entries[best], score
+
+    def store(self, text: str, reply: str, cost_s: float, packets: list[bytes] | None = None) -> CachedReply | None:
+        """Cache a freshly generated reply; cost_s is what a later hit saves."""
+        key = normalise_utterance(text)
+        if not key or not reply or len(key.split()) > self.max_words:
+            return None
+        entry = CachedReply(
+            key=key, reply=reply, vector=embed(key), cost_s=cost_s,
+            created=time.monotonic(), packets=packets or [],
+        )
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+        return entry
+
+    def credit(self, entry: CachedReply, elapsed_s: float) -> None:
+        """Account the latency a hit saved compared with generating the reply."""
+        with self._lock:
+            self._saved_s += max(entry.cost_s - elapsed_s, 0.0)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and the latency saved by hits."""
+        with self._lock:
+            hits    = self._exact_hits + self._fuzzy_hits
+            lookups = hits + self._misses
+            return {
+                "entries":    len(self._entries),
+                "exact_hits": self._exact_hits,
+                "fuzzy_hits": self._fuzzy_hits,
+                "misses":     self._misses,
+                "expired":    self._expired,
+                "hit_rate":   round(hits / lookups, 3) if lookups else 0.0,
+                "saved_s":    round(self._saved_s, 2),
+                "saved_ms_per_hit": round(self._saved_s * 1000 / hits, 1) if hits else 0.0,
+            }
@@ -0,0 +1,219 @@
+"""
+Incremental speech-to-text for the WebSocket voice pipeline.
+
+StreamingTranscriber watches PCM as the ESP32 streams it in.  A lightweight
+energy VAD marks 20 ms frames as speech or silence; whenever the speaker
+pauses long enough, the finished segment is handed to the transcription
+callable in the background while recording continues.  By the time
+end_of_speech arrives only the final tail is still waiting to be decoded.
+
+The same VAD doubles as an optional server-side endpoint detector: after
+a long enough pause following speech, feed() reports that the utterance
+is over so the server can respond without waiting for the device.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+import numpy as np
+
+from pcm_buffer import PCMBuffer, PCMData
+
+logger = logging.getLogger("aasha")
+
+VAD_FRAME_MS = 20
+
+
+class EnergyVAD:
+    """
+    Frame-level energy voice activity detector with an adaptive noise floor.
+
+    A frame counts as speech when its level is above both an absolute floor
+    (min_db) and the running noise estimate plus margin_db.  The noise
+    estimate only tracks non-speech frames, so a long sentence does not
+    raise its own threshold.
+    """
+
+    def __init__(self, min_db: float = -45.0, margin_db: float = 12.0, adapt: float = 0.05):
+        self.min_db     = min_db
+        self.margin_db  = margin_db
+        self.adapt      = adapt
+        self.noise_db   = min_db - margin_db
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """Classify one int16 frame."""
+        samples = frame.astype(np.float32) / 32768.0
+        rms     = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+        level   = 20.0 * np.log10(max(rms, 1e-9))
+        speech  = level > max(self.min_db, self.noise_db + self.margin_db)
+        if not speech:
+            self.noise_db += self.adapt * (level - self.noise_db)
+        return speech
+
+
+class SpeechDetector:
+    """
+    EnergyVAD over a session's PCM buffer, for sessions that do not
+    transcribe as they go: feed() records a chunk and reports whether any
+    frame of the utterance so far was speech.
+    """
+
+    def __init__(self, sample_rate: int, buffer: PCMBuffer):
+        self.buffer       = buffer
+        self._frame_bytes = sample_rate * VAD_FRAME_MS // 1000 * 2
+        self._vad         = EnergyVAD()
+        self._analysed    = len(buffer)
+        self.has_speech   = False
+
+    def feed(self, chunk: bytes) -> bool:
+        """Append PCM and classify every complete frame not yet seen."""
+        self.buffer.append(chunk)
+        fb = self._frame_bytes
+        while not self.has_speech and self._analysed + fb <= len(self.buffer):
+            frame = self.buffer.samples(self._analysed, self._analysed + fb)
+            self._analysed += fb
+            self.has_speech = self._vad.is_speech(frame)
+        return self.has_speech
+
+
+class StreamingTranscriber:
+    """
+    Transcribe an utterance segment by segment while it is still being spoken.
+
+    Args:
+        transcribe:          async callable turning raw 16-bit PCM into text.
+        sample_rate:         PCM sample rate in Hz.
+        buffer:              the session's PCM buffer; segments are handed to
+                             transcribe as zero-copy views of it.
+        segment_silence_ms:  pause length that closes a segment.
+        min_segment_ms:      segments shorter than this keep growing instead,
+                             since very short clips transcribe poorly.
+        endpoint_silence_ms: pause length after speech that ends the whole
+                             utterance; 0 disables server-side endpointing.
+        lead_in_ms:          silence kept in front of the first speech frame.
+    """
+
+    def __init__(
+        self,
+        transcribe: Callable[[PCMData], Awaitable[str]],
+        sample_rate: int,
+        buffer: PCMBuffer,
+        segment_silence_ms: int = 600,
+        min_segment_ms: int = 1500,
+        endpoint_silence_ms: int = 0,
+        lead_in_ms: int = 300,
+    ):
+        self._transcribe      = transcribe
+        self.buffer           = buffer
+        self._frame_bytes     = sample_rate * VAD_FRAME_MS // 1000 * 2
+        self._segment_frames  = max(segment_silence_ms // VAD_FRAME_MS, 1)
+        self._min_segment_b   = sample_rate * min_segment_ms // 1000 * 2
+        self._endpoint_frames = endpoint_silence_ms // VAD_FRAME_MS
+        self._lead_in_b       = sample_rate * lead_in_ms // 1000 * 2
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard all audio and pending segments and start a new utterance."""
+        self.cancel()
+        self._vad           = EnergyVAD()
+        self.buffer.clear()
+        self._analysed      = 0     # byte offset of the next frame to classify
+        self._seg_start     = 0     # byte offset of the first untranscribed byte
+        self._seg_speech    = False # speech seen since _seg_start
+        self._silence_run   = 0     # consecutive non-speech frames
+        self._endpointed    = False
+        self._tasks: list[asyncio.Task] = []
+        self.has_speech     = False
+
+    def cancel(self) -> asyncio.Future | None:
+        """
+        Cancel any background segment transcriptions still running.
+
+        Their outcomes are gathered so a segment that already failed (e.g.
+        with PoolBusy) is not reported as "exception never retrieved"; the
+        returned future completes once they have all finished.
+        """
+        tasks = getattr(self, "_tasks", [])
+        if not tasks:
+            return None
+        for task in tasks:
+            task.cancel()
+        return asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Cancel pending segments and wait until they have stopped."""
+        dropped = self.cancel()
+        if dropped is not None:
+            await dropped
+
+    @property
+    def audio(self) -> memoryview:
+        """All PCM received for the current utterance."""
+        return self.buffer.view()
+
+    @property
+    def segments_submitted(self) -> int:
+        """Number of segments already handed to the transcriber."""
+        return len(self._tasks)
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Append PCM, classify every complete frame, and launch finished segments.
+
+        Returns True exactly once per utterance, when server-side
+        endpointing is enabled and the speaker has gone quiet.
+        """
+        self.buffer.append(chunk)
+        fb = self._frame_bytes
+        while self._analysed + fb <= len(self.buffer):
+            frame = self.buffer.samples(self._analysed, self._analysed + fb)
+            self._analysed += fb
+            if self._vad.is_speech(frame):
+                self._silence_run = 0
+                self._seg_speech  = True
+                self.has_speech   = True
+                continue
+
+            self._silence_run += 1
+            if not self._seg_speech:
+                # Nothing worth decoding yet: slide the segment start so
+                # leading silence never reaches Whisper.
+                self._seg_start = max(self._seg_start, self._analysed - self._lead_in_b)
+            elif (self._silence_run >= self._segment_frames
+                  and self._analysed - self._seg_start >= self._min_segment_b):
+                # Cut in the middle of the pause so both sides keep padding.
+                cut = self._analysed - (self._silence_run // 2) * fb
+                self._submit(self._seg_start, cut)
+                self._seg_start  = cut
+                self._seg_speech = False
+
+        if (self._endpoint_frames and self.has_speech and not self._endpointed
+                and self._silence_run >= self._endpoint_frames):
+            self._endpointed = True
+            return True
+        return False
+
+    def _submit(self, start: int, end: int) -> None:
+        """Transcribe pcm[start:end] in the background, preserving order."""
+        segment = self.buffer.view(start, end)
+        logger.info(
+            "  STT segment #%d queued  %.2f s audio (recording continues)",
+            len(self._tasks) + 1, len(segment) / self._frame_bytes * VAD_FRAME_MS / 1000,
+        )
+        self._tasks.append(asyncio.create_task(self._transcribe(segment)))
+
+    async def finish(self) -> str:
+        """
+        Decode the remaining tail and return the transcript of the whole utterance.
+
+        When the VAD never closed a segment, the full recording is decoded
+        exactly as the non-streaming path would, so quiet speech the VAD
+        missed is not lost.
+        """
+        if self._seg_speech or not self._tasks:
+            tail = self.buffer.view(self._seg_start if self._tasks else 0)
+            if tail:
+                self._tasks.append(asyncio.create_task(self._transcribe(tail)))
+        texts = await asyncio.gather(*self._tasks)
+        return " ".join(t.strip() for t in texts if t and t.strip())
@@ -0,0 +1,4 @@
+import os
+
+# main creates its Gemini client at import; tests never reach the network.
+os.environ.setdefault("GEMINI_API_KEY", "test")
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, Overloaded
+
+
+def test_release_wakes_a_deferred_admit_immediately():
+    async def scenario():
+        controller = AdmissionController(max_pipelines=1, defer_s=2.0)
+        first = await controller.admit()
+        waiter = asyncio.create_task(controller.admit())
+        await asyncio.sleep(0.02)
+        assert not waiter.done()
+
+        t0 = time.monotonic()
+        first.release()
+        second = await asyncio.wait_for(waiter, 1)
+        # Woken by the release itself, not by the 0.25 s re-check.
+        assert time.monotonic() - t0 < 0.1
+        assert controller.in_flight == 1
+        second.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_deferred_admit_is_shed_when_no_room_frees_up():
+    async def scenario():
+        controller = AdmissionController(max_pipelines=1, defer_s=0.1)
+        await controller.admit()
+        t0 = time.monotonic()
+        with pytest.raises(Overloaded) as shed:
+            await controller.admit()
+        assert time.monotonic() - t0 >= 0.1
+        assert shed.value.reason == "CAPACITY"
+        assert shed.value.retry_after_s >= 1.0
+        assert controller.stats()["shed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_crisis_reserve_is_kept_for_priority_sessions():
+    async def scenario():
+        controller = AdmissionController(max_pipelines=2, crisis_reserve=1)
+        await controller.admit()
+        with pytest.raises(Overloaded):
+            await controller.admit()
+        await controller.admit(priority=True)
+        assert controller.stats()["priority_in_flight"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_latency_sheds_normal_but_not_priority_utterances():
+    async def scenario():
+        controller = AdmissionController(max_pipelines=0, max_queue_s=0.5, latency_probe=lambda: 2.0)
+        with pytest.raises(Overloaded) as shed:
+            await controller.admit()
+        assert shed.value.reason == "QUEUE_LATENCY"
+        assert shed.value.retry_after_s == 2.0
+        await controller.admit(priority=True)
+
+    asyncio.run(scenario())
+
+
+def test_release_is_idempotent():
+    async def scenario():
+        controller = AdmissionController(max_pipelines=1)
+        ticket = await controller.admit()
+        ticket.release()
+        ticket.release()
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+from workers import PoolBusy
+
+
+def test_close_cancels_batches_in_flight_and_fails_queued_requests():
+    started = asyncio.Event()
+
+    async def run_batch(items):
+        started.set()
+        await asyncio.sleep(60)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher("test", run_batch, max_batch=1, max_wait_ms=0)
+        running = asyncio.create_task(batcher.submit("a"))
+        await started.wait()
+        queued = asyncio.create_task(batcher.submit("b"))
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1 and batcher.pending == 1
+
+        await batcher.close()
+        assert not batcher._tasks
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        with pytest.raises(PoolBusy):
+            await queued
+
+    asyncio.run(scenario())
+
+
+def test_requests_cancelled_while_queued_are_skipped():
+    batches = []
+    gate = asyncio.Event()
+
+    async def run_batch(items):
+        batches.append(items)
+        await gate.wait()
+        return [item.upper() for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher("test", run_batch, max_batch=4, max_wait_ms=0)
+        first = asyncio.create_task(batcher.submit("a"))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(batcher.submit(item)) for item in "bcd"]
+        await asyncio.sleep(0)
+        assert batcher.pending == 3
+
+        queued[1].cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        assert await first == "A"
+        assert await queued[0] == "B"
+        assert await queued[2] == "D"
+        with pytest.raises(asyncio.CancelledError):
+            await queued[1]
+        assert batches == [["a"], ["b", "d"]]
+
+    asyncio.run(scenario())
@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+
+class FakeStreamClient:
+    """Stands in for genai.Client: aio.models.generate_content_stream only."""
+
+    def __init__(self, *attempts):
+        # One entry per call: an exception is raised by the call itself; a list
+        # of pieces is streamed, raising any exception item when reached.
+        self.attempts = list(attempts)
+        self.calls    = 0
+        self.aio      = SimpleNamespace(models=SimpleNamespace(generate_content_stream=self._stream))
+
+    async def _stream(self, model, contents, config):
+        items = self.attempts[min(self.calls, len(self.attempts) - 1)]
+        self.calls += 1
+        if isinstance(items, Exception):
+            raise items
+
+        async def chunks():
+            for item in items:
+                if isinstance(item, Exception):
+                    raise item
+                await asyncio.sleep(0)
+                yield SimpleNamespace(text=item)
+
+        return chunks()
+
+
+def collect(stream) -> list:
+    async def run():
+        return [item async for item in stream]
+    return asyncio.run(run())
+
+
+def stream(client, **kwargs) -> list[str]:
+    return collect(main.chat_gemini_stream("hello", client, **kwargs))
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    async def sleep(_delay):
+        pass
+    monkeypatch.setattr(main.asyncio, "sleep", sleep)
+
+
+# ─── Cut points ───────────────────────────────────────────────────────────────
+
+def test_cut_after_last_complete_sentence():
+    buffer = "That sounds hard. I'm here for you. And"
+    assert buffer[: main._stream_cut_point(buffer)] == "That sounds hard. I'm here for you."
+
+
+def test_no_cut_until_a_sentence_end_is_followed_by_whitespace():
+    assert main._stream_cut_point("It costs 3.") == 0
+    assert main._stream_cut_point("Wait...") == 0
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    buffer = "You could talk to Dr. Patel, e.g. after class. Mrs."
+    assert buffer[: main._stream_cut_point(buffer)] == "You could talk to Dr. Patel, e.g. after class."
+    assert main._stream_cut_point("Ask Mr. Lee and Ms. Roy ") == 0
+
+
+def test_run_on_text_is_cut_at_a_clause_then_a_space():
+    clause = "word " * 30 + "more, " + "word " * 10
+    assert len(clause) > main.TTS_CHUNK_MAX_CHARS
+    assert clause[: main._stream_cut_point(clause)].endswith("more,")
+    spaces = "word " * 40 + "tail"
+    assert main._stream_cut_point(spaces) == spaces.rfind(" ")
+
+
+def test_sentences_reassemble_from_partial_chunks():
+    pieces = ["I hear y", "ou. Exams can feel over", "whelming, especially with Dr", ". Rao's ", "class. Want to ta", "lk it through?"]
+    chunks = collect(main.iter_tts_sentences(_aiter(pieces)))
+    assert chunks == [
+        "I hear you. Exams can feel overwhelming, especially with Dr. Rao's class.",
+        "Want to talk it through?",
+    ]
+    assert not any(chunk.endswith("Dr.") for chunk in chunks)
+
+
+def test_first_sentence_is_yielded_before_the_stream_ends():
+    seen = []
+
+    async def pieces():
+        yield "This is the first full sentence. "
+        seen.append("second piece requested")
+        yield "And this is the second one."
+
+    async def first():
+        async for chunk in main.iter_tts_sentences(pieces()):
+            return chunk, list(seen)
+
+    chunk, requested = asyncio.run(first())
+    assert chunk == "This is the first full sentence."
+    assert requested == []
+
+
+# ─── Gemini stream ────────────────────────────────────────────────────────────
+
+def test_pieces_are_sanitised_and_keep_their_spacing():
+    client = FakeStreamClient(["It’s okay", " to feel this way."])
+    assert stream(client) == ["It's okay", " to feel this way."]
+    assert client.calls == 1
+
+
+def test_failure_before_first_piece_yields_error_reply_once():
+    client = FakeStreamClient(ValueError("bad request"))
+    assert stream(client, error_reply="FALLBACK") == ["FALLBACK"]
+    assert client.calls == 1
+
+
+def test_transient_failure_before_first_piece_is_retried(no_backoff):
+    client = FakeStreamClient(RuntimeError("503 UNAVAILABLE"), ["Hello again."])
+    assert stream(client, error_reply="FALLBACK") == ["Hello again."]
+    assert client.calls == 2
+
+
+def test_transient_failures_exhaust_retries_then_fall_back(no_backoff):
+    client = FakeStreamClient(RuntimeError("503 UNAVAILABLE"))
+    assert stream(client, error_reply="FALLBACK") == ["FALLBACK"]
+    assert client.calls == 3
+
+
+def test_failure_after_first_piece_is_not_retried_or_duplicated(no_backoff):
+    client = FakeStreamClient(["First part. ", RuntimeError("503 UNAVAILABLE")], ["First part. ", "Second."])
+    assert stream(client, error_reply="FALLBACK") == ["First part. "]
+    assert client.calls == 1
+
+
+def test_empty_stream_yields_empty_reply():
+    client = FakeStreamClient(["", ""])
+    assert stream(client) == [main.LLM_EMPTY_REPLY]
@@ -0,0 +1,45 @@
+import asyncio
+
+from memory import ConversationMemory
+
+
+def long_text(n):
+    return "word " * n
+
+
+def test_fold_summarises_old_turns_and_keeps_recent_ones():
+    folded = []
+
+    async def summarise(previous, turns):
+        folded.append([t.user for t in turns])
+        return "summary"
+
+    async def scenario():
+        memory = ConversationMemory(summarise, max_tokens=100, keep_recent=2, hard_limit=100)
+        for i in range(4):
+            memory.add(f"u{i} " + long_text(20), "reply " + long_text(20))
+        await memory._folding
+        return memory
+
+    memory = asyncio.run(scenario())
+    assert memory.summary == "summary"
+    assert [t.user.split()[0] for t in memory.turns] == ["u2", "u3"]
+    assert [u.split()[0] for u in folded[0]] == ["u0", "u1"]
+
+
+def test_failed_summary_keeps_turns_until_the_hard_limit():
+    async def summarise(previous, turns):
+        raise RuntimeError("model down")
+
+    async def scenario():
+        memory = ConversationMemory(summarise, max_tokens=100, keep_recent=1, hard_limit=2.0)
+        for i in range(10):
+            memory.add(f"u{i} " + long_text(20), "reply " + long_text(20))
+            await asyncio.sleep(0)
+        memory.close()
+        return memory
+
+    memory = asyncio.run(scenario())
+    assert memory.summary == ""
+    assert memory.tokens <= 200
+    assert memory.turns[-1].user.startswith("u9")
@@ -0,0 +1,76 @@
+import asyncio
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+import model_workers
+from workers import InferencePool
+
+
+class FakeServer:
+    """Stands in for main inside a worker: describes the PCM it was given."""
+
+    @staticmethod
+    def _run_whisper(audio) -> str:
+        return f"{len(audio)}:{bytes(audio[:4]).hex()}"
+
+    @classmethod
+    def _run_whisper_batch(cls, batch) -> list[str]:
+        return [cls._run_whisper(audio) for audio in batch]
+
+
+def _init_fake_worker() -> None:
+    model_workers._server = FakeServer()
+
+
+class RecordingPool(InferencePool):
+    """InferencePool on spawned processes that remembers what was sent over IPC."""
+
+    def __init__(self):
+        super().__init__("stt-test", 1, executor_factory=self._spawn)
+        self.calls = []
+
+    @staticmethod
+    def _spawn(max_workers):
+        return ProcessPoolExecutor(max_workers, mp_context=mp.get_context("spawn"), initializer=_init_fake_worker)
+
+    async def run(self, fn, *args):
+        self.calls.append(args)
+        return await super().run(fn, *args)
+
+
+def assert_unlinked(name):
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+
+
+@pytest.fixture
+def pool():
+    pool = RecordingPool()
+    yield pool
+    pool.shutdown()
+
+
+def test_transcribe_round_trips_through_shared_memory(pool):
+    audio = bytes(range(1, 9)) * 100
+
+    text = asyncio.run(model_workers.transcribe(pool, memoryview(audio)))
+
+    assert text == "800:01020304"
+    (shm_name, nbytes), = pool.calls
+    assert nbytes == len(audio)
+    assert_unlinked(shm_name)
+
+
+def test_transcribe_batch_round_trips_through_shared_memory(pool):
+    batch = [b"\x0a\x0b\x0c\x0d" * 50, b"", b"\xff\xfe" * 3]
+
+    texts = asyncio.run(model_workers.transcribe_batch(pool, batch))
+
+    assert texts == ["200:0a0b0c0d", "0:", "6:fffefffe"]
+    (blocks,), = pool.calls
+    assert [nbytes for _, nbytes in blocks] == [200, 0, 6]
+    for shm_name, _ in blocks:
+        assert_unlinked(shm_name)
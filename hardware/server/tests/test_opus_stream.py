@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import main
+from tts_cache import TTSCache
+
+RATE = main.SERVER_SAMPLE_RATE
+
+# Sentence lengths that are not whole 20 ms frames, so padding would show.
+SPEECH = {
+    "one":   np.arange(1000, dtype=np.int16).tobytes(),
+    "two":   np.arange(2000, 3333, dtype=np.int16).tobytes(),
+    "three": np.arange(5000, 5777, dtype=np.int16).tobytes(),
+}
+
+
+@pytest.fixture
+def tts(monkeypatch):
+    async def fake_tts(text):
+        return SPEECH[text]
+
+    cache = TTSCache(main.TTS_SPEAKER, RATE, max_bytes=1 << 20)
+    monkeypatch.setattr(main, "tts_silero", fake_tts)
+    monkeypatch.setattr(main, "tts_cache", cache)
+    monkeypatch.setattr(main, "RECORD_TTS_AUDIO", False)
+    return cache
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _stream(texts, encoder):
+    return [p async for p in main.synthesize_opus_stream(_aiter(texts), encoder=encoder)]
+
+
+def test_stream_uses_the_session_encoder_with_the_cache_on(tts):
+    async def scenario():
+        await main.synthesize_speech("one")           # "one" is now a cache hit
+        return await _stream(["one", "two", "three"], main.new_opus_encoder())
+
+    packets = asyncio.run(scenario())
+    # One continuous encode, padded only at the end of the stream.
+    expected = main.new_opus_encoder().encode_all(SPEECH["one"] + SPEECH["two"] + SPEECH["three"])
+    assert packets == expected
+    # The cache still holds stand-alone packets any session can replay.
+    assert tts.load("two").packets == main.new_opus_encoder().encode_all(SPEECH["two"])
+
+
+def test_interrupted_stream_does_not_leak_into_the_next(tts):
+    async def scenario():
+        encoder = main.new_opus_encoder()
+        encoder.encode(SPEECH["three"])               # a cancelled stream's leftover frame
+        return await _stream(["two"], encoder)
+
+    assert asyncio.run(scenario()) == main.new_opus_encoder().encode_all(SPEECH["two"])
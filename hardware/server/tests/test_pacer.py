@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import pytest
+
+from pacer import PacedSender
+
+
+def test_packets_are_sent_in_order():
+    async def scenario():
+        sent = []
+
+        async def send(packet):
+            sent.append(packet)
+
+        stream = PacedSender(0.002, 1.0).open(send)
+        for i in range(5):
+            await stream.put(bytes([i]))
+        stream.close()
+        await asyncio.wait_for(stream.wait(), 1)
+        return sent
+
+    assert asyncio.run(scenario()) == [bytes([i]) for i in range(5)]
+
+
+def test_send_failure_surfaces_to_the_stream():
+    async def scenario():
+        async def send(packet):
+            raise ConnectionResetError("client gone")
+
+        stream = PacedSender(0.002, 1.0).open(send)
+        await stream.put(b"x")
+        with pytest.raises(ConnectionResetError):
+            await asyncio.wait_for(stream.wait(), 1)
+        with pytest.raises(ConnectionResetError):
+            await stream.put(b"y")
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_send_tears_the_stream_down():
+    async def scenario():
+        blocked = asyncio.Event()
+
+        async def send(packet):
+            blocked.set()
+            await asyncio.sleep(60)
+
+        sender = PacedSender(0.002, 1.0)
+        stream = sender.open(send)
+        await stream.put(b"x")
+        await stream.put(b"y")
+        await asyncio.wait_for(blocked.wait(), 1)
+        stream._flushing.cancel()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(stream.wait(), 1)
+        assert stream not in sender._streams
+        assert not stream._queue
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_wakes_once_per_tick_for_many_streams():
+    async def scenario():
+        sender = PacedSender(0.005, 1.0)
+        ticks = 0
+        tick = sender._tick
+
+        async def counting_tick(now, tick_s):
+            nonlocal ticks
+            ticks += 1
+            await tick(now, tick_s)
+
+        sender._tick = counting_tick
+        sent = []
+
+        async def send(packet):
+            sent.append(packet)
+
+        streams = [sender.open(send) for _ in range(20)]
+        t0 = time.monotonic()
+        for k in range(10):
+            for stream in streams:
+                await stream.put(bytes([k]))
+        for stream in streams:
+            stream.close()
+        await asyncio.wait_for(asyncio.gather(*(s.wait() for s in streams)), 2)
+        elapsed = time.monotonic() - t0
+        assert len(sent) == 200
+        # One wakeup per 5 ms tick, not one per put() or finished send.
+        assert ticks <= elapsed / 0.005 + 3
+
+    asyncio.run(scenario())
+
+
+def test_stalled_client_does_not_hold_up_other_streams():
+    async def scenario():
+        sender = PacedSender(0.005, 1.0)
+        stalled = asyncio.Event()
+        sent = []
+
+        async def stuck(packet):
+            stalled.set()
+            await asyncio.sleep(60)
+
+        async def send(packet):
+            sent.append(packet)
+
+        slow = sender.open(stuck)
+        fast = sender.open(send)
+        await slow.put(b"s")
+        await stalled.wait()
+        for i in range(10):
+            await fast.put(bytes([i]))
+        fast.close()
+        await asyncio.wait_for(fast.wait(), 1)
+        assert sent == [bytes([i]) for i in range(10)]
+        slow.cancel()
+        slow._flushing.cancel()
+
+    asyncio.run(scenario())
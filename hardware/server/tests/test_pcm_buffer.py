@@ -0,0 +1,49 @@
+import numpy as np
+
+from pcm_buffer import PCMBuffer
+
+
+def test_growth_keeps_data_and_earlier_views():
+    buffer = PCMBuffer(max_bytes=1000, initial_bytes=4)
+    buffer.append(b"\x01\x00\x02\x00")
+    early = buffer.view()
+    buffer.append(b"\x03\x00" * 5)
+    assert len(buffer) == 14
+    assert len(buffer._data) == 14          # grown to fit (max of 2x and needed)
+    buffer.append(b"\x04\x00")
+    assert len(buffer._data) == 28          # then doubled
+    assert bytes(early) == b"\x01\x00\x02\x00"
+    assert buffer.samples().tolist() == [1, 2, 3, 3, 3, 3, 3, 4]
+
+
+def test_growth_stops_at_the_cap():
+    buffer = PCMBuffer(max_bytes=10, initial_bytes=4)
+    assert buffer.append(b"\x00" * 8)
+    assert not buffer.append(b"\x01" * 5)
+    assert len(buffer) == 10 and buffer.truncated
+    assert len(buffer._data) == 10
+
+
+def test_samples_do_not_block_storage_reuse():
+    buffer = PCMBuffer(max_bytes=1000, initial_bytes=64)
+    buffer.append(np.arange(16, dtype=np.int16).tobytes())
+    assert buffer.samples(2, 9).tolist() == [1, 2, 3]     # whole samples only
+    storage = buffer._data
+    buffer.clear()
+    assert buffer._data is storage
+
+
+def test_clear_after_view_uses_fresh_storage_until_recycled():
+    buffer = PCMBuffer(max_bytes=1000, initial_bytes=64)
+    buffer.append(b"\x05\x00" * 4)
+    view = buffer.view()
+    storage = buffer._data
+    buffer.clear()
+    assert buffer._data is not storage
+    buffer.append(b"\x06\x00" * 4)
+    assert bytes(view) == b"\x05\x00" * 4
+
+    storage = buffer._data
+    buffer.view()
+    buffer.recycle()
+    assert buffer._data is storage and len(buffer) == 0
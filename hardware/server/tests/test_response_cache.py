@@ -0,0 +1,54 @@
+from response_cache import ResponseCache, normalise_utterance
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ResponseCache()
+    cache.store("Hello!", "REPLY-HELLO", cost_s=1.0)
+    entry, score = cache.lookup("hello")
+    assert entry.reply == "REPLY-HELLO"
+    assert score == 1.0
+
+
+def test_fuzzy_hit_after_exact_hits_returns_matching_entry():
+    # Exact hits reorder the LRU; fuzzy lookups must still map matrix rows
+    # to the entries they were built from.
+    cache = ResponseCache(similarity=0.5)
+    cache.store("hello there", "REPLY-HELLO", cost_s=1.0)
+    cache.store("thank you so much", "REPLY-THANKS", cost_s=1.0)
+    cache.store("i feel stressed", "REPLY-STRESSED", cost_s=1.0)
+
+    assert cache.lookup("i feel stressed")[0].reply == "REPLY-STRESSED"    # builds the matrix
+    assert cache.lookup("hello there")[0].reply == "REPLY-HELLO"
+    assert cache.lookup("thank you so much")[0].reply == "REPLY-THANKS"
+
+    for query, expected in [
+        ("hello there friend", "REPLY-HELLO"),
+        ("thank you very much", "REPLY-THANKS"),
+        ("i feel so stressed", "REPLY-STRESSED"),
+    ]:
+        entry, score = cache.lookup(query)
+        assert entry.reply == expected, query
+        assert score < 1.0
+
+
+def test_fuzzy_match_never_crosses_negation():
+    cache = ResponseCache(similarity=0.5)
+    cache.store("i am stressed", "REPLY-STRESSED", cost_s=1.0)
+    assert cache.lookup("i am not stressed") is None
+
+
+def test_long_utterances_are_not_cached():
+    cache = ResponseCache(max_words=3)
+    assert cache.store("this one is far too long", "REPLY", cost_s=1.0) is None
+    assert not cache.eligible("this one is far too long")
+    assert normalise_utterance("Can't  STOP!") == "cant stop"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, similarity=1.0)
+    cache.store("one", "R1", cost_s=1.0)
+    cache.store("two", "R2", cost_s=1.0)
+    cache.lookup("one")
+    cache.store("three", "R3", cost_s=1.0)
+    assert cache.lookup("two") is None
+    assert cache.lookup("one")[0].reply == "R1"
@@ -0,0 +1,78 @@
+import asyncio
+import gc
+
+import numpy as np
+
+from pcm_buffer import PCMBuffer
+from streaming_stt import SpeechDetector, StreamingTranscriber
+from workers import PoolBusy
+
+SR = 16000
+
+
+def tone(seconds: float) -> bytes:
+    t = np.arange(int(SR * seconds))
+    return (np.sin(t * 0.3) * 8000).astype(np.int16).tobytes()
+
+
+def silence(seconds: float) -> bytes:
+    return np.zeros(int(SR * seconds), dtype=np.int16).tobytes()
+
+
+def new_transcriber(transcribe) -> StreamingTranscriber:
+    return StreamingTranscriber(
+        transcribe, SR, PCMBuffer(SR * 2 * 30, SR * 2),
+        segment_silence_ms=400, min_segment_ms=500,
+    )
+
+
+def test_segments_are_transcribed_while_recording_and_joined_in_order():
+    async def transcribe(pcm):
+        await asyncio.sleep(0)
+        return f"seg{len(pcm) // (SR * 2)}"
+
+    async def scenario():
+        transcriber = new_transcriber(transcribe)
+        transcriber.feed(tone(1.0) + silence(0.6))
+        assert transcriber.segments_submitted == 1
+        transcriber.feed(tone(2.0) + silence(0.2))
+        return await transcriber.finish()
+
+    assert asyncio.run(scenario()).startswith("seg1 seg2")
+
+
+def test_dropped_failed_segments_are_retrieved():
+    unretrieved = []
+
+    async def transcribe(pcm):
+        raise PoolBusy("stt pool saturated")
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: unretrieved.append(ctx))
+        transcriber = new_transcriber(transcribe)
+        transcriber.feed(tone(1.0) + silence(0.6))
+        transcriber.feed(tone(1.0) + silence(0.6))
+        assert transcriber.segments_submitted == 2
+        await asyncio.sleep(0.01)       # both segments have failed by now
+        transcriber.reset()             # drops them without awaiting
+        await asyncio.sleep(0.01)
+
+        transcriber.feed(tone(1.0) + silence(0.6))
+        await transcriber.close()
+        gc.collect()
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    gc.collect()
+    assert not [ctx for ctx in unretrieved if "never retrieved" in ctx.get("message", "")]
+
+
+def test_speech_detector_ignores_silence_and_noise():
+    detector = SpeechDetector(SR, PCMBuffer(SR * 2 * 30, SR * 2))
+    quiet    = (np.random.default_rng(0).uniform(-1, 1, SR) * 30).astype(np.int16).tobytes()
+    # Odd-sized chunks that split frames and samples, as the device may send them.
+    for audio in (silence(0.5), quiet):
+        for i in range(0, len(audio), 333):
+            assert not detector.feed(audio[i : i + 333])
+    assert detector.feed(tone(0.1))
+    assert len(detector.buffer) == SR * 2 * 1.5 + SR * 2 * 0.1
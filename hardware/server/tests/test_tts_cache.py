@@ -0,0 +1,63 @@
+from tts_cache import TTSCache, normalise_text
+
+
+def make_cache(max_bytes, **kwargs):
+    return TTSCache("speaker", 24000, max_bytes, **kwargs)
+
+
+def test_lookup_normalises_case_and_whitespace():
+    cache = make_cache(1000)
+    cache.store("Hello   there", b"\x00" * 10, [b"p"])
+    assert normalise_text("  HELLO there ") == "hello there"
+    assert cache.lookup("hello THERE") is not None
+    assert cache.lookup("hello") is None
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = make_cache(300)
+    cache.store("a", b"\x00" * 100, [])
+    cache.store("b", b"\x00" * 100, [])
+    cache.store("c", b"\x00" * 100, [])
+    assert cache.lookup("a") is not None     # "b" is now the oldest
+
+    cache.store("d", b"\x00" * 100, [])
+    assert cache.lookup("b") is None
+    assert all(cache.lookup(t) is not None for t in "acd")
+    assert cache.stats()["bytes"] == 300
+    assert cache.stats()["evictions"] == 1
+
+
+def test_pinned_entries_survive_eviction():
+    cache = make_cache(250)
+    cache.store("crisis", b"\x00" * 100, [], pinned=True)
+    cache.store("a", b"\x00" * 100, [])
+    cache.store("b", b"\x00" * 100, [])
+
+    assert cache.lookup("crisis") is not None
+    assert cache.lookup("a") is None
+    assert cache.lookup("b") is not None
+    assert cache.stats()["bytes"] == 200
+
+
+def test_restoring_a_pinned_phrase_keeps_it_pinned(tmp_path):
+    cache = make_cache(250, disk_dir=str(tmp_path))
+    cache.store("crisis", b"\x00" * 100, [b"pkt"], pinned=True)
+    cache.store("crisis", b"\x00" * 100, [b"pkt"])
+    cache.store("a", b"\x00" * 100, [])
+    cache.store("b", b"\x00" * 100, [])
+
+    assert cache.lookup("crisis").pinned
+    assert cache.lookup("a") is None
+
+
+def test_disk_tier_round_trip_promotes_to_memory(tmp_path):
+    cache = make_cache(1000, disk_dir=str(tmp_path))
+    cache.store("crisis", b"\x01\x02" * 50, [b"one", b"two"], pinned=True)
+
+    fresh = make_cache(1000, disk_dir=str(tmp_path))
+    assert fresh.lookup("crisis") is None
+    entry = fresh.load("crisis")
+    assert entry.pcm == b"\x01\x02" * 50
+    assert entry.packets == [b"one", b"two"]
+    assert fresh.lookup("crisis") is entry
+    assert fresh.stats()["disk_hits"] == 1
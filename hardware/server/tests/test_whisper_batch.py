@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import main
+
+RATE = main.SERVER_SAMPLE_RATE
+
+
+def pcm(samples: np.ndarray) -> bytes:
+    return (samples * 32767).astype(np.int16).tobytes()
+
+
+def tone(seconds, amplitude=0.5):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return pcm(amplitude * np.sin(2 * np.pi * 220 * t))
+
+
+def noise(seconds, amplitude=0.005):
+    return pcm(amplitude * np.random.default_rng(0).uniform(-1, 1, int(seconds * RATE)))
+
+
+SILENCE = bytes(RATE * 2)
+
+
+def decode(audio):
+    """Fake Whisper: words for loud audio, a confident-sounding hallucination for quiet audio."""
+    if np.abs(audio).max() > 0.1:
+        return SimpleNamespace(text=" hello", no_speech_prob=0.01, avg_logprob=-0.2)
+    return SimpleNamespace(text=" Thank you.", no_speech_prob=0.9, avg_logprob=-1.5)
+
+
+class FakeWhisper:
+    feature_extractor = SimpleNamespace(n_samples=30 * 16000, sampling_rate=16000)
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, no_speech_threshold, log_prob_threshold, **kwargs):
+        # WhisperModel.transcribe drops segments by the thresholds it is given.
+        self.calls.append(len(audio))
+        seg = decode(audio)
+        keep = not (seg.no_speech_prob > no_speech_threshold and seg.avg_logprob < log_prob_threshold)
+        return iter([seg] if keep else []), SimpleNamespace(language="en", language_probability=1.0)
+
+
+class FakePipeline:
+    """BatchedInferencePipeline stand-in: one segment per clip, thresholds not applied."""
+
+    batches = []
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        rate = self.model.feature_extractor.sampling_rate
+        FakePipeline.batches.append(len(clip_timestamps))
+        segments = []
+        for clip in clip_timestamps:
+            start, end = int(clip["start"] * rate), int(clip["end"] * rate)
+            seg = decode(audio[start:end])
+            seg.start = round(clip["start"], 3)
+            segments.append(seg)
+        return iter(segments), None
+
+
+@pytest.fixture
+def whisper(monkeypatch):
+    model = FakeWhisper()
+    FakePipeline.batches = []
+    monkeypatch.setattr(main, "whisper_model", model)
+    monkeypatch.setattr(main, "BatchedInferencePipeline", FakePipeline)
+    return model
+
+
+def test_silence_is_empty_batched_and_unbatched_without_reaching_the_model(whisper):
+    # Real Silero VAD: pure silence has no speech to decode.
+    assert main._run_whisper(SILENCE) == ""
+    assert main._run_whisper_batch([SILENCE, SILENCE]) == ["", ""]
+    assert whisper.calls == [] and FakePipeline.batches == []
+
+
+def test_batched_results_match_the_single_path(whisper, monkeypatch):
+    # Treat every non-silent sample as speech so the quiet noise reaches the model.
+    monkeypatch.setattr(main, "get_speech_timestamps", lambda audio, options: (
+        [{"start": 0, "end": len(audio)}] if np.abs(audio).max() > 0 else []
+    ))
+    batch = [tone(1.0), noise(0.7), SILENCE, tone(0.4)]
+
+    single = [main._run_whisper(audio) for audio in batch]
+    batched = main._run_whisper_batch(batch)
+
+    assert single == ["hello", "", "", "hello"]
+    assert batched == single
+    assert FakePipeline.batches == [3]
@@ -0,0 +1,216 @@
+"""
+Phrase-level TTS cache.
+
+Synthesised speech is cached per phrase under a content address built from
+the normalised text, the speaker and the sample rate.  Each entry keeps the
+raw PCM (for the HTTP path) and the Opus packets (for the WebSocket path),
+so a hit skips both Silero and the Opus encoder.
+
+Two tiers:
+  memory — an LRU bounded by a byte budget.
+  disk   — optional; survives restarts.  Only pinned phrases (the fixed
+           fallback and crisis strings) and phrases requested at least
+           disk_min_hits times are written, so one-off replies from a
+           private conversation never land on disk.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+logger = logging.getLogger("aasha")
+
+_FILE_MAGIC = b"ATC1"
+
+
+@dataclass
+class CachedSpeech:
+    """One synthesised phrase: 16-bit PCM plus its Opus packets."""
+    pcm: bytes
+    packets: list[bytes]
+    pinned: bool = False
+    hits: int = field(default=0, compare=False)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.pcm) + sum(len(p) for p in self.packets)
+
+
+def normalise_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a phrase."""
+    return " ".join(text.lower().split())
+
+
+class TTSCache:
+    """
+    Thread-safe two-tier cache of synthesised phrases.
+
+    Args:
+        speaker:       Silero speaker id, part of the key.
+        sample_rate:   PCM sample rate, part of the key.
+        max_bytes:     memory-tier budget; least recently used entries that
+                       are not pinned are evicted past it.
+        disk_dir:      directory for the persistent tier, or None.
+        disk_min_hits: hits after which an unpinned phrase is persisted.
+    """
+
+    def __init__(
+        self,
+        speaker: str,
+        sample_rate: int,
+        max_bytes: int,
+        disk_dir: str | None = None,
+        disk_min_hits: int = 2,
+    ):
+        self.speaker       = speaker
+        self.sample_rate   = sample_rate
+        self.max_bytes     = max_bytes
+        self.disk_dir      = disk_dir
+        self.disk_min_hits = disk_min_hits
+        self._entries: OrderedDict[str, CachedSpeech] = OrderedDict()
+        self._bytes        = 0
+        self._lock         = threading.Lock()
+        self._hits         = 0
+        self._disk_hits    = 0
+        self._misses       = 0
+        self._evictions    = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, text: str) -> str:
+        """Content address of a phrase for this speaker and sample rate."""
+        raw = f"{self.speaker}|{self.sample_rate}|{normalise_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ── Memory tier ───────────────────────────────────────────────────────────
+
+    def lookup(self, text: str) -> CachedSpeech | None:
+        """Memory-tier lookup; cheap enough to call on the event loop."""
+        key = self.key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self._hits += 1
+        return entry
+
+    def _insert(self, key: str, entry: CachedSpeech) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+                entry.pinned = entry.pinned or old.pinned
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            for victim in list(self._entries):
+                if self._bytes <= self.max_bytes:
+                    break
+                if self._entries[victim].pinned or victim == key:
+                    continue
+                self._bytes -= self._entries.pop(victim).nbytes
+                self._evictions += 1
+
+    # ── Disk tier (blocking: run on an I/O pool) ──────────────────────────────
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.bin")
+
+    def load(self, text: str) -> CachedSpeech | None:
+        """Memory lookup falling back to the disk tier; promotes disk hits."""
+        entry = self.lookup(text)
+        if entry is None and self.disk_dir:
+            entry = self._load_disk(self.key(text))
+        if entry is None:
+            with self._lock:
+                self._misses += 1
+        return entry
+
+    def _load_disk(self, key: str) -> CachedSpeech | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            entry = _unpack(blob)
+        except (ValueError, struct.error) as exc:
+            logger.warning("  TTS cache: dropping corrupt entry %s: %s", key[:12], exc)
+            os.remove(self._path(key))
+            return None
+        entry.hits = 1
+        with self._lock:
+            self._disk_hits += 1
+        self._insert(key, entry)
+        return entry
+
+    def store(self, text: str, pcm: bytes, packets: list[bytes], pinned: bool = False) -> CachedSpeech:
+        """Insert a freshly synthesised phrase and persist it if eligible."""
+        key   = self.key(text)
+        entry = CachedSpeech(pcm=pcm, packets=packets, pinned=pinned)
+        self._insert(key, entry)
+        if pinned:
+            self.persist(text, entry)
+        return entry
+
+    def persist(self, text: str, entry: CachedSpeech) -> None:
+        """Write an entry to the disk tier (no-op without one, or if present)."""
+        if not self.disk_dir:
+            return
+        path = self._path(self.key(text))
+        if os.path.exists(path):
+            return
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_pack(entry))
+        os.replace(tmp, path)
+
+    def should_persist(self, entry: CachedSpeech) -> bool:
+        """True once an unpinned entry has been reused often enough to keep."""
+        return bool(self.disk_dir) and entry.hits == self.disk_min_hits
+
+    def stats(self) -> dict:
+        """Hit/miss counters and memory usage."""
+        with self._lock:
+            hits    = self._hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "entries":   len(self._entries),
+                "bytes":     self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits":      self._hits,
+                "disk_hits": self._disk_hits,
+                "misses":    self._misses,
+                "hit_rate":  round(hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "disk":      bool(self.disk_dir),
+            }
+
+
+def _pack(entry: CachedSpeech) -> bytes:
+    """Serialise an entry: magic, packet count, length-prefixed packets, PCM."""
+    parts = [_FILE_MAGIC, struct.pack("<I", len(entry.packets))]
+    for packet in entry.packets:
+        parts.append(struct.pack("<H", len(packet)))
+        parts.append(packet)
+    parts.append(entry.pcm)
+    return b"".join(parts)
+
+
+def _unpack(blob: bytes) -> CachedSpeech:
+    if blob[:4] != _FILE_MAGIC:
+        raise ValueError("bad magic")
+    (count,) = struct.unpack_from("<I", blob, 4)
+    offset   = 8
+    packets  = []
+    for _ in range(count):
+        (size,) = struct.unpack_from("<H", blob, offset)
+        offset += 2
+        packets.append(blob[offset : offset + size])
+        offset += size
+    return CachedSpeech(pcm=blob[offset:], packets=packets)
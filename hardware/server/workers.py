@@ -0,0 +1,176 @@
+"""
+Bounded inference worker pools.
+
+Each InferencePool owns a dedicated executor (a thread pool by default, or
+the worker processes of model_workers) sized to its maximum number of
+in-flight jobs.  Callers beyond that wait in an admission queue on the
+event loop (where waiting is cheap and cancellable) instead of piling up
+inside the executor, and callers beyond the queue limit are rejected with
+PoolBusy.  Queue depth, wait time and run time are tracked per pool so a
+box can be sized for N concurrent devices from measurements.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger("aasha")
+
+
+class PoolBusy(RuntimeError):
+    """Raised when a pool's admission queue is full."""
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class InferencePool:
+    """
+    A named, bounded executor for one class of blocking work.
+
+    Args:
+        name:          label used in thread names, logs and stats.
+        max_in_flight: jobs allowed to run at once (= executor workers).
+        max_queue:     callers allowed to wait for a slot; 0 means unbounded.
+        window:        number of recent jobs kept for wait/run percentiles.
+        executor_factory:
+                       builds the executor on first use, given max_in_flight;
+                       defaults to a ThreadPoolExecutor.  Creation is lazy so
+                       importing the module in a worker process is free.
+        on_wait:       called with each job's queue wait in seconds (metrics).
+        on_run:        called with each job's run time in seconds (metrics).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_in_flight: int,
+        max_queue: int = 0,
+        window: int = 512,
+        executor_factory: Callable[[int], Executor] | None = None,
+        on_wait: Callable[[float], None] | None = None,
+        on_run: Callable[[float], None] | None = None,
+    ):
+        self.name          = name
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue     = max_queue
+        self._factory      = executor_factory or self._thread_executor
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._queued       = 0
+        self._in_flight    = 0
+        self._completed    = 0
+        self._rejected     = 0
+        self._waits        = deque(maxlen=window)
+        self._runs         = deque(maxlen=window)
+        self._on_wait      = on_wait
+        self._on_run       = on_run
+
+    def _thread_executor(self, max_workers: int) -> Executor:
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"aasha-{self.name}")
+
+    @property
+    def queued(self) -> int:
+        """Callers currently waiting for a slot."""
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs currently running on a worker."""
+        return self._in_flight
+
+    @property
+    def rejected(self) -> int:
+        """Callers turned away with PoolBusy since startup."""
+        return self._rejected
+
+    def estimated_wait(self, extra_jobs: float = 0) -> float:
+        """
+        Rough seconds a newly queued job would wait for a slot: the jobs
+        ahead of it (plus extra_jobs queued elsewhere, e.g. in a batcher)
+        times the mean recent run time, spread over the pool's slots.
+        """
+        if not self._runs:
+            return 0.0
+        mean_run = sum(self._runs) / len(self._runs)
+        return (self._queued + extra_jobs) * mean_run / self.max_in_flight
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) on this pool once a slot is free and return its result.
+
+        The slot is held until the worker actually finishes, even if
+        the awaiting caller is cancelled first, so a cancelled request can
+        never let more than max_in_flight jobs onto the CPU.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        if self.max_queue and self._slots.locked() and self._queued >= self.max_queue:
+            self._rejected += 1
+            raise PoolBusy(f"{self.name} pool saturated ({self._queued} queued)")
+
+        enqueued = time.monotonic()
+        self._queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+        started = time.monotonic()
+        self._waits.append(started - enqueued)
+        if self._on_wait is not None:
+            self._on_wait(started - enqueued)
+        self._in_flight += 1
+
+        loop = asyncio.get_running_loop()
+
+        def _done(_future) -> None:
+            loop.call_soon_threadsafe(self._release, started)
+
+        try:
+            if self._executor is None:
+                self._executor = self._factory(self.max_in_flight)
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release(started)
+            raise
+        future.add_done_callback(_done)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, started: float) -> None:
+        self._runs.append(time.monotonic() - started)
+        if self._on_run is not None:
+            self._on_run(self._runs[-1])
+        self._in_flight -= 1
+        self._completed += 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, saturation and wait/run latency (ms)."""
+        waits = list(self._waits)
+        runs  = list(self._runs)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue":     self.max_queue,
+            "in_flight":     self._in_flight,
+            "queued":        self._queued,
+            "completed":     self._completed,
+            "rejected":      self._rejected,
+            "wait_ms_p50":   round(_percentile(waits, 50) * 1000, 1),
+            "wait_ms_p95":   round(_percentile(waits, 95) * 1000, 1),
+            "wait_ms_max":   round(max(waits, default=0.0) * 1000, 1),
+            "run_ms_p50":    round(_percentile(runs, 50) * 1000, 1),
+            "run_ms_p95":    round(_percentile(runs, 95) * 1000, 1),
+        }
+
+    def shutdown(self) -> None:
+        """Stop accepting work and let running jobs finish in the background."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+"""
+Concurrency benchmark for the database layer.
+
+Runs the chat endpoint's DB work from many threads at once: read the newest
+history window, commit the user message, then commit the model reply. It
+compares the old bare engine (rollback journal, synchronous=FULL, no busy
+timeout beyond the driver default) with make_engine() from database.py. Each
+run uses a fresh SQLite file in a temporary directory, so the app's database
+is never touched:
+
+    python bench_db.py --threads 1,8,32 --turns 200
+
+Pass --url to benchmark a server database instead (the tables are created
+there and the rows written by the benchmark are left behind).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import make_engine
+from models import Base, ChatSession, ChatMessage
+
+HISTORY_WINDOW = 20
+REPLY = "That sounds really hard. It makes sense that you feel stretched thin right now. " * 4
+
+
+def baseline_engine(url: str):
+    """The engine as database.py created it before it was tuned."""
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def chat_turn(Session, session_id: str, n: int):
+    with Session() as db:
+        (
+            db.query(ChatMessage)
+            .filter(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.id.desc())
+            .limit(HISTORY_WINDOW)
+            .all()
+        )
+        db.add(ChatMessage(session_id=session_id, role="user", content=f"message {n}", timestamp=datetime.utcnow().isoformat()))
+        db.commit()
+    with Session() as db:
+        db.add(ChatMessage(session_id=session_id, role="model", content=REPLY, timestamp=datetime.utcnow().isoformat()))
+        db.commit()
+
+
+def run(engine, threads: int, turns: int) -> dict:
+    """`turns` chat turns spread over `threads` threads, one chat session per thread."""
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    session_ids = [f"bench-{threads}-{i}-{time.time_ns()}" for i in range(threads)]
+    with Session() as db:
+        db.add_all(ChatSession(session_id=sid) for sid in session_ids)
+        db.commit()
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(session_id: str, count: int):
+        start.wait()
+        for n in range(count):
+            t0 = time.perf_counter()
+            try:
+                chat_turn(Session, session_id, n)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+
+    per_thread = [turns // threads + (i < turns % threads) for i in range(threads)]
+    pool = [threading.Thread(target=worker, args=(sid, count)) for sid, count in zip(session_ids, per_thread)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "threads": threads,
+        "turns": len(latencies),
+        "errors": len(errors),
+        "turns_per_s": round(len(latencies) / elapsed, 1),
+        "writes_per_s": round(2 * len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--threads", default="1,8,32", help="comma-separated thread counts")
+    p.add_argument("--turns", type=int, default=200, help="chat turns per run")
+    p.add_argument("--url", help="server database to benchmark instead of temporary SQLite files")
+    p.add_argument("--json", help="also write the results here")
+    args = p.parse_args()
+
+    engines = {"baseline": baseline_engine, "tuned": make_engine}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in [int(t) for t in args.threads.split(",")]:
+            for name, factory in engines.items():
+                url = args.url or f"sqlite:///{os.path.join(tmp, f'{name}-{threads}.db')}"
+                result = {"engine": name, **run(factory(url), threads, args.turns)}
+                results.append(result)
+                print(
+                    f"{name:<9} threads={threads:<3} {result['writes_per_s']:>8} writes/s  "
+                    f"p50={result['p50_ms']} ms  p95={result['p95_ms']} ms  errors={result['errors']}"
+                )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
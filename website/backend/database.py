@@ -1,15 +1,73 @@
+"""
+Database engine and sessions.
+
+DATABASE_URL (or the older DB_FILE) picks the backend. SQLite is the default.
+Each new connection is switched to WAL with tuned pragmas, so chat reads are
+not blocked by a writer, and writers wait up to DB_BUSY_TIMEOUT_MS for the
+lock instead of failing with "database is locked". Any other URL (e.g.
+postgresql+psycopg2://…, with its driver installed) gets a sized,
+pre-pinged, recycled connection pool and, for Postgres, a per-statement
+timeout.
+"""
+
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DB_FILE", "sqlite:///./aasha_ai.db")
+DATABASE_URL = os.getenv("DATABASE_URL") or os.getenv("DB_FILE", "sqlite:///./aasha_ai.db")
+
+DB_POOL_SIZE            = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW         = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT_S       = float(os.getenv("DB_POOL_TIMEOUT_S", 30))
+DB_POOL_RECYCLE_S       = int(os.getenv("DB_POOL_RECYCLE_S", 1800))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))
+DB_BUSY_TIMEOUT_MS      = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+SQLITE_SYNCHRONOUS      = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable in WAL except on power loss
+SQLITE_CACHE_MB         = int(os.getenv("SQLITE_CACHE_MB", 32))
+
+def sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def make_engine(url: str = DATABASE_URL):
+    """Create the engine for `url` with the settings above."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite":
+        pool_args = {}
+        if parsed.database not in (None, "", ":memory:"):  # in-memory databases keep SQLAlchemy's single-connection pool
+            pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT_S}
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+            **pool_args,
+        )
+        event.listen(engine, "connect", sqlite_pragmas)
+        return engine
+
+    connect_args = {}
+    if backend == "postgresql":
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_S,
+        pool_recycle=DB_POOL_RECYCLE_S,
+        pool_pre_ping=True,
+    )
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -0,0 +1,153 @@
+"""
+In-process cache of each chat session's prepared Gemini history.
+
+Holds what the history loader needs for a session: the rolling summary and the
+newest messages, already in Gemini's {"role", "parts"} format. The chat
+endpoints write through it, adding each new message to the cache right after
+it is committed to the DB. A hot session therefore needs no DB reads per turn.
+On a miss, the caller loads the session from the DB and calls put().
+
+Sessions are evicted least-recently-used first, once they have been idle for
+ttl_s, or when the cache goes over max_bytes. The cache is per process, so
+with several uvicorn workers a session should stick to one worker (or the
+cache be turned off with CHAT_CACHE_SESSIONS=0).
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+ENTRY_OVERHEAD = 200  # rough bytes per cached message beyond its text
+
+
+@dataclass
+class CachedMessage:
+    id: int
+    tokens: int
+    content: dict  # {"role": ..., "parts": [...]}, ready for start_chat()
+
+
+@dataclass
+class CachedSession:
+    summary: str
+    summary_upto: int
+    messages: list = field(default_factory=list)  # CachedMessage, oldest first
+    unsummarised: int = 0  # messages after summary_upto, including ones no longer cached
+    size: int = 0
+    last_used: float = 0.0
+
+
+def message_size(msg: CachedMessage) -> int:
+    return len(msg.content["parts"][0]) + ENTRY_OVERHEAD
+
+
+class HistoryCache:
+    """Thread-safe LRU of CachedSession keyed on session_id; keeps at most max_messages per session."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_s: float = 1800, max_bytes: int = 64 * 1024 * 1024, max_messages: int = 20):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0
+
+    def get(self, session_id: str):
+        """A snapshot of the cached session (which becomes most recently used), or None."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return CachedSession(session.summary, session.summary_upto, list(session.messages))
+
+    def put(self, session_id: str, summary: str, summary_upto: int, messages: list, unsummarised: int = None):
+        """Cache a session loaded from the DB (messages oldest first), unless another request already has."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if session_id in self._sessions:
+                return
+            session = CachedSession(summary or "", summary_upto or 0, last_used=time.monotonic())
+            self._sessions[session_id] = session
+            for msg in messages:
+                self._append(session, msg)
+            session.unsummarised = len(messages) if unsummarised is None else unsummarised
+            self._evict()
+
+    def append(self, session_id: str, msg: CachedMessage):
+        """Write-through: add a message just committed to the DB, if the session is cached."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            self._append(session, msg)
+            self._evict()
+
+    def apply_summary(self, session_id: str, summary: str, upto: int, folded: int):
+        """Record a new rolling summary covering `folded` more messages and forget those still cached."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.summary, session.summary_upto = summary, upto
+            session.unsummarised = max(session.unsummarised - folded, 0)
+            while session.messages and session.messages[0].id <= upto:
+                self._remove_oldest(session)
+
+    def unsummarised(self, session_id: str):
+        """How many messages of a cached session are not in its summary yet, or None if not cached."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return None if session is None else session.unsummarised
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            self._drop(session_id)
+
+    # Callers below hold self._lock.
+
+    def _append(self, session: CachedSession, msg: CachedMessage):
+        ids = [m.id for m in session.messages]
+        session.messages.insert(bisect.bisect(ids, msg.id), msg)
+        session.unsummarised += 1
+        size = message_size(msg)
+        session.size += size
+        self._bytes += size
+        while len(session.messages) > self.max_messages:
+            self._remove_oldest(session)
+
+    def _remove_oldest(self, session: CachedSession):
+        size = message_size(session.messages.pop(0))
+        session.size -= size
+        self._bytes -= size
+
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= session.size
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_s:
+                break
+            self._drop(session_id)
+
+    def _evict(self):
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
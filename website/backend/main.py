@@ -1,9 +1,14 @@
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from pydantic import BaseModel
+import asyncio
+import contextlib
+import json
 import os
 import smtplib
 import ssl
@@ -13,12 +18,14 @@ import google.generativeai as genai
 from datetime import datetime
 import uuid
 
-from database import engine, get_db
-from models import Base, ChatSession, ChatMessage, SupportResource
+from database import engine, get_db, SessionLocal
+from models import Base, ChatSession, ChatMessage, SupportResource, upgrade_schema
+from history_cache import HistoryCache, CachedMessage, CachedSession
 import seed
 
 # Initialize Database
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 try:
     seed.seed_data()
 except Exception as e:
@@ -47,6 +54,52 @@ CRITICAL SAFETY INSTRUCTION:
 If the user expresses ANY intent of self-harm, suicide, severe depression, or mentions crisis keywords (e.g., "kill myself", "end it all", "don't want to live"), you MUST include the exact string "[CRISIS_DETECTED]" in your response so the system can trigger an emergency UI banner. In these cases, immediately offer support and encourage them to use the emergency resources provided on the page.
 """
 
+# Chat pipeline limits: at most CHAT_MAX_CONCURRENCY Gemini calls in flight;
+# a request waits up to CHAT_QUEUE_TIMEOUT_S for a slot (then 503) and the
+# call itself gets CHAT_TIMEOUT_S before the fallback reply is used.
+CHAT_MODEL           = os.getenv("CHAT_MODEL", "gemini-2.5-flash")
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", 32))
+CHAT_QUEUE_TIMEOUT_S = float(os.getenv("CHAT_QUEUE_TIMEOUT_S", 10))
+CHAT_TIMEOUT_S       = float(os.getenv("CHAT_TIMEOUT_S", 30))
+
+# History sent with each turn: at most CHAT_HISTORY_TURNS exchanges and about
+# CHAT_HISTORY_TOKENS tokens. Older messages are folded into a rolling summary
+# per session once CHAT_SUMMARY_BATCH of them have fallen out of the window.
+CHAT_HISTORY_TURNS   = int(os.getenv("CHAT_HISTORY_TURNS", 10))
+CHAT_HISTORY_TOKENS  = int(os.getenv("CHAT_HISTORY_TOKENS", 3000))
+CHAT_SUMMARY_BATCH   = int(os.getenv("CHAT_SUMMARY_BATCH", 10))
+CHAT_SUMMARY_MAX     = 200  # messages folded per summary call
+
+# Prepared history of recently active sessions, kept in process (0 sessions = off).
+CHAT_CACHE_SESSIONS  = int(os.getenv("CHAT_CACHE_SESSIONS", 1000))
+CHAT_CACHE_TTL_S     = float(os.getenv("CHAT_CACHE_TTL_S", 1800))
+CHAT_CACHE_MB        = float(os.getenv("CHAT_CACHE_MB", 64))
+
+CRISIS_MARKER  = "[CRISIS_DETECTED]"
+FALLBACK_REPLY = "I'm having trouble connecting to my brain right now. Please try again in a moment. But remember, you are not alone."
+
+# One long-lived model for every request; each chat is a cheap view over it.
+chat_model = genai.GenerativeModel(CHAT_MODEL, system_instruction=SYSTEM_INSTRUCTION)
+summary_model = genai.GenerativeModel(CHAT_MODEL)
+chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+history_cache = HistoryCache(
+    max_sessions=CHAT_CACHE_SESSIONS,
+    ttl_s=CHAT_CACHE_TTL_S,
+    max_bytes=int(CHAT_CACHE_MB * 1024 * 1024),
+    max_messages=2 * CHAT_HISTORY_TURNS,
+)
+
+SUMMARY_PROMPT = """Update the running summary of a supportive conversation between a student and Aasha AI.
+Keep what matters for continuing it: how the student is feeling, what they are dealing with, names and details they shared, advice already given and any safety concerns.
+Write at most 150 words of plain prose, no preamble.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
 class ChatRequest(BaseModel):
     session_id: str | None = None
     message: str
@@ -126,58 +179,356 @@ def get_resources(hub_type: str = None, intensity: str = None, db: Session = Dep
         query = query.filter(SupportResource.intensity == intensity)
     return query.all()
 
-@app.post("/api/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest, db: Session = Depends(get_db)):
-    session_id = request.session_id
-    if not session_id:
-        session_id = str(uuid.uuid4())
-        new_session = ChatSession(session_id=session_id)
-        db.add(new_session)
-        db.commit()
+# ── Chat pipeline ─────────────────────────────────────────────────────────────
+# The DB is only touched before and after the Gemini call, each time with a
+# short-lived session on the threadpool, so a slow reply holds neither a
+# worker thread nor a DB connection.
 
-    # Save user message
-    user_msg = ChatMessage(
-        session_id=session_id,
-        role="user",
-        content=request.message,
-        timestamp=datetime.utcnow().isoformat()
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def cached_message(msg_id: int, role: str, content: str) -> CachedMessage:
+    return CachedMessage(msg_id, estimate_tokens(content or ""), {"role": "user" if role == "user" else "model", "parts": [content]})
+
+
+def fetch_history(db: Session, session_id: str) -> CachedSession:
+    """A session's summary and newest unsummarised messages, read from the DB."""
+    session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+    summary = session.summary if session else ""
+    summary_upto = (session.summary_upto or 0) if session else 0
+
+    # Walks ix_chat_messages_session_id_id backwards, so the cost does not grow with the session.
+    recent = (
+        db.query(ChatMessage)
+        .filter(ChatMessage.session_id == session_id, ChatMessage.id > summary_upto)
+        .order_by(ChatMessage.id.desc())
+        .limit(2 * CHAT_HISTORY_TURNS)
+        .all()
     )
-    db.add(user_msg)
-    
-    # Retrieve history
-    history = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.id).all()
-    
-    gemini_history = []
-    for msg in history:
-        if msg.role == "user":
-            gemini_history.append({"role": "user", "parts": [msg.content]})
-        else:
-            gemini_history.append({"role": "model", "parts": [msg.content]})
+    unsummarised = len(recent)
+    if unsummarised == 2 * CHAT_HISTORY_TURNS:
+        unsummarised = (
+            db.query(func.count(ChatMessage.id))
+            .filter(ChatMessage.session_id == session_id, ChatMessage.id > summary_upto)
+            .scalar()
+        )
+    messages = [cached_message(m.id, m.role, m.content) for m in reversed(recent)]
+    return CachedSession(summary or "", summary_upto, messages, unsummarised=unsummarised)
+
 
+def build_history(state: CachedSession) -> list:
+    """Gemini history: the summary, then the newest messages within the turn and token budgets."""
+    window, budget = [], CHAT_HISTORY_TOKENS - estimate_tokens(state.summary)
+    for msg in reversed(state.messages[-2 * CHAT_HISTORY_TURNS:]):
+        budget -= msg.tokens
+        if budget < 0 and window:
+            break
+        window.append(msg.content)
+    window.reverse()
+    while window and window[0]["role"] != "user":
+        window.pop(0)
+
+    history = []
+    if state.summary:
+        history.append({"role": "user", "parts": [f"Summary of our conversation so far: {state.summary}"]})
+        history.append({"role": "model", "parts": ["Thank you, I'll keep that in mind."]})
+    history.extend(window)
+    return history
+
+
+def load_chat_context(session_id: str | None):
+    """Create the session if needed and return (session_id, history)."""
+    with SessionLocal() as db:
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            db.add(ChatSession(session_id=session_id))
+            db.commit()
+            history_cache.put(session_id, "", 0, [])
+
+        state = history_cache.get(session_id)
+        if state is None:
+            state = fetch_history(db, session_id)
+            history_cache.put(session_id, state.summary, state.summary_upto, state.messages, state.unsummarised)
+        gemini_history = build_history(state)
+    return session_id, gemini_history
+
+
+def save_exchange(session_id: str, message: str, reply: str):
+    """Commit the user message and the reply together, then add both to the cached history (write-through)."""
+    timestamp = datetime.utcnow().isoformat()
+    msgs = [
+        ChatMessage(session_id=session_id, role="user", content=message, timestamp=timestamp),
+        ChatMessage(session_id=session_id, role="model", content=reply, timestamp=timestamp),
+    ]
+    with SessionLocal() as db:
+        db.add_all(msgs)
+        db.flush()
+        cached = [cached_message(m.id, m.role, m.content) for m in msgs]
+        db.commit()
+    for msg in cached:
+        history_cache.append(session_id, msg)
+
+
+@contextlib.asynccontextmanager
+async def chat_slot():
+    """Hold one of the CHAT_MAX_CONCURRENCY Gemini slots; 503 if none frees up in time."""
+    try:
+        await asyncio.wait_for(chat_slots.acquire(), CHAT_QUEUE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Chat is busy, please try again shortly.", headers={"Retry-After": "5"})
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash", system_instruction=SYSTEM_INSTRUCTION)
-        chat = model.start_chat(history=gemini_history[:-1]) # exclude last message as we send it
-        response = chat.send_message(request.message)
-        reply_text = response.text
+        yield
+    finally:
+        chat_slots.release()
+
+
+async def generate_reply(history: list, message: str) -> str:
+    """Ask Gemini for the next reply within the concurrency and time limits."""
+    async with chat_slot():
+        try:
+            chat = chat_model.start_chat(history=history)
+            response = await asyncio.wait_for(chat.send_message_async(message), CHAT_TIMEOUT_S)
+            return response.text
+        except asyncio.TimeoutError:
+            print(f"Gemini API Error: no reply within {CHAT_TIMEOUT_S:.0f} s")
+            return FALLBACK_REPLY
+        except Exception as e:
+            print(f"Gemini API Error: {e}")
+            return FALLBACK_REPLY
+
+
+# ── Rolling summary ───────────────────────────────────────────────────────────
+# After a reply is saved, messages that have dropped out of the history window
+# are folded into ChatSession.summary in the background, off the request path.
+
+folding_sessions = set()
+fold_tasks = set()
+
+
+def messages_to_fold(session_id: str):
+    """Return (summary, summary_upto, messages) once enough messages are outside the window, else None."""
+    with SessionLocal() as db:
+        session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+        if session is None:
+            return None
+        summary_upto = session.summary_upto or 0
+        newest = (
+            db.query(ChatMessage.id)
+            .filter(ChatMessage.session_id == session_id, ChatMessage.id > summary_upto)
+            .order_by(ChatMessage.id.desc())
+            .offset(2 * CHAT_HISTORY_TURNS + CHAT_SUMMARY_BATCH - 1)
+            .limit(1)
+            .scalar()
+        )
+        if newest is None:
+            return None
+        window_start = (
+            db.query(ChatMessage.id)
+            .filter(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.id.desc())
+            .offset(2 * CHAT_HISTORY_TURNS - 1)
+            .limit(1)
+            .scalar()
+        )
+        messages = (
+            db.query(ChatMessage)
+            .filter(ChatMessage.session_id == session_id, ChatMessage.id > summary_upto, ChatMessage.id < window_start)
+            .order_by(ChatMessage.id)
+            .limit(CHAT_SUMMARY_MAX)
+            .all()
+        )
+        return session.summary or "", summary_upto, [(m.id, m.role, m.content) for m in messages]
+
+
+def store_summary(session_id: str, previous_upto: int, summary: str, upto: int, folded: int):
+    with SessionLocal() as db:
+        updated = db.query(ChatSession).filter(
+            ChatSession.session_id == session_id, ChatSession.summary_upto == previous_upto
+        ).update({"summary": summary, "summary_upto": upto})
+        db.commit()
+    if updated:
+        history_cache.apply_summary(session_id, summary, upto, folded)
+
+
+async def fold_history(session_id: str):
+    try:
+        pending = await run_in_threadpool(messages_to_fold, session_id)
+        if not pending or not pending[2]:
+            return
+        summary, previous_upto, messages = pending
+        transcript = "\n".join(f"{'Student' if role == 'user' else 'Aasha AI'}: {content}" for _, role, content in messages)
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none yet)", messages=transcript)
+        async with chat_slot():
+            response = await asyncio.wait_for(summary_model.generate_content_async(prompt), CHAT_TIMEOUT_S)
+        new_summary = response.text.strip()
+        if new_summary:
+            await run_in_threadpool(store_summary, session_id, previous_upto, new_summary, messages[-1][0], len(messages))
+    except Exception as e:
+        print(f"[chat] Summary failed for {session_id}, keeping messages verbatim: {e!r}")
+    finally:
+        folding_sessions.discard(session_id)
+
+
+def schedule_history_fold(session_id: str):
+    """Start a background fold for the session unless one is running or, going by the cache, none is due."""
+    if session_id in folding_sessions:
+        return
+    pending = history_cache.unsummarised(session_id)
+    if pending is not None and pending < 2 * CHAT_HISTORY_TURNS + CHAT_SUMMARY_BATCH:
+        return
+    folding_sessions.add(session_id)
+    task = asyncio.create_task(fold_history(session_id))
+    fold_tasks.add(task)
+    task.add_done_callback(fold_tasks.discard)
+
+
+class CrisisMarkerFilter:
+    """Strips CRISIS_MARKER from streamed text, even when it is split across chunks."""
+
+    def __init__(self):
+        self.detected = False
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        while CRISIS_MARKER in text:
+            self.detected = True
+            text = text.replace(CRISIS_MARKER, "")
+        # Hold back a tail that could be the start of a marker.
+        hold = 0
+        for n in range(min(len(CRISIS_MARKER) - 1, len(text)), 0, -1):
+            if CRISIS_MARKER.startswith(text[-n:]):
+                hold = n
+                break
+        self._pending = text[len(text) - hold:] if hold else ""
+        return text[:len(text) - hold]
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return text
+
+
+async def stream_reply(history: list, message: str):
+    """Yield Gemini's reply as text chunks, falling back like generate_reply on errors."""
+    deadline = asyncio.get_running_loop().time() + CHAT_TIMEOUT_S
+    sent = False
+    try:
+        chat = chat_model.start_chat(history=history)
+        response = await asyncio.wait_for(chat.send_message_async(message, stream=True), CHAT_TIMEOUT_S)
+        chunks = response.__aiter__()
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), max(remaining, 0))
+            except StopAsyncIteration:
+                break
+            if chunk.text:
+                sent = True
+                yield chunk.text
+    except asyncio.TimeoutError:
+        print(f"Gemini API Error: no reply within {CHAT_TIMEOUT_S:.0f} s")
+        if not sent:
+            yield FALLBACK_REPLY
     except Exception as e:
-        reply_text = "I'm having trouble connecting to my brain right now. Please try again in a moment. But remember, you are not alone."
         print(f"Gemini API Error: {e}")
+        if not sent:
+            yield FALLBACK_REPLY
 
-    crisis_detected = "[CRISIS_DETECTED]" in reply_text
-    clean_reply = reply_text.replace("[CRISIS_DETECTED]", "").strip()
 
-    # Save model message
-    bot_msg = ChatMessage(
-        session_id=session_id,
-        role="model",
-        content=clean_reply,
-        timestamp=datetime.utcnow().isoformat()
-    )
-    db.add(bot_msg)
-    db.commit()
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+save_tasks = set()
+
+
+async def persist_exchange(session_id: str, message: str, reply: str):
+    """
+    Run save_exchange on the threadpool, then fold the history if due. The
+    write is its own task, so it still completes if the request is cancelled
+    while waiting for it (a client that disconnects mid-stream).
+    """
+    async def persist():
+        await run_in_threadpool(save_exchange, session_id, message, reply)
+        schedule_history_fold(session_id)
+
+    task = asyncio.create_task(persist())
+    save_tasks.add(task)
+    task.add_done_callback(save_tasks.discard)
+    await asyncio.shield(task)
+
+
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest):
+    session_id, history = await run_in_threadpool(load_chat_context, request.session_id)
+
+    # Nothing is stored until there is a reply: a 503 leaves no unanswered user turn behind.
+    reply_text = await generate_reply(history, request.message)
+
+    crisis_detected = CRISIS_MARKER in reply_text
+    clean_reply = reply_text.replace(CRISIS_MARKER, "").strip()
+
+    await run_in_threadpool(save_exchange, session_id, request.message, clean_reply)
+    schedule_history_fold(session_id)
 
     return ChatResponse(
         session_id=session_id,
         reply=clean_reply,
         crisis_detected=crisis_detected
     )
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Same as /api/chat, but the reply is sent as server-sent events while it is
+    generated: one `session` event, `delta` events with the visible text
+    (crisis marker already stripped) and a final `done` event carrying the
+    same fields as ChatResponse. The user message and the reply are saved
+    together when the stream ends, however it ends: if it stops early (busy,
+    error, client gone) with part of the reply sent, that part is saved; if
+    no reply text was produced, nothing is.
+    """
+    session_id, history = await run_in_threadpool(load_chat_context, request.session_id)
+
+    async def events():
+        yield sse_event("session", {"session_id": session_id})
+        marker = CrisisMarkerFilter()
+        parts = []
+        saved = False
+
+        async def save() -> str:
+            nonlocal saved
+            saved = True
+            reply = "".join(parts).strip()
+            if reply:
+                await persist_exchange(session_id, request.message, reply)
+            return reply
+
+        try:
+            async with chat_slot():
+                async for chunk in stream_reply(history, request.message):
+                    text = marker.feed(chunk)
+                    if not parts:
+                        text = text.lstrip()
+                    if text:
+                        parts.append(text)
+                        yield sse_event("delta", {"text": text})
+            tail = marker.flush()
+            if tail:
+                parts.append(tail)
+                yield sse_event("delta", {"text": tail})
+
+            reply = await save()
+            yield sse_event("done", {"session_id": session_id, "reply": reply, "crisis_detected": marker.detected})
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+        finally:
+            if not saved:
+                await save()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
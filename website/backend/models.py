@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Index, inspect, text
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -7,6 +7,8 @@ class ChatSession(Base):
     __tablename__ = "chat_sessions"
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, unique=True, index=True)
+    summary = Column(Text, default="") # rolling summary of messages older than the history window
+    summary_upto = Column(Integer, default=0) # id of the last ChatMessage folded into summary
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -16,6 +18,9 @@ class ChatMessage(Base):
     content = Column(Text)
     timestamp = Column(String)
 
+    # History is always read as "this session, newest ids first".
+    __table_args__ = (Index("ix_chat_messages_session_id_id", "session_id", "id"),)
+
 class SupportResource(Base):
     __tablename__ = "support_resources"
     id = Column(Integer, primary_key=True, index=True)
@@ -23,3 +28,15 @@ class SupportResource(Base):
     title = Column(String)
     description = Column(Text)
     intensity = Column(String) # 'Low' or 'High'
+
+
+def upgrade_schema(engine):
+    """Add columns and indexes introduced after a database was first created (create_all skips existing tables)."""
+    columns = {c["name"] for c in inspect(engine).get_columns("chat_sessions")}
+    with engine.begin() as conn:
+        if "summary" not in columns:
+            conn.execute(text("ALTER TABLE chat_sessions ADD COLUMN summary TEXT DEFAULT ''"))
+        if "summary_upto" not in columns:
+            conn.execute(text("ALTER TABLE chat_sessions ADD COLUMN summary_upto INTEGER DEFAULT 0"))
+    for index in ChatMessage.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
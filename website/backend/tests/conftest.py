@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# main.py creates and seeds its database on import; keep the test run away from aasha_ai.db.
+_db_dir = tempfile.mkdtemp(prefix="aasha-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal
+from models import ChatMessage
+
+
+class FakeReply:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChatModel:
+    """start_chat()/send_message_async() stand-in; raises `error` if set."""
+
+    def __init__(self, text="I'm here for you.", error=None):
+        self.text = text
+        self.error = error
+
+    def start_chat(self, history=None):
+        return self
+
+    async def send_message_async(self, message, stream=False):
+        if self.error is not None:
+            raise self.error
+        return FakeReply(self.text)
+
+
+def stored(session_id):
+    with SessionLocal() as db:
+        rows = db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(ChatMessage.id).all()
+        return [(m.role, m.content) for m in rows]
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_user_message_and_reply_are_stored_together(client, monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeChatModel())
+    body = client.post("/api/chat", json={"message": "rough week"}).json()
+
+    assert body["reply"] == "I'm here for you."
+    assert stored(body["session_id"]) == [("user", "rough week"), ("model", "I'm here for you.")]
+    assert [m.content["parts"][0] for m in main.history_cache.get(body["session_id"]).messages] == [
+        "rough week", "I'm here for you.",
+    ]
+
+
+def test_busy_chat_stores_nothing(client, monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeChatModel())
+    session_id = client.post("/api/chat", json={"message": "hello"}).json()["session_id"]
+    monkeypatch.setattr(main, "CHAT_QUEUE_TIMEOUT_S", 0.01)
+    monkeypatch.setattr(main, "chat_slots", asyncio.Semaphore(0))
+
+    response = client.post("/api/chat", json={"session_id": session_id, "message": "still there?"})
+
+    assert response.status_code == 503
+    assert stored(session_id) == [("user", "hello"), ("model", "I'm here for you.")]
+
+
+def test_gemini_failure_stores_the_fallback_reply(client, monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeChatModel(error=RuntimeError("quota")))
+    body = client.post("/api/chat", json={"message": "hello"}).json()
+
+    assert body["reply"] == main.FALLBACK_REPLY
+    assert stored(body["session_id"]) == [("user", "hello"), ("model", main.FALLBACK_REPLY)]
+
+
+class FakeStreamModel:
+    """Streams `pieces`; an exception item is raised when reached."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def start_chat(self, history=None):
+        return self
+
+    async def send_message_async(self, message, stream=False):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for piece in self.pieces:
+            if isinstance(piece, Exception):
+                raise piece
+            await asyncio.sleep(0)
+            yield FakeReply(piece)
+
+
+def stream_events(client, **body):
+    text = client.post("/api/chat/stream", json=body).text
+    return [block.split("\n")[0].removeprefix("event: ") for block in text.strip().split("\n\n")]
+
+
+def test_completed_stream_stores_the_exchange(client, monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeStreamModel(["I'm ", "here."]))
+    session_id = client.post("/api/chat", json={"message": "hi"}).json()["session_id"]
+
+    assert stream_events(client, session_id=session_id, message="thanks")[-1] == "done"
+    assert stored(session_id)[-2:] == [("user", "thanks"), ("model", "I'm here.")]
+
+
+def test_busy_stream_stores_nothing(client, monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeChatModel())
+    session_id = client.post("/api/chat", json={"message": "hello"}).json()["session_id"]
+    monkeypatch.setattr(main, "CHAT_QUEUE_TIMEOUT_S", 0.01)
+    monkeypatch.setattr(main, "chat_slots", asyncio.Semaphore(0))
+
+    assert stream_events(client, session_id=session_id, message="still there?") == ["session", "error"]
+    assert stored(session_id) == [("user", "hello"), ("model", "I'm here for you.")]
+
+
+def test_stream_failing_midway_stores_the_part_sent(client, monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeStreamModel(["That sounds hard. ", RuntimeError("reset")]))
+    session_id = client.post("/api/chat", json={"message": "hi"}).json()["session_id"]
+
+    stream_events(client, session_id=session_id, message="exams")
+    assert stored(session_id)[-2:] == [("user", "exams"), ("model", "That sounds hard.")]
+
+
+def test_client_disconnect_stores_the_part_sent(monkeypatch):
+    monkeypatch.setattr(main, "chat_model", FakeStreamModel(["First part. ", "Second part."]))
+
+    async def scenario():
+        response = await main.chat_stream_endpoint(main.ChatRequest(message="hello"))
+        body = response.body_iterator
+        session = json.loads((await body.__anext__()).split("data: ")[1])
+        await body.__anext__()                 # first delta
+        await body.aclose()                    # the client went away
+        await asyncio.gather(*main.save_tasks)
+        return session["session_id"]
+
+    session_id = asyncio.run(scenario())
+    assert stored(session_id) == [("user", "hello"), ("model", "First part.")]
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import CRISIS_MARKER, CrisisMarkerFilter
+
+BEFORE = "I hear you. "
+AFTER = " Please reach out to someone now."
+REPLY = BEFORE + CRISIS_MARKER + AFTER
+
+
+def run_filter(chunks):
+    marker = CrisisMarkerFilter()
+    out = [marker.feed(chunk) for chunk in chunks]
+    out.append(marker.flush())
+    return out, marker.detected
+
+
+def splits(text, start, stop):
+    """`text` cut once at every offset in [start, stop)."""
+    for i in range(start, stop):
+        yield [text[:i], text[i:]]
+
+
+MARKER_AT = len(BEFORE)
+MARKER_END = MARKER_AT + len(CRISIS_MARKER)
+
+
+@pytest.mark.parametrize("chunks", list(splits(REPLY, MARKER_AT, MARKER_END + 1)))
+def test_marker_split_at_any_offset_never_leaks(chunks):
+    out, detected = run_filter(chunks)
+    assert detected
+    assert "".join(out) == BEFORE + AFTER
+    for piece in out:
+        assert "[" not in piece and "]" not in piece
+
+
+def test_marker_fed_one_character_at_a_time():
+    out, detected = run_filter(list(REPLY))
+    assert detected
+    assert "".join(out) == BEFORE + AFTER
+
+
+def test_marker_split_into_three_chunks():
+    for i in range(MARKER_AT, MARKER_END):
+        for j in range(i + 1, MARKER_END + 1):
+            out, detected = run_filter([REPLY[:i], REPLY[i:j], REPLY[j:]])
+            assert detected
+            assert "".join(out) == BEFORE + AFTER
+
+
+def test_text_resembling_the_marker_is_released():
+    out, detected = run_filter(["Lists like [1, 2] and ", "[CRISIS", " plans] are fine"])
+    assert not detected
+    assert "".join(out) == "Lists like [1, 2] and [CRISIS plans] are fine"
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for piece in self.pieces:
+            yield FakeChunk(piece)
+
+
+class FakeChatModel:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def start_chat(self, history=None):
+        return self
+
+    async def send_message_async(self, message, stream=False):
+        return FakeStream(self.pieces)
+
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.mark.parametrize("cut", [MARKER_AT, MARKER_AT + 1, MARKER_AT + 9, MARKER_END - 1, MARKER_END])
+def test_stream_endpoint_never_sends_the_marker(monkeypatch, cut):
+    monkeypatch.setattr(main, "chat_model", FakeChatModel([REPLY[:cut], REPLY[cut:]]))
+    with TestClient(main.app) as client:
+        response = client.post("/api/chat/stream", json={"message": "help"})
+    assert response.status_code == 200
+    assert CRISIS_MARKER not in response.text
+
+    events = parse_events(response.text)
+    deltas = "".join(data["text"] for event, data in events if event == "delta")
+    assert deltas == (BEFORE + AFTER).strip()
+    assert events[-1][0] == "done"
+    assert events[-1][1]["crisis_detected"] is True
+    assert events[-1][1]["reply"] == deltas
@@ -0,0 +1,120 @@
+import pytest
+
+import history_cache
+from history_cache import ENTRY_OVERHEAD, CachedMessage, HistoryCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(history_cache.time, "monotonic", clock)
+    return clock
+
+
+def msg(id, text="hello", role="user"):
+    return CachedMessage(id=id, tokens=len(text) // 4 + 1, content={"role": role, "parts": [text]})
+
+
+def ids(session):
+    return [m.id for m in session.messages]
+
+
+def test_idle_sessions_expire_after_ttl(clock):
+    cache = HistoryCache(ttl_s=60)
+    cache.put("a", "", 0, [msg(1)])
+    cache.put("b", "", 0, [msg(2)])
+
+    clock.now += 50
+    assert cache.get("a") is not None        # refreshes "a" only
+    clock.now += 20
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    clock.now += 61
+    assert cache.get("a") is None
+    assert cache._bytes == 0
+
+
+def test_least_recently_used_session_is_evicted_past_max_sessions(clock):
+    cache = HistoryCache(max_sessions=2)
+    cache.put("a", "", 0, [msg(1)])
+    cache.put("b", "", 0, [msg(2)])
+    cache.get("a")
+    cache.put("c", "", 0, [msg(3)])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_sessions_are_evicted_past_max_bytes(clock):
+    size = len("hello") + ENTRY_OVERHEAD
+    cache = HistoryCache(max_bytes=3 * size)
+    cache.put("a", "", 0, [msg(1), msg(2)])
+    cache.put("b", "", 0, [msg(3)])
+    cache.append("b", msg(4))
+
+    assert cache.get("a") is None
+    assert ids(cache.get("b")) == [3, 4]
+    assert cache._bytes == 2 * size
+
+
+def test_append_writes_through_in_id_order_and_keeps_max_messages(clock):
+    cache = HistoryCache(max_messages=3)
+    cache.append("missing", msg(1))
+    assert cache.get("missing") is None
+
+    cache.put("a", "summary", 0, [msg(1), msg(2)])
+    cache.append("a", msg(5))
+    cache.append("a", msg(4))                # a slower request committed earlier
+    session = cache.get("a")
+    assert ids(session) == [2, 4, 5]
+    assert session.summary == "summary"
+    assert cache.unsummarised("a") == 4
+
+
+def test_get_returns_a_snapshot(clock):
+    cache = HistoryCache()
+    cache.put("a", "", 0, [msg(1)])
+    cache.get("a").messages.append(msg(2))
+    assert ids(cache.get("a")) == [1]
+
+
+def test_put_does_not_replace_a_cached_session(clock):
+    cache = HistoryCache()
+    cache.put("a", "", 0, [msg(1)])
+    cache.append("a", msg(2))
+    cache.put("a", "", 0, [msg(1)])
+    assert ids(cache.get("a")) == [1, 2]
+
+
+def test_apply_summary_drops_folded_messages(clock):
+    cache = HistoryCache()
+    cache.put("a", "", 0, [msg(i) for i in range(1, 6)], unsummarised=30)
+    cache.apply_summary("a", "new summary", upto=3, folded=10)
+
+    session = cache.get("a")
+    assert session.summary == "new summary"
+    assert session.summary_upto == 3
+    assert ids(session) == [4, 5]
+    assert cache.unsummarised("a") == 20
+
+
+def test_invalidate_and_disabled_cache(clock):
+    cache = HistoryCache()
+    cache.put("a", "", 0, [msg(1)])
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache._bytes == 0
+
+    off = HistoryCache(max_sessions=0)
+    off.put("a", "", 0, [msg(1)])
+    assert off.get("a") is None
+    assert off.unsummarised("a") is None
@@ -83,24 +83,66 @@ export default function ChatInterface({ sessionId, setSessionId, onCrisisDetecte
         }, 50);
     };
 
+    // Reads the server-sent events of /api/chat/stream, calling onEvent(name, data) for each.
+    const readEventStream = async (response, onEvent) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                }
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    };
+
     const executeChatRequest = async (messageText) => {
+        let started = false;
         try {
-            const response = await fetch('https://arpy8-aasha-ai-backend-server.hf.space/api/chat', {
+            const response = await fetch('https://arpy8-aasha-ai-backend-server.hf.space/api/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ session_id: sessionId, message: messageText })
             });
 
             if (!response.ok) throw new Error('Network response was not ok');
-            const data = await response.json();
-
 
-            if (data.session_id && !sessionId) setSessionId(data.session_id);
-            setMessages(prev => [...prev, { role: 'model', content: data.reply }]);
+            let reply = '';
+            let crisisDetected = false;
+            await readEventStream(response, (event, data) => {
+                if (event === 'session') {
+                    if (data.session_id && !sessionId) setSessionId(data.session_id);
+                } else if (event === 'delta') {
+                    reply += data.text;
+                    const content = reply;
+                    if (!started) {
+                        started = true;
+                        setMessages(prev => [...prev, { role: 'model', content }]);
+                    } else {
+                        setMessages(prev => [...prev.slice(0, -1), { role: 'model', content }]);
+                    }
+                } else if (event === 'done') {
+                    reply = data.reply;
+                    crisisDetected = data.crisis_detected;
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+            });
 
             // Text to speech
             if (ttsEnabled && 'speechSynthesis' in window) {
-                const utterance = new SpeechSynthesisUtterance(data.reply);
+                const utterance = new SpeechSynthesisUtterance(reply);
                 // Try to find a calming or female voice if available
                 const voices = window.speechSynthesis.getVoices();
                 const preferredVoice = voices.find(v => v.name.includes('Female') || v.name.includes('Samantha') || v.name.includes('Google US English'));
@@ -110,10 +152,12 @@ export default function ChatInterface({ sessionId, setSessionId, onCrisisDetecte
                 window.speechSynthesis.speak(utterance);
             }
 
-            if (data.crisis_detected) onCrisisDetected(true);
+            if (crisisDetected) onCrisisDetected(true);
         } catch (error) {
             console.error("Chat error:", error);
-            setMessages(prev => [...prev, { role: 'model', content: "I'm having a hard time connecting right now, but please hold on." }]);
+            if (!started) {
+                setMessages(prev => [...prev, { role: 'model', content: "I'm having a hard time connecting right now, but please hold on." }]);
+            }
         } finally {
             setIsLoading(false);
         }
@@ -217,7 +261,7 @@ export default function ChatInterface({ sessionId, setSessionId, onCrisisDetecte
                                 </div>
                             </div>
                         ))}
-                        {isLoading && (
+                        {isLoading && messages[messages.length - 1].role === 'user' && (
                             <div className="flex w-full justify-start">
                                 <div className="max-w-[80%] flex gap-3 flex-row">
                                     <div className="w-8 h-8 rounded-full bg-primary/10 flex-shrink-0 flex items-center justify-center mt-1">